@@ -1,33 +1,192 @@
+import itertools
 import json
 import logging
 import uuid
-from typing import Dict, List, Optional, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple, Union
 import time
+import json_utils
+from llm_utils import DEFAULT_MODEL, response_content, run_message_batch
+from prompt_utils import CACHE_CONTROL, get_system_blocks
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# System prompt for the critic LLM
+CRITIC_SYSTEM_PROMPT = "You are a critical evaluator of knowledge graph extractions. Provide detailed, constructive evaluation with specific scores and actionable feedback."
+
+# Schema of one critic evaluation. The scores differ between entity and relationship
+# evaluations, so only the shared fields are listed
+CRITIC_EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overall_confidence": {"type": "integer", "minimum": 1, "maximum": 5},
+        "extraction_quality": {"type": "string", "enum": ["excellent", "good", "fair", "poor"]},
+        "issues_identified": {"type": "array", "items": {"type": "object"}},
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "human_review_recommended": {"type": "boolean"},
+        "human_review_reason": {"type": "string"},
+        "confidence_explanation": {"type": "string"}
+    },
+    "required": ["overall_confidence", "extraction_quality", "human_review_recommended"]
+}
+
+# Tool the critic is made to call with its evaluation, so the API returns it already parsed
+CRITIC_TOOL = {
+    "name": "submit_evaluation",
+    "description": "Submit the evaluation of the extraction",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "evaluation": CRITIC_EVALUATION_SCHEMA
+        },
+        "required": ["evaluation"]
+    }
+}
+
+# Tool for evaluating several items with one call, with one evaluation per item
+BATCHED_CRITIC_TOOL = {
+    "name": "submit_evaluations",
+    "description": "Submit the evaluation of each extracted item",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "evaluations": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "item_index": {"type": "integer", "description": "The N from the item's marker"},
+                        "evaluation": CRITIC_EVALUATION_SCHEMA
+                    },
+                    "required": ["item_index", "evaluation"]
+                }
+            }
+        },
+        "required": ["evaluations"]
+    }
+}
+
+# Appended to the instructions when several items are evaluated with one call
+BATCHED_CRITIC_INSTRUCTIONS = """
+Several items follow instead of one, each starting with a "--- ITEM N ---" marker. Evaluate each item separately against the criteria above, and respond with one entry per item, where item_index is the N from the item's marker and evaluation is in the format above:
+{
+  "evaluations": [
+    {
+      "item_index": N,
+      "evaluation": {...}
+    }
+  ]
+}
+"""
+
+# Maximum number of entities or relationships evaluated with one critic LLM call
+CRITIC_ITEMS_PER_REQUEST = 16
+
+# Batched responses hold several evaluations, so they get a larger token budget
+BATCHED_CRITIC_MAX_TOKENS = 16000
+
+# Fields that identify where an item came from rather than what was extracted, left out when
+# spotting duplicate items
+PROVENANCE_FIELDS = frozenset({"id", "source_chunk", "source_id", "target_id", "auto_created_from_relationship", "relationship_context"})
+
+# Static rubric for relationship evaluations, sent ahead of each relationship so it can be served
+# from Anthropic's prompt cache
+RELATIONSHIP_CRITIC_INSTRUCTIONS = """
+You are an expert reviewer of relationship extraction for a planetary health knowledge graph.
+
+After these instructions comes an extracted RELATIONSHIP, along with the entities it connects and the original text context.
+
+Please evaluate this relationship extraction on the following criteria:
+
+1. **Evidence**: Is there clear evidence for this relationship in the text?
+2. **Entity Accuracy**: Are the source and target entities correctly identified?
+3. **Relationship Type**: Is the relationship type appropriate and accurate?
+4. **Direction**: Is the relationship direction correct (if applicable)?
+5. **Strength**: Is the relationship strength rating appropriate (1-5)?
+6. **Relevance**: Is this relationship relevant to planetary health?
+7. **Entity Existence**: Do both entities actually exist and are they well-defined?
+
+Respond in the following JSON format:
+{
+  "evaluation": {
+    "evidence_score": 1-5,
+    "entity_accuracy_score": 1-5,
+    "relationship_type_score": 1-5,
+    "direction_score": 1-5,
+    "strength_score": 1-5,
+    "relevance_score": 1-5,
+    "entity_existence_score": 1-5,
+    "overall_confidence": 1-5,
+    "extraction_quality": "excellent|good|fair|poor",
+    "issues_identified": [
+      {
+        "issue_type": "evidence|entity_accuracy|relationship_type|direction|strength|relevance|entity_existence",
+        "description": "Specific description of the issue",
+        "severity": 1-5,
+        "suggested_correction": "suggested fix (if applicable)"
+      }
+    ],
+    "strengths": [
+      "List of strengths in this extraction"
+    ],
+    "human_review_recommended": true|false,
+    "human_review_reason": "Explanation if review is recommended",
+    "confidence_explanation": "Why this confidence score was assigned"
+  }
+}
+"""
+
+def canonical_item_json(item: Optional[Dict]) -> str:
+    """
+    Get the canonical form of an extracted item, for spotting duplicates
+    
+    Args:
+        item: Entity or relationship, or None
+        
+    Returns:
+        JSON of the item's extracted fields with sorted keys, without its provenance fields
+    """
+    if item is None:
+        return json_utils.dumps(None)
+    return json_utils.dumps({key: value for key, value in item.items() if key not in PROVENANCE_FIELDS}, sort_keys=True)
+
+def chunk_text(chunk: Optional[Dict]) -> str:
+    """Get the text of a supporting chunk, or an empty string if there is none"""
+    return chunk.get("text", "") if chunk else ""
+
 class KnowledgeGraphCritic:
     """
     Comprehensive critic system for evaluating extracted entities and relationships
     """
     
-    def __init__(self, llm_client, critic_llm_client=None):
+    def __init__(self, llm_client, critic_llm_client=None, cache=None, concurrency: int = 8,
+                 items_per_request: int = CRITIC_ITEMS_PER_REQUEST):
         """
         Initialize the critic system
         
         Args:
             llm_client: Client for the primary LLM
             critic_llm_client: Client for the critic LLM (optional)
+            cache: ResponseCache for parsed critic evaluations (optional)
+            concurrency: Maximum number of critic LLM requests in flight at once
+            items_per_request: Maximum number of entities or relationships evaluated with one
+                critic LLM call (1 evaluates each item with its own call)
         """
         self.llm_client = llm_client
         self.critic_llm_client = critic_llm_client or llm_client
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.items_per_request = max(1, items_per_request)
+        self.duplicate_items_skipped = 0
         logger.info("Initialized KnowledgeGraphCritic")
     
     def evaluate_extraction_results(self, entities: Dict[str, List[Dict]], 
                                   relationships: List[Dict],
                                   chunks: List[Dict] = None,
-                                  exclude_auto_created: bool = True) -> Dict:
+                                  exclude_auto_created: bool = True,
+                                  use_batch_api: bool = False,
+                                  poll_interval: float = 30.0) -> Dict:
         """
         Comprehensive evaluation of all extraction results
         
@@ -36,20 +195,31 @@ class KnowledgeGraphCritic:
             relationships: List of relationships
             chunks: Original document chunks (optional, for context)
             exclude_auto_created: Whether to exclude auto-created entities from evaluation
+            use_batch_api: Whether to evaluate entities and relationships with one Message Batches API job
+            poll_interval: Seconds to wait before the first batch status check
             
         Returns:
             Comprehensive evaluation report
         """
         logger.info("Starting comprehensive evaluation of extraction results")
         
+        # The statistics report the duplicates of this evaluation only
+        self.duplicate_items_skipped = 0
+        
         # Filter entities if requested
         filtered_entities = self._filter_entities(entities, exclude_auto_created)
         
-        # Evaluate entities
-        entity_evaluations = self._evaluate_all_entities(filtered_entities, chunks)
-        
-        # Evaluate relationships
-        relationship_evaluations = self._evaluate_all_relationships(relationships, entities, chunks)
+        if use_batch_api:
+            # Entities and relationships go into one batch job, so the run waits for a single job
+            entity_evaluations, relationship_evaluations = self.evaluate_extraction_batch(
+                filtered_entities, relationships, entities, chunks, poll_interval
+            )
+        else:
+            # Evaluate entities
+            entity_evaluations = self._evaluate_all_entities(filtered_entities, chunks)
+            
+            # Evaluate relationships
+            relationship_evaluations = self._evaluate_all_relationships(relationships, entities, chunks)
         
         # Generate overall quality assessment
         overall_assessment = self._generate_overall_assessment(
@@ -74,7 +244,8 @@ class KnowledgeGraphCritic:
                 "high_quality_entities": sum(1 for evals in entity_evaluations.values() 
                                            for eval in evals if eval.get("extraction_quality") == "excellent"),
                 "high_quality_relationships": sum(1 for eval in relationship_evaluations 
-                                                if eval.get("extraction_quality") == "excellent")
+                                                if eval.get("extraction_quality") == "excellent"),
+                "duplicate_items_skipped": self.duplicate_items_skipped
             }
         }
     
@@ -98,30 +269,24 @@ class KnowledgeGraphCritic:
     
     def _evaluate_all_entities(self, entities: Dict[str, List[Dict]], chunks: List[Dict] = None) -> Dict[str, List[Dict]]:
         """Evaluate all entities by type"""
-        entity_evaluations = {}
-        
-        for entity_type, entity_list in entities.items():
-            if not entity_list:
-                entity_evaluations[entity_type] = []
-                continue
+        # Critic calls are I/O-bound, so entities are evaluated concurrently. All types share one
+        # pool, so a type's slowest calls overlap with the next type's instead of draining it first
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pending = {}
+            for entity_type, entity_list in entities.items():
+                if entity_list:
+                    logger.info(f"Evaluating {len(entity_list)} {entity_type} entities")
                 
-            logger.info(f"Evaluating {len(entity_list)} {entity_type} entities")
-            entity_evaluations[entity_type] = []
+                build_prompt = self._entity_prompt_builder(entity_type, chunks)
+                pending[entity_type] = self._evaluate_items(executor, entity_list, build_prompt, f"{entity_type} entity evaluation")
             
-            for i, entity in enumerate(entity_list):
-                logger.debug(f"Evaluating {entity_type} {i+1}/{len(entity_list)}")
-                
-                # Find supporting chunk if available
-                supporting_chunk = self._find_supporting_chunk(entity, chunks)
-                
-                evaluation = self._evaluate_single_entity(entity, entity_type, supporting_chunk)
-                evaluation["entity_id"] = entity.get("id")
-                evaluation["entity_type"] = entity_type
-                
-                entity_evaluations[entity_type].append(evaluation)
-                
-                # Rate limiting
-                time.sleep(0.3)
+            entity_evaluations = {}
+            for entity_type, evaluations in pending.items():
+                entity_evaluations[entity_type] = []
+                for entity, evaluation in zip(entities[entity_type], evaluations):
+                    evaluation["entity_id"] = entity.get("id")
+                    evaluation["entity_type"] = entity_type
+                    entity_evaluations[entity_type].append(evaluation)
         
         return entity_evaluations
     
@@ -131,40 +296,234 @@ class KnowledgeGraphCritic:
         """Evaluate all relationships"""
         if not relationships:
             return []
-            
+        
         logger.info(f"Evaluating {len(relationships)} relationships")
-        relationship_evaluations = []
         
-        # Create entity lookup for context
-        entity_lookup = {}
-        for entity_type, entity_list in entities.items():
-            for entity in entity_list:
-                entity_lookup[entity.get("id")] = entity
+        build_prompt = self._relationship_prompt_builder(entities, chunks)
         
-        for i, relationship in enumerate(relationships):
-            logger.debug(f"Evaluating relationship {i+1}/{len(relationships)}")
-            
+        # Critic calls are I/O-bound, so relationships are evaluated concurrently
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            relationship_evaluations = list(self._evaluate_items(executor, relationships, build_prompt, "relationship evaluation"))
+        
+        for relationship, evaluation in zip(relationships, relationship_evaluations):
+            evaluation["relationship_id"] = relationship.get("id")
+        
+        return relationship_evaluations
+    
+    def _entity_prompt_builder(self, entity_type: str, chunks: List[Dict] = None) -> Callable[[Dict], Tuple[Tuple[str, str], Tuple[str, ...]]]:
+        """Get a function that builds the critic prompt and duplicate key of an entity of the given type"""
+        def build_prompt(entity: Dict) -> Tuple[Tuple[str, str], Tuple[str, ...]]:
             # Find supporting chunk if available
-            supporting_chunk = self._find_supporting_chunk(relationship, chunks)
-            
-            # Get entity context
+            supporting_chunk = self._find_supporting_chunk(entity, chunks)
+            prompt = self._build_entity_prompt(entity, entity_type, supporting_chunk)
+            return prompt, (prompt[0], canonical_item_json(entity), chunk_text(supporting_chunk))
+        
+        return build_prompt
+    
+    def _relationship_prompt_builder(self, entities: Dict[str, List[Dict]], chunks: List[Dict] = None) -> Callable[[Dict], Tuple[Tuple[str, str], Tuple[str, ...]]]:
+        """Get a function that builds the critic prompt and duplicate key of a relationship"""
+        # Create entity lookup for context
+        entity_lookup = self._build_entity_lookup(entities)
+        
+        def build_prompt(relationship: Dict) -> Tuple[Tuple[str, str], Tuple[str, ...]]:
+            # Find supporting chunk and entity context if available
             source_entity = entity_lookup.get(relationship.get("source_id"))
             target_entity = entity_lookup.get(relationship.get("target_id"))
+            supporting_chunk = self._find_supporting_chunk(relationship, chunks)
+            prompt = self._build_relationship_prompt(relationship, source_entity, target_entity, supporting_chunk)
+            return prompt, (prompt[0], canonical_item_json(relationship), canonical_item_json(source_entity),
+                            canonical_item_json(target_entity), chunk_text(supporting_chunk))
+        
+        return build_prompt
+    
+    def _evaluate_items(self, executor: ThreadPoolExecutor, items: List[Dict],
+                        build_prompt: Callable[[Dict], Tuple[Tuple[str, str], Tuple[str, ...]]],
+                        task_description: str) -> Iterator[Dict]:
+        """
+        Submit the critic calls for a list of items, up to items_per_request items per call
+        
+        Items with the same duplicate key, e.g. the same entity extracted from the same text
+        of several documents, are evaluated once and each gets its own copy of the evaluation.
+        
+        Args:
+            executor: Thread pool to run the calls on
+            items: Entities or relationships whose prompts share the same instructions
+            build_prompt: Function that builds an item's (instructions, details) prompt and its
+                duplicate key, which leaves out the item's ID and provenance
+            task_description: Description of the evaluation for log messages
             
-            evaluation = self._evaluate_single_relationship(
-                relationship, source_entity, target_entity, supporting_chunk
-            )
+        Returns:
+            Iterator over the evaluations, in the order of items. The calls are submitted
+            before this returns, so the caller can submit more work before consuming it
+        """
+        # Only the first item with each duplicate key is evaluated
+        prompts = {}
+        keys = []
+        for item in items:
+            prompt, key = build_prompt(item)
+            prompts.setdefault(key, prompt)
+            keys.append(key)
+        self._count_duplicate_items(len(keys) - len(prompts), task_description)
+        
+        unique_prompts = list(prompts.values())
+        size = self.items_per_request
+        groups = [unique_prompts[start:start + size] for start in range(0, len(unique_prompts), size)]
+        results = executor.map(lambda group: self._call_critic_llm_batch(group, task_description), groups)
+        
+        def evaluations() -> Iterator[Dict]:
+            by_key = dict(zip(prompts, itertools.chain.from_iterable(results)))
+            for key in keys:
+                yield dict(by_key[key])
+        
+        return evaluations()
+    
+    def _count_duplicate_items(self, count: int, task_description: str):
+        """Record items that share another item's evaluation, for the run statistics"""
+        if count:
+            self.duplicate_items_skipped += count
+            logger.info(f"{count} duplicate items share a {task_description}")
+    
+    def evaluate_relationships_batch(self, relationships: List[Dict], 
+                                     entities: Dict[str, List[Dict]], 
+                                     chunks: List[Dict] = None,
+                                     poll_interval: float = 30.0,
+                                     max_poll_interval: float = 300.0) -> List[Dict]:
+        """
+        Evaluate relationships with one Message Batches API job instead of a request each
+        
+        Args:
+            relationships: List of relationships
+            entities: Dictionary of entities by type, for the source and target context
+            chunks: Original document chunks (optional, for context)
+            poll_interval: Seconds to wait before the first batch status check
+            max_poll_interval: Longest wait between status checks as the wait backs off
+            
+        Returns:
+            Relationship evaluations, in the order of relationships
+        """
+        return self.evaluate_extraction_batch({}, relationships, entities, chunks, poll_interval, max_poll_interval)[1]
+    
+    def evaluate_extraction_batch(self, entities_to_evaluate: Dict[str, List[Dict]], 
+                                  relationships: List[Dict],
+                                  entities: Dict[str, List[Dict]], 
+                                  chunks: List[Dict] = None,
+                                  poll_interval: float = 30.0,
+                                  max_poll_interval: float = 300.0) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+        """
+        Evaluate entities and relationships with one Message Batches API job instead of a request each
+        
+        Batches cost less per token but complete asynchronously, so this suits full critic
+        runs rather than single evaluations. Cached evaluations are not resubmitted, and
+        requests that fail within the batch are retried with direct calls.
+        
+        Args:
+            entities_to_evaluate: Dictionary of the entities to evaluate by type
+            relationships: List of relationships
+            entities: Dictionary of all entities by type, for the relationships' source and target context
+            chunks: Original document chunks (optional, for context)
+            poll_interval: Seconds to wait before the first batch status check
+            max_poll_interval: Longest wait between status checks as the wait backs off
+            
+        Returns:
+            Tuple of (entity evaluations by type, relationship evaluations), in the order of the inputs
+        """
+        entity_count = sum(len(entity_list) for entity_list in entities_to_evaluate.values())
+        logger.info(f"Evaluating {entity_count} entities and {len(relationships)} relationships with the batch API")
+        
+        # Build every prompt up front, entities by type first and then relationships
+        prompts_and_keys = []
+        task_descriptions = []
+        for entity_type, entity_list in entities_to_evaluate.items():
+            build_prompt = self._entity_prompt_builder(entity_type, chunks)
+            prompts_and_keys.extend(build_prompt(entity) for entity in entity_list)
+            task_descriptions.extend([f"{entity_type} entity evaluation"] * len(entity_list))
+        
+        build_prompt = self._relationship_prompt_builder(entities, chunks)
+        prompts_and_keys.extend(build_prompt(relationship) for relationship in relationships)
+        task_descriptions.extend(["relationship evaluation"] * len(relationships))
+        
+        prompts = [prompt for prompt, _ in prompts_and_keys]
+        keys = [key for _, key in prompts_and_keys]
+        evaluations = self._evaluate_prompts_batch(prompts, keys, task_descriptions, poll_interval, max_poll_interval)
+        
+        position = 0
+        entity_evaluations = {}
+        for entity_type, entity_list in entities_to_evaluate.items():
+            entity_evaluations[entity_type] = evaluations[position:position + len(entity_list)]
+            for entity, evaluation in zip(entity_list, entity_evaluations[entity_type]):
+                evaluation["entity_id"] = entity.get("id")
+                evaluation["entity_type"] = entity_type
+            position += len(entity_list)
+        
+        relationship_evaluations = evaluations[position:]
+        for relationship, evaluation in zip(relationships, relationship_evaluations):
             evaluation["relationship_id"] = relationship.get("id")
+        
+        return entity_evaluations, relationship_evaluations
+    
+    def _evaluate_prompts_batch(self, prompts: List[Tuple[str, str]], keys: List[Tuple[str, ...]], task_descriptions: List[str],
+                                poll_interval: float, max_poll_interval: float) -> List[Dict]:
+        """Evaluate (instructions, details) critic prompts with one batch job, returning an evaluation per prompt"""
+        # Only the first prompt with each duplicate key is evaluated
+        first_positions = {}
+        for n, key in enumerate(keys):
+            first_positions.setdefault(key, n)
+        self._count_duplicate_items(len(keys) - len(first_positions), "batch critic evaluation")
+        
+        evaluations = {}
+        requests = {}
+        cache_keys = {}
+        positions = {}
+        for n in first_positions.values():
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self._critic_cache_key(prompts[n])
+                evaluation = self.cache.get(cache_key)
+                if evaluation is not None:
+                    evaluations[n] = evaluation
+                    continue
             
-            relationship_evaluations.append(evaluation)
+            # Entity and relationship IDs may not fit the batch API's custom ID format, so positions are used
+            custom_id = f"item-{n}"
+            requests[custom_id] = self._build_critic_request(prompts[n])
+            cache_keys[custom_id] = cache_key
+            positions[custom_id] = n
+        
+        if requests:
+            responses = run_message_batch(self.critic_llm_client, requests, poll_interval, max_poll_interval)
+            parsed = {
+                custom_id: self._parse_critic_response(content, task_descriptions[positions[custom_id]], cache_keys[custom_id])
+                for custom_id, content in responses.items()
+            }
             
-            # Rate limiting
-            time.sleep(0.3)
+            retry = []
+            for custom_id, n in positions.items():
+                evaluation = parsed.get(custom_id)
+                if evaluation is None:
+                    retry.append(n)
+                else:
+                    evaluations[n] = evaluation
+            
+            if retry:
+                logger.warning(f"{len(retry)} critic evaluations did not succeed in the batch, calling the critic directly")
+                with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                    for n, evaluation in zip(retry, executor.map(
+                            lambda n: self._call_critic_llm(prompts[n], task_descriptions[n]), retry)):
+                        evaluations[n] = evaluation
         
-        return relationship_evaluations
+        # Each item gets its own copy, since duplicates share an evaluation
+        return [dict(evaluations[first_positions[key]]) for key in keys]
+    
+    def _build_entity_lookup(self, entities: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+        """Index entities by ID"""
+        entity_lookup = {}
+        for entity_type, entity_list in entities.items():
+            for entity in entity_list:
+                entity_lookup[entity.get("id")] = entity
+        return entity_lookup
     
-    def _evaluate_single_entity(self, entity: Dict, entity_type: str, supporting_chunk: Dict = None) -> Dict:
-        """Evaluate a single entity using the critic LLM"""
+    def _build_entity_prompt(self, entity: Dict, entity_type: str, supporting_chunk: Dict = None) -> Tuple[str, str]:
+        """Build the critic prompt for a single entity as (static instructions, entity details)"""
         
         # Get entity name/title
         entity_name = entity.get("title" if entity_type == "event" else "name", "")
@@ -173,19 +532,10 @@ class KnowledgeGraphCritic:
         chunk_text = supporting_chunk.get("text", "") if supporting_chunk else ""
         supporting_text = entity.get("supporting_text", "")
         
-        critic_prompt = f"""
+        instructions = f"""
 You are an expert reviewer of entity extraction for a planetary health knowledge graph.
 
-Below is an extracted {entity_type.upper()} entity, along with the original text context and supporting text that was used for extraction.
-
-EXTRACTED {entity_type.upper()}:
-{json.dumps(entity, indent=2)}
-
-ORIGINAL TEXT CONTEXT:
-{chunk_text[:1000] + "..." if len(chunk_text) > 1000 else chunk_text}
-
-SUPPORTING TEXT:
-{supporting_text}
+After these instructions comes an extracted {entity_type.upper()} entity, along with the original text context and supporting text that was used for extraction.
 
 Please evaluate this {entity_type} extraction on the following criteria:
 
@@ -228,28 +578,33 @@ Respond in the following JSON format:
 }}
 """
         
-        return self._call_critic_llm(critic_prompt, f"{entity_type} entity evaluation")
+        details = f"""EXTRACTED {entity_type.upper()}:
+{json_utils.dumps(entity, indent=True)}
+
+ORIGINAL TEXT CONTEXT:
+{chunk_text[:1000] + "..." if len(chunk_text) > 1000 else chunk_text}
+
+SUPPORTING TEXT:
+{supporting_text}
+"""
+        
+        return (instructions, details)
     
-    def _evaluate_single_relationship(self, relationship: Dict, 
-                                    source_entity: Dict = None, 
-                                    target_entity: Dict = None,
-                                    supporting_chunk: Dict = None) -> Dict:
-        """Evaluate a single relationship using the critic LLM"""
+    def _build_relationship_prompt(self, relationship: Dict, 
+                                   source_entity: Dict = None, 
+                                   target_entity: Dict = None,
+                                   supporting_chunk: Dict = None) -> Tuple[str, str]:
+        """Build the critic prompt for a single relationship as (static instructions, relationship details)"""
         
         # Prepare context
         chunk_text = supporting_chunk.get("text", "") if supporting_chunk else ""
         
         # Entity context
-        source_context = f"Source Entity: {json.dumps(source_entity, indent=2)}" if source_entity else "Source Entity: Not found"
-        target_context = f"Target Entity: {json.dumps(target_entity, indent=2)}" if target_entity else "Target Entity: Not found"
+        source_context = f"Source Entity: {json_utils.dumps(source_entity, indent=True)}" if source_entity else "Source Entity: Not found"
+        target_context = f"Target Entity: {json_utils.dumps(target_entity, indent=True)}" if target_entity else "Target Entity: Not found"
         
-        critic_prompt = f"""
-You are an expert reviewer of relationship extraction for a planetary health knowledge graph.
-
-Below is an extracted RELATIONSHIP, along with the entities it connects and the original text context.
-
-EXTRACTED RELATIONSHIP:
-{json.dumps(relationship, indent=2)}
+        details = f"""EXTRACTED RELATIONSHIP:
+{json_utils.dumps(relationship, indent=True)}
 
 {source_context}
 
@@ -257,48 +612,9 @@ EXTRACTED RELATIONSHIP:
 
 ORIGINAL TEXT CONTEXT:
 {chunk_text[:1000] + "..." if len(chunk_text) > 1000 else chunk_text}
-
-Please evaluate this relationship extraction on the following criteria:
-
-1. **Evidence**: Is there clear evidence for this relationship in the text?
-2. **Entity Accuracy**: Are the source and target entities correctly identified?
-3. **Relationship Type**: Is the relationship type appropriate and accurate?
-4. **Direction**: Is the relationship direction correct (if applicable)?
-5. **Strength**: Is the relationship strength rating appropriate (1-5)?
-6. **Relevance**: Is this relationship relevant to planetary health?
-7. **Entity Existence**: Do both entities actually exist and are they well-defined?
-
-Respond in the following JSON format:
-{{
-  "evaluation": {{
-    "evidence_score": 1-5,
-    "entity_accuracy_score": 1-5,
-    "relationship_type_score": 1-5,
-    "direction_score": 1-5,
-    "strength_score": 1-5,
-    "relevance_score": 1-5,
-    "entity_existence_score": 1-5,
-    "overall_confidence": 1-5,
-    "extraction_quality": "excellent|good|fair|poor",
-    "issues_identified": [
-      {{
-        "issue_type": "evidence|entity_accuracy|relationship_type|direction|strength|relevance|entity_existence",
-        "description": "Specific description of the issue",
-        "severity": 1-5,
-        "suggested_correction": "suggested fix (if applicable)"
-      }}
-    ],
-    "strengths": [
-      "List of strengths in this extraction"
-    ],
-    "human_review_recommended": true|false,
-    "human_review_reason": "Explanation if review is recommended",
-    "confidence_explanation": "Why this confidence score was assigned"
-  }}
-}}
 """
         
-        return self._call_critic_llm(critic_prompt, "relationship evaluation")
+        return (RELATIONSHIP_CRITIC_INSTRUCTIONS, details)
     
     def _get_entity_specific_criteria(self, entity_type: str) -> str:
         """Get entity-type-specific evaluation criteria"""
@@ -340,46 +656,158 @@ Respond in the following JSON format:
         }
         return criteria.get(entity_type, "")
     
-    def _call_critic_llm(self, prompt: str, task_description: str) -> Dict:
-        """Call the critic LLM and parse the response"""
+    def _call_critic_llm(self, prompt: Tuple[str, str], task_description: str) -> Dict:
+        """Call the critic LLM with an (instructions, details) prompt and parse the response"""
+        # Return the cached evaluation if this exact prompt was already evaluated
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._critic_cache_key(prompt)
+            cached_evaluation = self.cache.get(cache_key)
+            if cached_evaluation is not None:
+                return cached_evaluation
+        
         try:
-            response = self.critic_llm_client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=4000,
-                system="You are a critical evaluator of knowledge graph extractions. Provide detailed, constructive evaluation with specific scores and actionable feedback.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2
-            )
-
-            content = response.content[0].text.strip()
+            response = self.critic_llm_client.messages.create(**self._build_critic_request(prompt))
+            return self._parse_critic_response(response_content(response), task_description, cache_key)
+                
+        except Exception as e:
+            logger.error(f"Error calling critic LLM for {task_description}: {str(e)}")
+            return self._create_fallback_evaluation(f"Error calling critic LLM: {str(e)}")
+    
+    def _call_critic_llm_batch(self, prompts: List[Tuple[str, str]], task_description: str) -> List[Dict]:
+        """
+        Evaluate several (instructions, details) prompts that share their instructions with a single call
+        
+        Each evaluation is cached under the same key as when its prompt is evaluated alone.
+        Items the response leaves out, or all of them if the call fails, are evaluated
+        individually with _call_critic_llm instead.
+        
+        Args:
+            prompts: Critic prompts with identical instructions
+            task_description: Description of the evaluation for log messages
+            
+        Returns:
+            Evaluations, in the order of prompts
+        """
+        if len(prompts) == 1:
+            return [self._call_critic_llm(prompts[0], task_description)]
+        
+        evaluations = [None] * len(prompts)
+        cache_keys = [None] * len(prompts)
+        if self.cache is not None:
+            for n, prompt in enumerate(prompts):
+                cache_keys[n] = self._critic_cache_key(prompt)
+                evaluations[n] = self.cache.get(cache_keys[n])
+        
+        pending = [n for n, evaluation in enumerate(evaluations) if evaluation is None]
+        if len(pending) > 1:
+            try:
+                response = self.critic_llm_client.messages.create(
+                    **self._build_batched_critic_request([prompts[n] for n in pending])
+                )
+                parsed = self._parse_batched_critic_response(response_content(response), len(pending), task_description)
+                for n, evaluation in zip(pending, parsed):
+                    if evaluation is not None:
+                        evaluations[n] = evaluation
+                        if cache_keys[n] is not None:
+                            self.cache.set(cache_keys[n], evaluation)
+            
+            except Exception as e:
+                logger.error(f"Error calling critic LLM for batched {task_description}: {str(e)}")
             
+            missing = sum(1 for n in pending if evaluations[n] is None)
+            if missing:
+                logger.warning(f"Batched critic response is missing {missing} of {len(pending)} items, evaluating them individually")
+        
+        for n in pending:
+            if evaluations[n] is None:
+                evaluations[n] = self._call_critic_llm(prompts[n], task_description)
+        
+        return evaluations
+    
+    def _critic_cache_key(self, prompt: Tuple[str, str]) -> str:
+        """Cache key of the evaluation for an (instructions, details) critic prompt"""
+        return self.cache.make_key("critic", DEFAULT_MODEL, CRITIC_SYSTEM_PROMPT, *prompt)
+    
+    def _build_critic_request(self, prompt: Tuple[str, str]) -> Dict:
+        """Keyword arguments for the messages.create call that evaluates an (instructions, details) critic prompt"""
+        instructions, details = prompt
+        return {
+            "model": DEFAULT_MODEL,
+            "max_tokens": 4000,
+            "system": get_system_blocks(CRITIC_SYSTEM_PROMPT),
+            "messages": [
+                # The static instructions come first and are cacheable; only the details vary per item
+                {"role": "user", "content": [
+                    {"type": "text", "text": instructions, "cache_control": CACHE_CONTROL},
+                    {"type": "text", "text": details}
+                ]}
+            ],
+            "tools": [CRITIC_TOOL],
+            "tool_choice": {"type": "tool", "name": CRITIC_TOOL["name"]},
+            "temperature": 0.2
+        }
+    
+    def _build_batched_critic_request(self, prompts: List[Tuple[str, str]]) -> Dict:
+        """Keyword arguments for the messages.create call that evaluates several prompts sharing their instructions"""
+        instructions = prompts[0][0] + BATCHED_CRITIC_INSTRUCTIONS
+        details = "\n".join(f"--- ITEM {n} ---\n{details}" for n, (_, details) in enumerate(prompts))
+        return {
+            **self._build_critic_request((instructions, details)),
+            "max_tokens": BATCHED_CRITIC_MAX_TOKENS,
+            "tools": [BATCHED_CRITIC_TOOL],
+            "tool_choice": {"type": "tool", "name": BATCHED_CRITIC_TOOL["name"]}
+        }
+    
+    def _parse_batched_critic_response(self, response: Union[str, Dict], item_count: int, task_description: str) -> List[Optional[Dict]]:
+        """Parse the evaluations from a batched critic LLM response, with None for items it leaves out"""
+        evaluations = [None] * item_count
+        if isinstance(response, dict):
+            result = response
+        else:
+            try:
+                result = json_utils.loads_json_object(json_utils.extract_json_text(response.strip()))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse batched critic response for {task_description}: {str(e)}")
+                return evaluations
+        
+        entries = result.get("evaluations") if isinstance(result, dict) else None
+        for entry in entries or []:
+            if not isinstance(entry, dict):
+                continue
+            n = entry.get("item_index")
+            evaluation = entry.get("evaluation")
+            if isinstance(n, int) and 0 <= n < item_count and evaluations[n] is None and isinstance(evaluation, dict):
+                evaluations[n] = evaluation
+        
+        return evaluations
+    
+    def _parse_critic_response(self, response: Union[str, Dict], task_description: str, cache_key: Optional[str] = None) -> Dict:
+        """Parse the evaluation from a critic LLM response (tool input or raw text), caching it under cache_key if given"""
+        if isinstance(response, dict):
+            # Tool input arrives already parsed
+            result = response
+        else:
             # Parse JSON response
             try:
-                # Extract JSON from response
-                if "```json" in content:
-                    json_start = content.find("```json") + 7
-                    json_end = content.find("```", json_start)
-                    if json_end != -1:
-                        content = content[json_start:json_end].strip()
-                
-                # Find JSON object
-                json_start = content.find("{")
-                json_end = content.rfind("}")
-                if json_start != -1 and json_end != -1:
-                    content = content[json_start:json_end+1]
+                # Extract the JSON object, whether or not it is wrapped in a markdown code block
+                content = json_utils.extract_json_text(response.strip())
                 
-                result = json.loads(content)
-                return result.get("evaluation", {})
+                result = json_utils.loads_json_object(content)
                 
             except json.JSONDecodeError as e:
                 logger.warning(f"Failed to parse critic response for {task_description}: {str(e)}")
                 return self._create_fallback_evaluation("Failed to parse critic response")
-                
-        except Exception as e:
-            logger.error(f"Error calling critic LLM for {task_description}: {str(e)}")
-            return self._create_fallback_evaluation(f"Error calling critic LLM: {str(e)}")
+        
+        evaluation = result.get("evaluation") if isinstance(result, dict) else None
+        if not isinstance(evaluation, dict):
+            logger.warning(f"Critic response for {task_description} has no evaluation")
+            return self._create_fallback_evaluation("Critic response has no evaluation")
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, evaluation)
+        
+        return evaluation
     
     def _create_fallback_evaluation(self, reason: str) -> Dict:
         """Create a fallback evaluation when critic fails"""
@@ -582,13 +1010,11 @@ def save_critic_results(results: Dict, output_dir: str, base_filename: str) -> D
     
     # Save complete results
     complete_path = os.path.join(output_dir, f"{base_filename}_critic_evaluation.json")
-    with open(complete_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    json_utils.write_json(complete_path, results)
     
     # Save review tasks
     tasks_path = os.path.join(output_dir, f"{base_filename}_review_tasks.json") 
-    with open(tasks_path, 'w', encoding='utf-8') as f:
-        json.dump({"review_tasks": results["review_tasks"]}, f, indent=2, ensure_ascii=False)
+    json_utils.write_json(tasks_path, {"review_tasks": results["review_tasks"]})
     
     # Save summary report
     summary_path = os.path.join(output_dir, f"{base_filename}_quality_report.json")
@@ -596,8 +1022,7 @@ def save_critic_results(results: Dict, output_dir: str, base_filename: str) -> D
         "overall_assessment": results["overall_assessment"],
         "statistics": results["statistics"]
     }
-    with open(summary_path, 'w', encoding='utf-8') as f:
-        json.dump(summary, f, indent=2, ensure_ascii=False)
+    json_utils.write_json(summary_path, summary)
     
     return {
         "complete_evaluation": complete_path,
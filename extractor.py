@@ -1,9 +1,9 @@
 import os
-import json
 import logging
 import tempfile
 from typing import Dict, List, Optional, Any, Union, Tuple
 import re
+import json_utils
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -582,8 +582,7 @@ class DocumentExtractor:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
             # Save to file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(chunks, f, indent=2)
+            json_utils.write_json(output_path, chunks)
             
             logger.info(f"Saved {len(chunks)} chunks to JSON: {output_path}")
             
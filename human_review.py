@@ -14,6 +14,15 @@ import urllib.parse
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Bootstrap text classes for issue severities (1-5)
+SEVERITY_CLASSES = {
+    5: "text-danger",
+    4: "text-danger",
+    3: "text-warning",
+    2: "text-info",
+    1: "text-muted"
+}
+
 class ReviewTask:
     """Class representing a human review task"""
     
@@ -263,6 +272,62 @@ class ReviewManager:
             logger.error(f"Error exporting corrected data: {str(e)}")
             return ""
 
+def render_reviewed_task_row(task: ReviewTask) -> str:
+    """
+    Render a table row for a reviewed task in the task list
+
+    Args:
+        task: Reviewed ReviewTask object
+
+    Returns:
+        HTML table row
+    """
+    return f"""
+            <tr>
+                <td>{task.task_id[:8]}...</td>
+                <td>{task.document_metadata.get("section_title", "Unknown")}</td>
+                <td>{task.reviewed_at}</td>
+                <td><a href="/task?id={task.task_id}" class="btn btn-sm btn-secondary">View</a></td>
+            </tr>
+            """
+
+def render_issues(issues: List[Dict[str, Any]]) -> str:
+    """
+    Render the highlighted issues of a task as HTML
+
+    Args:
+        issues: Highlighted issues from the critic evaluation
+
+    Returns:
+        HTML fragment with one block per issue
+    """
+    parts = []
+    for issue in issues:
+        severity_class = SEVERITY_CLASSES.get(issue.get("severity", 3), "")
+        entity_affected = issue.get("entity_affected")
+        affects_html = f'<br><small>Affects: {entity_affected}</small>' if entity_affected else ''
+        
+        parts.append(f"""
+            <div class="mb-2">
+                <strong class="{severity_class}">{issue.get("issue_type", "Issue").capitalize()}:</strong>
+                <span>{issue.get("description", "")}</span>
+                {affects_html}
+            </div>
+            """)
+    return "".join(parts)
+
+def render_questions(questions: List[str]) -> str:
+    """
+    Render the review questions of a task as HTML list items
+
+    Args:
+        questions: Review questions
+
+    Returns:
+        HTML fragment with one <li> per question
+    """
+    return "".join([f"<li>{question}</li>" for question in questions])
+
 class ReviewServer(BaseHTTPRequestHandler):
     """HTTP server for human review interface"""
     
@@ -471,16 +536,7 @@ class ReviewServer(BaseHTTPRequestHandler):
         reviewed_tasks = self.review_manager.get_reviewed_tasks()
         
         # Generate reviewed task list HTML
-        reviewed_task_list_html = ""
-        for task in reviewed_tasks:
-            reviewed_task_list_html += f"""
-            <tr>
-                <td>{task.task_id[:8]}...</td>
-                <td>{task.document_metadata.get("section_title", "Unknown")}</td>
-                <td>{task.reviewed_at}</td>
-                <td><a href="/task?id={task.task_id}" class="btn btn-sm btn-secondary">View</a></td>
-            </tr>
-            """
+        reviewed_task_list_html = "".join(map(render_reviewed_task_row, reviewed_tasks))
         
         html = f"""
         <!DOCTYPE html>
@@ -600,28 +656,10 @@ class ReviewServer(BaseHTTPRequestHandler):
         extracted_data_json = json.dumps(task.extracted_data, indent=2)
         
         # Format the highlighted issues
-        issues_html = ""
-        for issue in task.highlighted_issues:
-            severity_class = {
-                5: "text-danger",
-                4: "text-danger",
-                3: "text-warning",
-                2: "text-info",
-                1: "text-muted"
-            }.get(issue.get("severity", 3), "")
-            
-            issues_html += f"""
-            <div class="mb-2">
-                <strong class="{severity_class}">{issue.get("issue_type", "Issue").capitalize()}:</strong>
-                <span>{issue.get("description", "")}</span>
-                {f'<br><small>Affects: {issue.get("entity_affected", "")}</small>' if issue.get("entity_affected") else ''}
-            </div>
-            """
+        issues_html = render_issues(task.highlighted_issues)
         
         # Format the review questions
-        questions_html = ""
-        for question in task.review_questions:
-            questions_html += f"<li>{question}</li>"
+        questions_html = render_questions(task.review_questions)
         
         # Determine if the task is editable
         is_editable = task.status == "pending_review"
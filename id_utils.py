@@ -0,0 +1,20 @@
+import itertools
+import uuid
+
+# Random prefix that makes IDs unique across runs
+RUN_PREFIX = uuid.uuid4().hex[:12]
+
+# Counter that makes IDs unique within a run (next() on itertools.count is thread-safe under the GIL)
+_id_counter = itertools.count()
+
+def new_id() -> str:
+    """
+    Generate a unique ID for an entity or relationship
+    
+    IDs combine a random per-run prefix with a counter, avoiding a urandom read
+    and UUID formatting for every entity.
+    
+    Returns:
+        Unique ID string
+    """
+    return f"{RUN_PREFIX}-{next(_id_counter):08x}"
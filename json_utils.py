@@ -0,0 +1,373 @@
+import io
+import json
+import logging
+import mmap
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Matches the first JSON object inside a markdown code block
+JSON_CODE_BLOCK_PATTERN = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+# Matches the outermost braces, for responses without a code block
+JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+
+# Characters that change the structure of a JSON document being scanned
+JSON_STRUCTURE_PATTERN = re.compile(r'[{}"\\]')
+
+# Decoder for parsing the first JSON value in text that continues after it
+JSON_DECODER = json.JSONDecoder()
+
+# Files at least this large are parsed by orjson from a memory map; mapping smaller files costs more than reading them
+MMAP_MIN_BYTES = 16 * 1024 * 1024
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document, using orjson when it is installed
+
+    Args:
+        data: JSON text as str or UTF-8 bytes
+
+    Returns:
+        Parsed JSON value
+
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON (orjson's error is a subclass)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def extract_json_text(content: str) -> str:
+    """
+    Extract the JSON object text from an LLM response
+
+    Handles responses wrapped in ```json / ``` code blocks as well as bare objects
+    surrounded by prose. A code block is taken first, since braces in the prose before
+    it would otherwise be mistaken for the start of the object.
+
+    Args:
+        content: Raw LLM response text
+
+    Returns:
+        The JSON object text, or the content unchanged if no object was found
+    """
+    match = JSON_CODE_BLOCK_PATTERN.search(content)
+    if match:
+        return match.group(1)
+
+    match = JSON_OBJECT_PATTERN.search(content)
+    return match.group() if match else content
+
+def loads_json_object(content: str) -> Any:
+    """
+    Parse the JSON object text extracted from an LLM response
+
+    When the text does not parse as a whole, e.g. because prose with braces follows the
+    object, the first complete object is decoded instead, in the same pass that finds its end.
+
+    Args:
+        content: JSON text, usually from extract_json_text
+        
+    Returns:
+        Parsed JSON value
+        
+    Raises:
+        json.JSONDecodeError: If the text does not start a valid JSON object
+    """
+    try:
+        return loads(content)
+    except json.JSONDecodeError as error:
+        start = content.find("{")
+        if start < 0:
+            raise
+        try:
+            return JSON_DECODER.raw_decode(content, start)[0]
+        except json.JSONDecodeError:
+            raise error
+
+class JsonObjectScanner:
+    """
+    Finds where the first top-level JSON object ends in text that arrives in pieces
+    
+    Used to stop reading a streamed LLM response once its JSON object is complete,
+    instead of waiting for any commentary the model writes after it. Balanced braces
+    that do not parse as JSON, e.g. a placeholder in the prose before the object, are
+    skipped and scanning continues after them. Once the object is complete, its text is
+    in object_text.
+    """
+    
+    def __init__(self):
+        """Initialize the scanner before any text has been seen"""
+        self.escape_pending = False
+        self._reset()
+    
+    def _reset(self):
+        """Forget the object being scanned, to look for the next one"""
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.object_parts = []
+        self.object_text = None
+    
+    def feed(self, text: str) -> Optional[int]:
+        """
+        Scan the next piece of text
+        
+        Args:
+            text: Next piece of the response
+            
+        Returns:
+            Offset in this piece just after the closing brace of the first top-level
+            object, or None if the object is not complete yet
+        """
+        # A backslash at the end of the previous piece escapes the first character of this one
+        skip_until = 1 if self.escape_pending else 0
+        self.escape_pending = False
+        
+        # Offset in this piece where the current object's text starts
+        object_start = 0 if self.started else None
+        
+        for match in JSON_STRUCTURE_PATTERN.finditer(text):
+            pos = match.start()
+            if pos < skip_until:
+                continue
+            char = match.group()
+            
+            if self.in_string:
+                if char == '\\':
+                    if pos + 1 == len(text):
+                        self.escape_pending = True
+                    skip_until = pos + 2
+                elif char == '"':
+                    self.in_string = False
+            elif char == '{':
+                if not self.started:
+                    self.started = True
+                    object_start = pos
+                self.depth += 1
+            elif self.started:
+                # Quotes and braces in any prose before the object are ignored
+                if char == '"':
+                    self.in_string = True
+                elif char == '}':
+                    self.depth -= 1
+                    if self.depth == 0:
+                        self.object_parts.append(text[object_start:pos + 1])
+                        object_text = "".join(self.object_parts)
+                        try:
+                            loads(object_text)
+                        except json.JSONDecodeError:
+                            self._reset()
+                            object_start = None
+                            continue
+                        self.object_text = object_text
+                        return pos + 1
+        
+        if self.started:
+            self.object_parts.append(text[object_start:])
+        return None
+
+def read_json(path: str) -> Any:
+    """
+    Read a JSON file, using orjson when it is installed
+
+    The file is read as bytes and parsed in one call, which skips a separate UTF-8
+    decoding pass. Large files are memory-mapped instead when orjson is installed, so
+    they are parsed without first being copied into a bytes object.
+
+    Args:
+        path: Path of the JSON file
+
+    Returns:
+        Parsed JSON value
+    """
+    with open(path, 'rb') as f:
+        if orjson is not None and os.fstat(f.fileno()).st_size >= MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                return orjson.loads(view)
+        return loads(f.read())
+
+def iter_json_items(path: str, key: str) -> Iterator[Any]:
+    """
+    Iterate over the items of a JSON file's top-level list, or of the list under a key
+
+    With ijson installed the file is parsed incrementally, so items are yielded as they
+    are read and only the items the caller keeps stay in memory; otherwise the whole
+    file is loaded first.
+
+    Args:
+        path: Path of the JSON file
+        key: Key of the list when the top-level value is an object
+
+    Returns:
+        Iterator over the list items (empty if the object has no such key)
+    """
+    if ijson is None:
+        data = read_json(path)
+        yield from data if isinstance(data, list) else data.get(key, [])
+        return
+
+    with open(path, 'rb') as f:
+        # The first non-whitespace byte tells whether the document is a list or an object
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+
+        prefix = "item" if first == b'[' else f"{key}.item"
+        yield from ijson.items(f, prefix, use_float=True)
+
+def iter_json_object(path: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Iterate over the key/value pairs of a JSON file's top-level object
+
+    With ijson installed the file is parsed incrementally, so each value is built
+    only when its key is reached and no token stream of the whole document is held
+    at once; otherwise the whole file is loaded first.
+
+    Args:
+        path: Path of the JSON file
+
+    Returns:
+        Iterator over (key, value) pairs in file order
+    """
+    if ijson is None:
+        yield from read_json(path).items()
+        return
+
+    with open(path, 'rb') as f:
+        yield from ijson.kvitems(f, '', use_float=True)
+
+def write_json(path: str, data: Any):
+    """
+    Write data to a JSON file with 2-space indentation, using orjson when it is installed
+
+    Args:
+        path: Path of the output file
+        data: JSON-serializable data
+    """
+    if orjson is not None:
+        try:
+            content = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError as e:
+            # orjson is stricter than json (e.g. integers above 64 bits), so fall back for those values
+            logger.debug(f"orjson could not serialize data for {path}, falling back to json: {str(e)}")
+        else:
+            with open(path, 'wb') as f:
+                f.write(content)
+            return
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def recover_list_items(content: str, keys: List[str]) -> Dict[str, List[Any]]:
+    """
+    Recover the complete items of top-level lists from truncated or malformed JSON
+
+    Uses ijson's incremental parser, which yields every list item that was fully emitted
+    before the point where the document breaks off (e.g. a response cut at max_tokens).
+
+    Args:
+        content: JSON text that failed to parse as a whole
+        keys: Top-level keys whose list items should be recovered
+
+    Returns:
+        Dictionary of recovered items by key (empty if ijson is not installed)
+    """
+    if ijson is None:
+        return {}
+
+    data = content.encode("utf-8")
+    recovered = {}
+    for key in keys:
+        items = []
+        try:
+            for item in ijson.items(io.BytesIO(data), f"{key}.item", use_float=True):
+                items.append(item)
+        except ijson.JSONError:
+            pass
+
+        if items:
+            recovered[key] = items
+
+    return recovered
+
+def dumps(data: Any, indent: bool = False, sort_keys: bool = False, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    Serialize a value to JSON text, using orjson when it is installed
+
+    Args:
+        data: JSON-serializable data
+        indent: Whether to indent with 2 spaces
+        sort_keys: Whether to sort object keys
+        default: Function that converts values JSON cannot represent
+
+    Returns:
+        JSON document as str
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(data, default=default, option=option).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(data, indent=2 if indent else None, sort_keys=sort_keys, default=default, ensure_ascii=False)
+
+def dumps_bytes(data: Any) -> bytes:
+    """
+    Serialize a value to compact UTF-8 JSON, using orjson when it is installed
+    
+    Args:
+        data: JSON-serializable data
+        
+    Returns:
+        JSON document as bytes
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+def write_json_lists(path: str, sections: Iterable[Tuple[str, List[Any]]]):
+    """
+    Write a JSON object whose values are lists, serializing one item at a time
+    
+    Only one item is serialized in memory at a time, instead of the whole document,
+    which keeps memory flat when writing large knowledge graphs. Each item is written
+    compactly on its own line.
+    
+    Args:
+        path: Path of the output file
+        sections: (key, list of items) pairs, in output order
+    """
+    with open(path, 'wb') as f:
+        f.write(b'{')
+        for section_index, (key, items) in enumerate(sections):
+            if section_index:
+                f.write(b',')
+            f.write(b'\n  ' + dumps_bytes(key) + b': [')
+            for item_index, item in enumerate(items):
+                f.write(b',\n    ' if item_index else b'\n    ')
+                f.write(dumps_bytes(item))
+            f.write(b'\n  ]' if items else b']')
+        f.write(b'\n}\n')
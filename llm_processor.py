@@ -1,13 +1,29 @@
 import argparse
+import bisect
+import contextlib
+import csv
+import importlib.util
+import itertools
 import json
 import logging
 import os
 import sys
-import uuid
-from typing import Dict, List, Optional, Any, Union
-import time
-import re
-from relationship_processor import RelationshipProcessor
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Set, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from id_utils import new_id
+from llm_utils import (DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_MODEL, AdaptiveConcurrencyLimiter,
+                       create_anthropic_client, default_concurrency, run_message_batch)
+import json_utils
+from prompt_utils import build_batch_chunk, build_prompt_content, get_system_blocks
+from relationship_processor import (BATCHED_RELATIONSHIP_PROMPT, RELATIONSHIP_BATCH_SIZE, RELATIONSHIP_EXTRACTION_PROMPT,
+                                    RELATIONSHIP_SYSTEM_PROMPT, RelationshipProcessor)
+from response_cache import ResponseCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -180,6 +196,130 @@ Respond in the following JSON format:
 }}
 """
 
+COMBINED_EXTRACTION_PROMPT = """
+Analyze the following text from a document about planetary health and identify any EVENTS, ACTORS, CONCEPTS, PUBLICATIONS and LOCATIONS mentioned.
+- Events: significant events with title (required), year (required), description (required), type (Publication, Conference, Policy, Research, Movement, Organization, Other), significance (1-5 scale), start/end dates (if mentioned), associated locations, key actors involved and related concepts
+- Actors: individuals, organizations, institutions, or other entities that participate in the planetary health movement, with name (required), type (Individual, Institution, Government, NGO, Coalition, Other), description, role in planetary health, country/location, expertise/fields and affiliations
+- Concepts: theories, ideas, frameworks, or terms relevant to planetary health, with name (required), definition/explanation (required), alternative names/synonyms, related domains/fields, significance (1-5 scale), related concepts and key proponents
+- Publications: books, articles, reports, or other published materials, with title (required), type (Journal Article, Book, Report, Policy Document, Other), year (required if mentioned), authors, publisher/journal, DOI/ISBN (if mentioned), abstract/summary and significance (1-5 scale)
+- Locations: countries, cities, regions, or specific places relevant to planetary health events, with name (required), type (Country, City, Region, Institution, Other), country (if not a country itself), description/context and significance to planetary health
+For every entity also include supporting text (required) - the exact excerpt from the text that mentions and supports the extraction.
+Use an empty list for entity types that are not mentioned.
+
+Text to analyze:
+{text}
+
+Respond in the following JSON format:
+{{
+  "events": [
+    {{
+      "title": "Event title",
+      "year": YYYY,
+      "description": "Detailed description",
+      "type": "Event type",
+      "significance": N,
+      "dates": {{"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}},
+      "locations": ["Location names"],
+      "actors": ["Actor names"],
+      "concepts": ["Concept names"],
+      "supporting_text": "The exact text excerpt that mentions and supports this event extraction"
+    }}
+  ],
+  "actors": [
+    {{
+      "name": "Actor name",
+      "type": "Actor type",
+      "description": "Description of the actor",
+      "role": "Role in planetary health",
+      "country": "Country code or name",
+      "expertise": ["Field 1", "Field 2"],
+      "affiliations": ["Affiliated organization 1", "Affiliated organization 2"],
+      "supporting_text": "The exact text excerpt that mentions this actor"
+    }}
+  ],
+  "concepts": [
+    {{
+      "name": "Concept name",
+      "definition": "Definition or explanation",
+      "alternative_names": ["Synonym 1", "Synonym 2"],
+      "domain": ["Field 1", "Field 2"],
+      "significance": N,
+      "related_concepts": ["Related concept 1", "Related concept 2"],
+      "key_proponents": ["Proponent 1", "Proponent 2"],
+      "supporting_text": "The exact text excerpt that mentions this concept"
+    }}
+  ],
+  "publications": [
+    {{
+      "title": "Publication title",
+      "type": "Publication type",
+      "year": YYYY,
+      "authors": ["Author 1", "Author 2"],
+      "publisher": "Publisher or journal name",
+      "identifier": "DOI or ISBN",
+      "abstract": "Brief summary",
+      "significance": N,
+      "supporting_text": "The exact text excerpt that mentions this publication"
+    }}
+  ],
+  "locations": [
+    {{
+      "name": "Location name",
+      "type": "Location type",
+      "country": "Country name or code",
+      "description": "Description or context",
+      "significance": "Why this location is significant to planetary health",
+      "supporting_text": "The exact text excerpt that mentions this location"
+    }}
+  ]
+}}
+"""
+
+# Output token budget for the combined prompt, which returns all entity types at once
+COMBINED_MAX_TOKENS = 16000
+
+# Combined prompt for several short chunks at once, with one set of entity lists per chunk.
+# Built from the combined prompt so both always ask for the same entity fields
+_COMBINED_INSTRUCTIONS, _COMBINED_SCHEMA = COMBINED_EXTRACTION_PROMPT.split("Respond in the following JSON format:\n")
+BATCHED_EXTRACTION_PROMPT = (
+    _COMBINED_INSTRUCTIONS.replace(
+        "Use an empty list for entity types that are not mentioned.\n",
+        "The text consists of several chunks, each starting with a \"--- CHUNK N ---\" marker. "
+        "Extract the entities of each chunk separately, and use an empty list for entity types "
+        "that are not mentioned in a chunk.\n"
+    )
+    + "Respond in the following JSON format, with one entry per chunk, where chunk_index is "
+    + "the N from the chunk's marker and each entry holds the entity lists for that chunk:\n"
+    + "{{\n  \"chunks\": [\n    {{\n      \"chunk_index\": N,\n"
+    + "".join(f"    {line}\n" for line in _COMBINED_SCHEMA.strip().splitlines()[1:-1])
+    + "    }}\n  ]\n}}\n"
+)
+
+# Minimum number of chunks for --use-batch-api to submit a batch job rather than call the API directly
+BATCH_API_MIN_CHUNKS = 5
+
+# Combined prompt that also extracts the relationships between the entities, so each chunk
+# needs a single LLM call. Built from the combined and relationship prompts so the fields match
+FUSED_EXTRACTION_PROMPT = (
+    _COMBINED_INSTRUCTIONS.replace(
+        "For every entity also include supporting text",
+        "- Relationships: relationships between the entities above, such as Event influences Event, Actor participates in Event, "
+        "Event introduces Concept, Publication cites Publication, Actor develops Concept, Actor collaborates with Actor, "
+        "Concept relates to Concept and Event takes place at Location, with their strength (1-5)\n"
+        "For every entity and relationship also include supporting text"
+    )
+    + "Respond in the following JSON format:\n"
+    + _COMBINED_SCHEMA.rstrip()[:-len("}}")].rstrip() + ",\n"
+    + "".join(f"{line}\n" for line in RELATIONSHIP_EXTRACTION_PROMPT.split("Respond in the following JSON format:\n")[1].strip().splitlines()[1:-1])
+    + "}}\n"
+)
+
+# Short chunks are batched into one combined call up to this many characters (~6000 tokens)
+BATCH_MAX_CHARS = 24000
+
+# Maximum number of chunks in one batched call, to keep each response within COMBINED_MAX_TOKENS
+BATCH_MAX_CHUNKS = 4
+
 # Define entity types and their corresponding prompts
 ENTITY_PROMPTS = {
     "event": EVENT_EXTRACTION_PROMPT,
@@ -189,116 +329,421 @@ ENTITY_PROMPTS = {
     "location": LOCATION_EXTRACTION_PROMPT
 }
 
+# System prompt shared by all entity extraction calls
+ENTITY_SYSTEM_PROMPT = "You are an expert in extracting structured information about planetary health from academic texts. Always include supporting text that justifies each extraction."
+
+# Entity fields holding lists that are combined when entities are merged
+LIST_FIELDS = ["locations", "actors", "concepts", "expertise", "domain", "alternative_names", "authors"]
+
+# Minimum number of entities before resolve_entities spreads entity types over processes
+PARALLEL_RESOLVE_MIN_ENTITIES = 20000
+
+# Number of threads used to write result files in parallel
+SAVE_WORKERS = 8
+
+# Write buffer for entity CSV files, so large files reach the OS in few large writes
+CSV_BUFFER_SIZE = 1 << 20
+
+# Write buffer for the intermediate files written during a run, flushed after each chunk
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# CSV columns for each entity type as (header, entity field, max text length)
+CSV_COLUMNS = {
+    "event": [
+        ("Title", "title", None),
+        ("Year", "year", None),
+        ("Type", "type", None),
+        ("Significance", "significance", None),
+        ("Description", "description", 200),
+        ("Supporting_Text", "supporting_text", 300)
+    ],
+    "actor": [
+        ("Name", "name", None),
+        ("Type", "type", None),
+        ("Role", "role", None),
+        ("Country", "country", None),
+        ("Description", "description", 200),
+        ("Supporting_Text", "supporting_text", 300)
+    ],
+    "concept": [
+        ("Name", "name", None),
+        ("Definition", "definition", 200),
+        ("Significance", "significance", None),
+        ("Domain", "domain", None),
+        ("Supporting_Text", "supporting_text", 300)
+    ],
+    "publication": [
+        ("Title", "title", None),
+        ("Year", "year", None),
+        ("Type", "type", None),
+        ("Authors", "authors", None),
+        ("Publisher", "publisher", None),
+        ("Supporting_Text", "supporting_text", 300)
+    ],
+    "location": [
+        ("Name", "name", None),
+        ("Type", "type", None),
+        ("Country", "country", None),
+        ("Description", "description", 200),
+        ("Supporting_Text", "supporting_text", 300)
+    ]
+}
+
+class SupportingTextIndex:
+    """
+    Sentence index over a chunk's text for finding supporting text for entities
+    
+    The chunk is split and lowercased once, and the sentences containing each search
+    term are remembered, so looking up many entities in the same chunk does not rescan
+    every sentence per entity.
+    """
+    
+    def __init__(self, chunk_text: str):
+        """
+        Build the index for a chunk
+        
+        Args:
+            chunk_text: The original chunk text
+        """
+        self.chunk_text = chunk_text
+        self.sentences = chunk_text.split('. ')
+        self.sentences_lower = [sentence.lower() for sentence in self.sentences]
+        
+        # Sentences joined with a separator no search term contains, so a term is searched for
+        # across the whole chunk with str.find instead of a Python loop over the sentences
+        self._text = "\0".join(self.sentences)
+        self._text_lower = "\0".join(self.sentences_lower)
+        
+        # Lowercasing can change a sentence's length (e.g. 'İ' becomes two characters), so each
+        # joined text gets its own table of sentence offsets
+        self._sentence_starts = self._join_offsets(self.sentences)
+        self._lower_sentence_starts = self._join_offsets(self.sentences_lower)
+        
+        self._lower_index = {}
+        self._exact_index = {}
+    
+    @staticmethod
+    def _join_offsets(sentences: List[str]) -> List[int]:
+        """
+        Get the offset of each sentence in the sentences joined with a one-character separator
+        
+        Args:
+            sentences: Sentences in order
+            
+        Returns:
+            List of start offsets
+        """
+        starts = []
+        offset = 0
+        for sentence in sentences:
+            starts.append(offset)
+            offset += len(sentence) + 1
+        return starts
+    
+    def _search(self, text: str, starts: List[int], term: str) -> Set[int]:
+        """
+        Get the indices of the sentences in joined text that contain a term
+        
+        Args:
+            text: Joined sentences to search
+            starts: Start offsets of the sentences in text
+            term: Term to search for
+            
+        Returns:
+            Set of sentence indices
+        """
+        if not term:
+            return set(range(len(self.sentences)))
+        
+        indices = set()
+        pos = text.find(term)
+        while pos != -1:
+            idx = bisect.bisect_right(starts, pos) - 1
+            indices.add(idx)
+            
+            # Continue from the next sentence, since this one is already a match
+            if idx + 1 >= len(starts):
+                break
+            pos = text.find(term, starts[idx + 1])
+        return indices
+    
+    def find_lower(self, term: str) -> Set[int]:
+        """
+        Get the indices of the sentences containing a lowercase term
+        
+        Args:
+            term: Lowercase term to search for
+            
+        Returns:
+            Set of sentence indices
+        """
+        indices = self._lower_index.get(term)
+        if indices is None:
+            indices = self._search(self._text_lower, self._lower_sentence_starts, term)
+            self._lower_index[term] = indices
+        return indices
+    
+    def find_exact(self, term: str) -> Set[int]:
+        """
+        Get the indices of the sentences containing a term, case-sensitively
+        
+        Args:
+            term: Term to search for
+            
+        Returns:
+            Set of sentence indices
+        """
+        indices = self._exact_index.get(term)
+        if indices is None:
+            indices = self._search(self._text, self._sentence_starts, term)
+            self._exact_index[term] = indices
+        return indices
+
+@lru_cache(maxsize=64)
+def get_supporting_text_index(chunk_text: str) -> SupportingTextIndex:
+    """
+    Get the sentence index for a chunk, building it only once per chunk
+    
+    The index is shared by every response for the chunk, e.g. the separate per-entity-type
+    responses, so the chunk is split and lowercased once.
+    
+    Args:
+        chunk_text: The original chunk text
+        
+    Returns:
+        Sentence index for the chunk
+    """
+    return SupportingTextIndex(chunk_text)
+
 class LLMProcessor:
     """
     Process document chunks with an LLM to extract entities with supporting text
     """
     
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, cache_dir: Optional[str] = None):
         """
         Initialize the LLM processor
         
         Args:
             llm_client: Client for the primary LLM
+            cache_dir: Directory for the on-disk LLM response cache (optional)
         """
         self.llm_client = llm_client
-        self.relationship_processor = RelationshipProcessor(llm_client)
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.relationship_processor = RelationshipProcessor(llm_client, cache=self.cache)
         logger.info("Initialized LLMProcessor with supporting text extraction and relationship processing")
     
-    def process_chunk(self, chunk: Dict, prompt_template: str) -> Dict:
+    def process_chunk(self, chunk: Dict, prompt_template: str, max_tokens: int = 8000,
+                      add_supporting_text: bool = True) -> Dict:
         """
         Process a document chunk with the LLM using the specified prompt template
         
         Args:
             chunk: Document chunk with text and metadata
             prompt_template: Prompt template to use
+            max_tokens: Maximum number of tokens in the LLM response
+            add_supporting_text: Whether to fill in missing supporting text from the chunk text
             
         Returns:
             LLM response parsed as a dictionary
         """
         # Format prompt with chunk text
         try:
-            prompt = prompt_template.format(text=chunk["text"])
-        except KeyError as e:
+            request = self.build_entity_request(chunk, prompt_template, max_tokens)
+        except (KeyError, IndexError) as e:
             logger.error(f"Error formatting prompt: {str(e)}")
             return {"error": f"Error formatting prompt: {str(e)}"}
         
+        # Return the cached result if this template was already run on identical text
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.entity_cache_key(chunk, prompt_template)
+            cached_result = self.cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
+        
         try:
             # Call LLM API
-            response = self.llm_client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=8000,
-                system="You are an expert in extracting structured information about planetary health from academic texts. Always include supporting text that justifies each extraction.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1  # Low temperature for more deterministic extraction
-            )
-
-            # Get the raw response content
-            content = response.content[0].text.strip()
-            
-            # Parse response
-            try:
-                # Try to extract JSON from the response if it's wrapped in markdown code blocks
-                if "```json" in content:
-                    json_start = content.find("```json") + 7
-                    json_end = content.find("```", json_start)
-                    if json_end != -1:
-                        json_content = content[json_start:json_end].strip()
-                        content = json_content
-                elif "```" in content:
-                    json_start = content.find("```") + 3
-                    json_end = content.find("```", json_start)
-                    if json_end != -1:
-                        json_content = content[json_start:json_end].strip()
-                        content = json_content
-                
-                # Try to find JSON object in the content
-                json_start = content.find("{")
-                json_end = content.rfind("}")
-                if json_start != -1 and json_end != -1 and json_end > json_start:
-                    json_content = content[json_start:json_end+1].strip()
-                    content = json_content
-                
-                # Parse the JSON
-                result = json.loads(content)
-                
-                # Add fallback supporting text for any entities missing it
-                for entity_type, entities in result.items():
-                    if isinstance(entities, list):
-                        for entity in entities:
-                            if isinstance(entity, dict) and not entity.get("supporting_text"):
-                                entity["supporting_text"] = self._find_supporting_text(entity, entity_type, chunk["text"])
-                
-                return result
-            except json.JSONDecodeError as e:
-                logger.warning(f"Failed to parse LLM response as JSON: {str(e)}")
-                
-                # Try to extract any JSON-like structure from the response
-                content = response.content[0].text
-                
-                # Look for entity type keys in the response
-                entity_types = ["events", "actors", "concepts", "publications", "locations", "relationships"]
-                extracted_data = {}
-                
-                for entity_type in entity_types:
-                    if f'"{entity_type}"' in content or f"'{entity_type}'" in content:
-                        extracted_data[entity_type] = []
-                        logger.info(f"Found entity type '{entity_type}' in response")
-                
-                if extracted_data:
-                    logger.info(f"Extracted entity types from response: {list(extracted_data.keys())}")
-                    return extracted_data
-                else:
-                    logger.error(f"Could not extract any entity types from response")
-                    return {"error": "Failed to parse LLM response", "raw_response": content[:500] + "..." if len(content) > 500 else content}
-                
+            response_text = self._stream_json_response(**request)
+            return self.parse_entity_response(response_text, chunk, add_supporting_text, cache_key)
         except Exception as e:
             logger.error(f"Error calling LLM API: {str(e)}")
             return {"error": str(e)}
     
-    def _find_supporting_text(self, entity: Dict, entity_type: str, chunk_text: str) -> str:
+    def entity_cache_key(self, chunk: Dict, prompt_template: str) -> str:
+        """
+        Get the response cache key for extracting entities from a chunk with a prompt template
+        
+        Args:
+            chunk: Document chunk with text and metadata
+            prompt_template: Prompt template to use
+            
+        Returns:
+            Cache key
+        """
+        return self.cache.make_key("entities", DEFAULT_MODEL, ENTITY_SYSTEM_PROMPT, prompt_template, chunk["text"])
+    
+    def build_entity_request(self, chunk: Dict, prompt_template: str, max_tokens: int = 8000) -> Dict:
+        """
+        Build the messages API arguments for extracting entities from a chunk
+        
+        Args:
+            chunk: Document chunk with text and metadata
+            prompt_template: Prompt template to use
+            max_tokens: Maximum number of tokens in the LLM response
+            
+        Returns:
+            Keyword arguments for messages.create
+        """
+        return {
+            "model": DEFAULT_MODEL,
+            "max_tokens": max_tokens,
+            "system": get_system_blocks(ENTITY_SYSTEM_PROMPT),
+            "messages": [
+                {"role": "user", "content": build_prompt_content(prompt_template, chunk["text"])}
+            ],
+            "temperature": 0.1  # Low temperature for more deterministic extraction
+        }
+    
+    def parse_entity_response(self, response_text: str, chunk: Dict, add_supporting_text: bool = True,
+                              cache_key: Optional[str] = None) -> Dict:
+        """
+        Parse an entity extraction response
+        
+        Args:
+            response_text: Raw text of the LLM response
+            chunk: Document chunk the response is for
+            add_supporting_text: Whether to fill in missing supporting text from the chunk text
+            cache_key: Key to cache the parsed result under, if it parses completely
+            
+        Returns:
+            LLM response parsed as a dictionary
+        """
+        # Get the raw response content
+        content = response_text.strip()
+        
+        # Parse response
+        try:
+            # Extract the JSON object, unwrapping markdown code blocks if present
+            content = json_utils.extract_json_text(content)
+            
+            # Parse the JSON
+            result = json_utils.loads_json_object(content)
+            
+            # Add fallback supporting text for any entities missing it
+            if add_supporting_text:
+                self._add_missing_supporting_text(result, chunk["text"])
+            
+            if cache_key is not None:
+                self.cache.set(cache_key, result)
+            
+            return result
+        except json.JSONDecodeError as e:
+            logger.warning(f"Failed to parse LLM response as JSON: {str(e)}")
+            
+            entity_types = ["events", "actors", "concepts", "publications", "locations", "relationships"]
+            
+            # Recover the complete entities from a truncated or malformed response
+            recovered_data = json_utils.recover_list_items(content, entity_types)
+            if recovered_data:
+                logger.info(f"Recovered {sum(len(items) for items in recovered_data.values())} entities from partial JSON response")
+                if add_supporting_text:
+                    self._add_missing_supporting_text(recovered_data, chunk["text"])
+                return recovered_data
+            
+            # Try to extract any JSON-like structure from the response
+            content = response_text
+            
+            # Look for entity type keys in the response
+            extracted_data = {}
+            
+            for entity_type in entity_types:
+                if f'"{entity_type}"' in content or f"'{entity_type}'" in content:
+                    extracted_data[entity_type] = []
+                    logger.info(f"Found entity type '{entity_type}' in response")
+            
+            if extracted_data:
+                logger.info(f"Extracted entity types from response: {list(extracted_data.keys())}")
+                return extracted_data
+            else:
+                logger.error(f"Could not extract any entity types from response")
+                return {"error": "Failed to parse LLM response", "raw_response": content[:500] + "..." if len(content) > 500 else content}
+    
+    def process_chunk_batch(self, chunks: List[Dict]) -> List[Dict]:
+        """
+        Extract all entity types from several short chunks with a single LLM call
+        
+        Chunks the response leaves out, or all of them if the batched response cannot be
+        used, are processed individually with the combined prompt instead.
+        
+        Args:
+            chunks: Document chunks to process together
+            
+        Returns:
+            LLM response parsed as a dictionary for each chunk, in order
+        """
+        result = self.process_chunk(build_batch_chunk(chunks), BATCHED_EXTRACTION_PROMPT, COMBINED_MAX_TOKENS, add_supporting_text=False)
+        
+        results = [None] * len(chunks)
+        for chunk_result in result.get("chunks") or []:
+            if not isinstance(chunk_result, dict):
+                continue
+            n = chunk_result.pop("chunk_index", None)
+            if isinstance(n, int) and 0 <= n < len(chunks) and results[n] is None:
+                self._add_missing_supporting_text(chunk_result, chunks[n]["text"])
+                results[n] = chunk_result
+        
+        missing = [n for n, chunk_result in enumerate(results) if chunk_result is None]
+        if missing:
+            logger.warning(f"Batched response is missing {len(missing)} of {len(chunks)} chunks, processing them individually")
+            for n in missing:
+                results[n] = self.process_chunk(chunks[n], COMBINED_EXTRACTION_PROMPT, COMBINED_MAX_TOKENS)
+        
+        return results
+    
+    def _stream_json_response(self, **request) -> str:
+        """
+        Stream an LLM response, stopping as soon as its top-level JSON object is complete
+        
+        Any commentary the model adds after the JSON is not waited for. Responses without
+        a JSON object are read in full.
+        
+        Args:
+            request: Arguments for the Anthropic messages API
+            
+        Returns:
+            Text of the JSON object, or the full response text if it has no complete object
+        """
+        scanner = json_utils.JsonObjectScanner()
+        parts = []
+        with self.llm_client.messages.stream(**request) as stream:
+            for text in stream.text_stream:
+                if scanner.feed(text) is not None:
+                    # The closing code fence has not arrived, so only the object is returned
+                    return scanner.object_text
+                parts.append(text)
+        return "".join(parts)
+    
+    def _add_missing_supporting_text(self, result: Dict, chunk_text: str):
+        """
+        Add fallback supporting text to any entities in a parsed response that are missing it
+        
+        Args:
+            result: Parsed LLM response with entity lists by type
+            chunk_text: The original chunk text
+        """
+        index = None
+        for entity_type, entities in result.items():
+            if isinstance(entities, list):
+                for entity in entities:
+                    if isinstance(entity, dict) and not entity.get("supporting_text"):
+                        # Get the chunk's sentence index only if an entity needs it
+                        if index is None:
+                            index = get_supporting_text_index(chunk_text)
+                        entity["supporting_text"] = self._find_supporting_text(entity, entity_type, chunk_text, index=index)
+    
+    def _find_supporting_text(self, entity: Dict, entity_type: str, chunk_text: str,
+                              index: Optional[SupportingTextIndex] = None) -> str:
         """
         Find supporting text for an entity if not provided by LLM
         
@@ -306,10 +751,14 @@ class LLMProcessor:
             entity: The extracted entity
             entity_type: Type of entity (event, actor, concept, etc.)
             chunk_text: The original chunk text
+            index: Prebuilt sentence index for the chunk, shared across its entities
             
         Returns:
             Supporting text excerpt
         """
+        if index is None:
+            index = get_supporting_text_index(chunk_text)
+        
         # Get entity name/title for searching
         if entity_type == "event":
             name = entity.get("title", "").lower()
@@ -318,47 +767,148 @@ class LLMProcessor:
         
         year = str(entity.get("year", ""))
         
-        # Split text into sentences
-        sentences = chunk_text.split('. ')
-        
-        # Look for sentences containing key terms from the entity
-        supporting_sentences = []
-        
-        for sentence in sentences:
-            sentence_lower = sentence.lower()
-            
-            # Check if sentence contains entity name keywords or year
-            name_words = name.split()
-            if len(name_words) > 1:
-                # Check if sentence contains multiple words from name
-                matches = sum(1 for word in name_words if len(word) > 3 and word in sentence_lower)
-                if matches >= 2 or (year and year in sentence):
-                    supporting_sentences.append(sentence.strip())
-            elif name_words and len(name_words[0]) > 3 and name_words[0] in sentence_lower:
-                if year and year in sentence:
-                    supporting_sentences.append(sentence.strip())
+        # Look for sentences containing key terms from the entity or its year
+        name_words = name.split()
+        matched = set()
+        if len(name_words) > 1:
+            # Sentences must contain multiple words from the name (or the year)
+            word_counts = {}
+            for word in name_words:
+                if len(word) > 3:
+                    for idx in index.find_lower(word):
+                        word_counts[idx] = word_counts.get(idx, 0) + 1
+            matched = {idx for idx, count in word_counts.items() if count >= 2}
+            if year:
+                matched |= index.find_exact(year)
+        elif name_words and len(name_words[0]) > 3 and year:
+            # Single-word names must appear together with the year
+            matched = index.find_lower(name_words[0]) & index.find_exact(year)
         
         # If we found supporting sentences, return the best ones
-        if supporting_sentences:
-            # Return up to 2 most relevant sentences, joined together
-            return '. '.join(supporting_sentences[:2]) + '.'
+        if matched:
+            # Return up to 2 most relevant sentences in text order, joined together
+            supporting_sentences = [index.sentences[idx].strip() for idx in sorted(matched)[:2]]
+            return '. '.join(supporting_sentences) + '.'
         
         # Fallback: return first 200 characters of chunk as context
         return chunk_text[:200] + "..."
     
-    def process_chunks(self, chunks: List[Dict], entity_types: List[str] = None, extract_relationships: bool = True, 
+    def prefetch_with_batch_api(self, chunks: List[Dict], entity_types: List[str] = None,
+                                extract_relationships: bool = True, combine_entity_types: bool = True,
+                                batch_short_chunks: bool = True, fuse_relationships: bool = False,
+                                poll_interval: float = 30.0) -> int:
+        """
+        Run the LLM requests process_chunks will make through the Message Batches API
+        
+        The parsed responses are stored in the response cache, so a following process_chunks
+        call with the same arguments reads them from the cache instead of calling the LLM.
+        Requests that are already cached are not resubmitted.
+        
+        Args:
+            chunks: List of document chunks
+            entity_types: List of entity types to extract (default: all)
+            extract_relationships: Whether to extract relationships
+            combine_entity_types: Whether to extract all entity types with a single LLM call per chunk
+            batch_short_chunks: Whether to extract several consecutive short chunks with a single call
+            fuse_relationships: Whether to extract each chunk's entities and relationships with a single call
+            poll_interval: Seconds to wait between batch status checks
+            
+        Returns:
+            Number of responses prefetched
+        """
+        if self.cache is None:
+            logger.warning("The batch API needs the response cache to hand results to process_chunks, skipping")
+            return 0
+        
+        if entity_types is None:
+            entity_types = list(ENTITY_PROMPTS.keys())
+        use_fused_prompt = fuse_relationships and extract_relationships
+        
+        duplicate_of = find_duplicate_chunks(chunks)
+        
+        # Plan the same requests as process_chunks: (chunk, prompt template, max tokens, add supporting text)
+        entity_requests = []
+        for chunk_indices, prompt_template, max_tokens, _ in plan_entity_requests(
+                chunks, duplicate_of, entity_types, combine_entity_types, batch_short_chunks, use_fused_prompt):
+            if len(chunk_indices) > 1:
+                entity_requests.append((build_batch_chunk([chunks[i] for i in chunk_indices]), prompt_template, max_tokens, False))
+            else:
+                entity_requests.append((chunks[chunk_indices[0]], prompt_template, max_tokens, True))
+        
+        # Collect the uncached requests with a parser for each response
+        requests = {}
+        parsers = {}
+        for n, (chunk, prompt_template, max_tokens, add_supporting_text) in enumerate(entity_requests):
+            cache_key = self.entity_cache_key(chunk, prompt_template)
+            if not self.cache.contains(cache_key):
+                custom_id = f"entities-{n}"
+                requests[custom_id] = self.build_entity_request(chunk, prompt_template, max_tokens)
+                parsers[custom_id] = lambda text, chunk=chunk, add=add_supporting_text, key=cache_key: \
+                    self.parse_entity_response(text, chunk, add, key)
+        
+        if extract_relationships and not use_fused_prompt:
+            for chunk_indices in plan_relationship_batches(chunks, duplicate_of, batch_short_chunks):
+                if len(chunk_indices) > 1:
+                    chunk = build_batch_chunk([chunks[i] for i in chunk_indices])
+                    cache_key = self.relationship_processor.relationship_cache_key(chunk, BATCHED_RELATIONSHIP_PROMPT)
+                    request = self.relationship_processor.build_relationship_request(chunk, BATCHED_RELATIONSHIP_PROMPT)
+                    parser = lambda content, count=len(chunk_indices), key=cache_key: \
+                        self.relationship_processor.parse_relationship_batch_response(content, count, key)
+                else:
+                    chunk = chunks[chunk_indices[0]]
+                    cache_key = self.relationship_processor.relationship_cache_key(chunk)
+                    request = self.relationship_processor.build_relationship_request(chunk)
+                    parser = lambda content, chunk=chunk, key=cache_key: \
+                        self.relationship_processor.parse_relationship_response(content, chunk, key)
+                if not self.cache.contains(cache_key):
+                    custom_id = f"relationships-{chunk_indices[0]}"
+                    requests[custom_id] = request
+                    parsers[custom_id] = parser
+        
+        if not requests:
+            logger.info("All requests are already cached, nothing to submit to the batch API")
+            return 0
+        
+        responses = run_message_batch(self.llm_client, requests, poll_interval)
+        for custom_id, content in responses.items():
+            parsers[custom_id](content)
+        
+        logger.info(f"Prefetched {len(responses)} of {len(requests)} responses with the batch API")
+        return len(responses)
+    
+    def process_chunks(self, chunks: Iterable[Dict], entity_types: List[str] = None, extract_relationships: bool = True, 
                       update_after_each: bool = False, output_dir: str = None, 
-                      base_filename: str = None) -> Dict:
+                      base_filename: str = None, concurrency: int = 8,
+                      combine_entity_types: bool = True, batch_short_chunks: bool = True,
+                      fuse_relationships: bool = False, progress_path: str = None,
+                      completed_chunks: Dict[int, Dict] = None, progress_signature: str = None,
+                      chunk_offset: int = 0) -> Dict:
         """
         Process a list of document chunks to extract entities and relationships using a 3-phase approach
         
         Args:
-            chunks: List of document chunks
+            chunks: List of document chunks, or an iterator that yields them as they are read
+                (e.g. json_utils.iter_json_items); requests are submitted as chunks arrive
             entity_types: List of entity types to extract (default: all)
             extract_relationships: Whether to extract relationships
             update_after_each: Whether to write/update output files after each chunk
             output_dir: Output directory for intermediate results
             base_filename: Base filename for intermediate results
+            concurrency: Maximum number of LLM requests in flight at once
+            combine_entity_types: Whether to extract all entity types with a single LLM call per chunk
+            batch_short_chunks: Whether to extract several consecutive short chunks with a single
+                combined LLM call (entities only with combine_entity_types), and the relationships
+                of up to RELATIONSHIP_BATCH_SIZE consecutive chunks with a single call
+            fuse_relationships: Whether to extract each chunk's entities and relationships with a
+                single LLM call
+            progress_path: JSON Lines file to append each finished chunk's results to, so an
+                interrupted run can be resumed
+            completed_chunks: Results of chunks finished by an earlier run, by absolute chunk
+                index (from load_chunk_progress); these chunks are not sent to the LLM again
+            progress_signature: Signature of the run's settings (from chunk_progress_signature),
+                written at the start of a new progress file
+            chunk_offset: Index of the first of the chunks in the chunks file, so progress
+                records are keyed by absolute chunk index
             
         Returns:
             Dictionary with extracted entities, relationships, and statistics
@@ -372,75 +922,170 @@ class LLMProcessor:
         if entity_types is None:
             entity_types = list(ENTITY_PROMPTS.keys())
         
-        # Filter prompts to requested entity types
-        prompts = {k: v for k, v in ENTITY_PROMPTS.items() if k in entity_types}
-        
         # Initialize results
         all_entities = {entity_type: [] for entity_type in entity_types}
         all_relationships = []
+        entity_counts = Counter()
         
         logger.info("=== PHASE 1: EXTRACTING ENTITIES FROM ALL CHUNKS ===")
         
         # PHASE 1: Extract all entities from all chunks
-        for i, chunk in enumerate(chunks):
-            logger.info(f"Phase 1 - Processing chunk {i+1}/{len(chunks)} for entities")
+        # LLM calls are I/O-bound, so all (chunk, entity type) requests are submitted to a
+        # bounded thread pool up front and their results are collected in chunk order
+        # When several entity types are requested they can share one combined LLM call per chunk
+        # Chunks finished by an earlier, interrupted run are restored from the progress file
+        completed_chunks = {chunk_idx - chunk_offset: result for chunk_idx, result in (completed_chunks or {}).items()}
+        if completed_chunks:
+            logger.info(f"Resuming: {len(completed_chunks)} chunks already processed")
+        
+        use_fused_prompt = fuse_relationships and extract_relationships
+        chunk_list = []
+        first_chunk_by_text = {}
+        duplicate_of = {}
+        skipped_chunks = dict(completed_chunks)
+        
+        # Intermediate files are opened once and only the new records are appended after each chunk
+        delta_writer = EntityDeltaWriter(output_dir, base_filename) if update_after_each else contextlib.nullcontext()
+        progress_writer = ChunkProgressWriter(progress_path, progress_signature) if progress_path else contextlib.nullcontext()
+        
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor, delta_writer, progress_writer:
+            # Relationship extraction (Phase 2) only needs the chunk text, so its requests share the
+            # same pool and run alongside the entity requests instead of waiting for Phase 1 to finish
+            relationship_futures = OrderedDict()
+            
+            def submit_relationship_batch(chunk_indices):
+                future = executor.submit(self.relationship_processor.extract_relationships_from_chunk_batch,
+                                         [chunk_list[i] for i in chunk_indices])
+                for position, i in enumerate(chunk_indices):
+                    relationship_futures[i] = (future, position)
+            
+            def read_chunks():
+                # Requests go out while later chunks are still being read, so parsing a streamed
+                # chunks file overlaps with the first LLM calls
+                relationship_batcher = ChunkBatcher(RELATIONSHIP_BATCH_SIZE if batch_short_chunks else 1)
+                for i, chunk in enumerate(chunks):
+                    chunk_list.append(chunk)
+                    
+                    # Chunks with identical text (e.g. repeated boilerplate) are only sent to the LLM once;
+                    # their entities would be merged into the first occurrence's by resolve_entities anyway
+                    if chunk["text"] in first_chunk_by_text:
+                        duplicate_of[i] = skipped_chunks[i] = first_chunk_by_text[chunk["text"]]
+                    else:
+                        first_chunk_by_text[chunk["text"]] = i
+                    
+                    # Consecutive chunks share one relationship LLM call, grouped like plan_relationship_batches
+                    if extract_relationships and not use_fused_prompt and i not in skipped_chunks:
+                        batch = relationship_batcher.add(i, chunk)
+                        if batch:
+                            submit_relationship_batch(batch)
+                    yield chunk
+                
+                batch = relationship_batcher.flush()
+                if batch:
+                    submit_relationship_batch(batch)
+            
+            # Each chunk maps its entity types to (future, position of the chunk in a batched result);
+            # consecutive short chunks are grouped so that they share one combined LLM call
+            chunk_futures = {}
+            for chunk_indices, prompt_template, max_tokens, request_types in plan_entity_requests(
+                    read_chunks(), skipped_chunks, entity_types, combine_entity_types, batch_short_chunks, use_fused_prompt):
+                if len(chunk_indices) > 1:
+                    future = executor.submit(self.process_chunk_batch, [chunk_list[i] for i in chunk_indices])
+                    for position, i in enumerate(chunk_indices):
+                        chunk_futures.setdefault(i, {}).update({entity_type: (future, position) for entity_type in request_types})
+                else:
+                    future = executor.submit(self.process_chunk, chunk_list[chunk_indices[0]], prompt_template, max_tokens)
+                    chunk_futures.setdefault(chunk_indices[0], {}).update({entity_type: (future, None) for entity_type in request_types})
             
-            chunk_entities = {entity_type: [] for entity_type in entity_types}
+            chunks = chunk_list
+            if duplicate_of:
+                logger.info(f"Skipping {len(duplicate_of)} chunks with duplicate text")
             
-            # Extract entities from the chunk
-            for entity_type, prompt in prompts.items():
-                logger.info(f"Extracting {entity_type}s from chunk {i+1}")
-                result = self.process_chunk(chunk, prompt)
+            for i in range(len(chunks)):
+                futures = chunk_futures.get(i, {})
+                logger.info(f"Phase 1 - Processing chunk {i+1}/{len(chunks)} for entities")
+                
+                if i in duplicate_of:
+                    logger.info(f"Chunk {i+1} has the same text as chunk {duplicate_of[i]+1}, skipping")
+                
+                chunk_entities = {entity_type: [] for entity_type in entity_types}
+                chunk_relationships = []
+                
+                if i in completed_chunks:
+                    logger.info(f"Chunk {i+1} was processed by an earlier run, restoring its results")
+                    for entity_type, entities in completed_chunks[i]["entities"].items():
+                        if entity_type in chunk_entities:
+                            chunk_entities[entity_type].extend(entities)
+                    if extract_relationships:
+                        chunk_relationships = completed_chunks[i]["relationships"]
                 
-                # Get the plural form of the entity type (e.g., "event" -> "events")
-                entity_type_plural = f"{entity_type}s"
+                # Extract entities from the chunk
+                for entity_type, (future, position) in futures.items():
+                    logger.info(f"Extracting {entity_type}s from chunk {i+1}")
+                    result = future.result()
+                    if position is not None:
+                        result = result[position]
+                    
+                    # Get the plural form of the entity type (e.g., "event" -> "events")
+                    entity_type_plural = f"{entity_type}s"
+                    
+                    # Extract entities from the result
+                    extracted_entities = result.get(entity_type_plural, [])
+                    
+                    # Add chunk info and IDs to entities for tracking
+                    for entity in extracted_entities:
+                        if isinstance(entity, dict):
+                            entity["source_chunk"] = i
+                            if "id" not in entity:
+                                entity["id"] = new_id()
+                    
+                    # Add to chunk entities
+                    chunk_entities[entity_type].extend(extracted_entities)
                 
-                # Extract entities from the result
-                extracted_entities = result.get(entity_type_plural, [])
+                # Add to our overall collection
+                for entity_type, entities in chunk_entities.items():
+                    all_entities[entity_type].extend(entities)
+                entity_counts.update({entity_type: len(entities) for entity_type, entities in chunk_entities.items()})
                 
-                # Add chunk info and IDs to entities for tracking
-                for entity in extracted_entities:
-                    if isinstance(entity, dict):
-                        entity["source_chunk"] = i
-                        if "id" not in entity:
-                            entity["id"] = str(uuid.uuid4())
+                # The fused prompt returns the chunk's relationships along with its entities
+                if use_fused_prompt and futures:
+                    future, _ = next(iter(futures.values()))
+                    fused_relationships = future.result().get("relationships")
+                    if isinstance(fused_relationships, list):
+                        chunk_relationships = self.relationship_processor.assign_source_chunk(fused_relationships, i)
                 
-                # Add to chunk entities
-                chunk_entities[entity_type].extend(extracted_entities)
+                # Record the finished chunk; its relationships are collected now so the record is complete
+                if progress_path and i not in completed_chunks:
+                    if i in relationship_futures:
+                        future, position = relationship_futures.pop(i)
+                        chunk_relationships = self.relationship_processor.assign_source_chunk(future.result()[position], i)
+                    progress_writer.write_chunk(chunk_offset + i, {"entities": chunk_entities, "relationships": chunk_relationships})
+                all_relationships.extend(chunk_relationships)
                 
-                # Add a short delay to avoid rate limiting
-                time.sleep(0.5)
-            
-            # Add to our overall collection
-            for entity_type, entities in chunk_entities.items():
-                all_entities[entity_type].extend(entities)
-            
-            # Save intermediate entity results if requested
-            if update_after_each:
-                intermediate_results = {
-                    "entities": all_entities,
-                    "relationships": [],
-                    "stats": {
+                # Save intermediate entity results if requested
+                if update_after_each:
+                    stats = {
                         "total_chunks": len(chunks),
                         "chunks_processed": i + 1,
                         "phase": "entities_only",
-                        "entity_counts": {entity_type: len(entities) for entity_type, entities in all_entities.items()},
+                        "entity_counts": {entity_type: entity_counts[entity_type] for entity_type in entity_types},
                         "relationship_count": 0
                     }
-                }
-                
-                # Resolve and deduplicate entities so far
-                resolved_entities = resolve_entities(intermediate_results["entities"])
-                intermediate_results["entities"] = resolved_entities
-                
-                logger.info(f"Saving intermediate entity results after chunk {i+1}/{len(chunks)}")
-                save_results(intermediate_results, output_dir, f"{base_filename}_entities_phase1_{i+1}")
+                    
+                    logger.info(f"Saving intermediate entity results after chunk {i+1}/{len(chunks)}")
+                    delta_writer.write_chunk(chunk_entities, stats)
         
         logger.info("=== PHASE 2: EXTRACTING RELATIONSHIPS FROM ALL CHUNKS ===")
         
-        # PHASE 2: Extract relationships if requested
-        if extract_relationships:
-            all_relationships = self.relationship_processor.extract_relationships_from_chunks(chunks)
+        # PHASE 2: Collect the relationships extracted alongside Phase 1, in chunk order. They are
+        # handed to resolution one at a time, and each chunk's raw relationships are released
+        # once they are resolved instead of being gathered into one list first
+        def collect_relationships():
+            yield from all_relationships
+            while relationship_futures:
+                i, (future, position) = relationship_futures.popitem(last=False)
+                logger.info(f"Phase 2 - Collecting relationships from chunk {i+1}/{len(chunks)}")
+                yield from self.relationship_processor.assign_source_chunk(future.result()[position], i)
         
         logger.info("=== PHASE 3: ENTITY RESOLUTION AND FINAL PROCESSING ===")
         
@@ -448,16 +1093,16 @@ class LLMProcessor:
         logger.info("Resolving and deduplicating entities")
         resolved_entities = resolve_entities(all_entities)
         
-        # Process relationships using RelationshipProcessor
+        # Process relationships using RelationshipProcessor, dropping duplicates as they are resolved
         resolved_relationships = []
-        if extract_relationships and all_relationships:
+        if extract_relationships:
             logger.info("Processing relationships with RelationshipProcessor")
-            resolved_relationships = self.relationship_processor.resolve_relationships_with_entities(all_relationships, resolved_entities)
-            
-            # Deduplicate relationships
-            if resolved_relationships:
-                logger.info("Deduplicating relationships")
-                resolved_relationships = self.relationship_processor.deduplicate_relationships(resolved_relationships)
+            resolved_relationships = self.relationship_processor.resolve_relationships_with_entities(
+                collect_relationships(), resolved_entities, deduplicate=True
+            )
+        
+        if self.cache is not None:
+            logger.info(f"LLM response cache: {self.cache.hits} hits, {self.cache.misses} misses")
         
         # Return the results
         return {
@@ -472,52 +1117,308 @@ class LLMProcessor:
         }
 
 
-def resolve_entities(entities: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+def plan_entity_requests(chunks: Iterable[Dict], duplicate_of: Dict[int, int], entity_types: List[str],
+                         combine_entity_types: bool = True, batch_short_chunks: bool = True,
+                         fuse_relationships: bool = False) -> Iterator[Tuple[List[int], str, int, List[str]]]:
     """
-    Resolve and deduplicate entities based on name and attributes
+    Plan the entity extraction LLM calls for a list of chunks
+    
+    Calls are yielded as soon as their chunks have been read, so chunks can be a stream;
+    duplicate_of may be filled in while it is being read.
+    
+    Args:
+        chunks: Document chunks
+        duplicate_of: Duplicate chunks to leave out, from find_duplicate_chunks
+        entity_types: Entity types to extract
+        combine_entity_types: Whether to extract all entity types with a single LLM call per chunk
+        batch_short_chunks: Whether to group consecutive short chunks into one combined call
+        fuse_relationships: Whether to extract relationships in the same call as the entities
+        
+    Returns:
+        Iterator over (chunk indices, prompt template, max tokens, entity types) per LLM call;
+        calls with several chunks use BATCHED_EXTRACTION_PROMPT through process_chunk_batch
     """
-    resolved_entities = {entity_type: [] for entity_type in entities.keys()}
+    prompts = {k: v for k, v in ENTITY_PROMPTS.items() if k in entity_types}
     
-    for entity_type, entity_list in entities.items():
-        # Create a map to track entities by name
-        entity_map = {}
+    if fuse_relationships:
+        # The fused prompt already returns relationships as well, so it is not batched further
+        return (([i], FUSED_EXTRACTION_PROMPT, COMBINED_MAX_TOKENS, list(prompts))
+                for i, _ in enumerate(chunks) if i not in duplicate_of)
+    
+    if combine_entity_types and len(prompts) > 1:
+        return ((batch, BATCHED_EXTRACTION_PROMPT if len(batch) > 1 else COMBINED_EXTRACTION_PROMPT, COMBINED_MAX_TOKENS, list(prompts))
+                for batch in plan_chunk_batches(chunks, duplicate_of, batch_short_chunks))
+    
+    return (([i], prompt, 8000, [entity_type])
+            for i, _ in enumerate(chunks) if i not in duplicate_of
+            for entity_type, prompt in prompts.items())
+
+def plan_relationship_batches(chunks: Iterable[Dict], duplicate_of: Dict[int, int], batch_chunks: bool) -> Iterator[List[int]]:
+    """
+    Decide which chunks have their relationships extracted together in one LLM call
+    
+    Args:
+        chunks: Document chunks
+        duplicate_of: Duplicate chunks to leave out, from find_duplicate_chunks
+        batch_chunks: Whether to group up to RELATIONSHIP_BATCH_SIZE consecutive chunks
         
-        for entity in entity_list:
-            # Generate a normalized key for comparison
-            if entity_type == "event":
-                name = entity.get("title", "").lower()
-                year = entity.get("year")
-                key = f"{name}_{year}" if year else name
-            else:
-                key = entity.get("name", "").lower()
+    Returns:
+        Iterator over lists of chunk indices, one list per LLM call
+    """
+    return group_short_chunks(chunks, skip=duplicate_of, max_chunks=RELATIONSHIP_BATCH_SIZE if batch_chunks else 1)
+
+def find_duplicate_chunks(chunks: List[Dict]) -> Dict[int, int]:
+    """
+    Find chunks whose text is identical to an earlier chunk
+    
+    Args:
+        chunks: List of document chunks
+        
+    Returns:
+        Map of duplicate chunk index to the index of its first occurrence
+    """
+    first_chunk_by_text = {}
+    duplicate_of = {}
+    for i, chunk in enumerate(chunks):
+        if chunk["text"] in first_chunk_by_text:
+            duplicate_of[i] = first_chunk_by_text[chunk["text"]]
+        else:
+            first_chunk_by_text[chunk["text"]] = i
+    return duplicate_of
+
+def plan_chunk_batches(chunks: Iterable[Dict], duplicate_of: Dict[int, int], batch_short_chunks: bool) -> Iterator[List[int]]:
+    """
+    Decide which chunks are extracted together in one LLM call
+    
+    Args:
+        chunks: Document chunks
+        duplicate_of: Duplicate chunks to leave out, from find_duplicate_chunks
+        batch_short_chunks: Whether to group consecutive short chunks
+        
+    Returns:
+        Iterator over lists of chunk indices, one list per LLM call
+    """
+    if batch_short_chunks:
+        return group_short_chunks(chunks, skip=duplicate_of)
+    return ([i] for i, _ in enumerate(chunks) if i not in duplicate_of)
+
+class ChunkBatcher:
+    """
+    Groups consecutive chunks into batches that fit in one LLM call, one chunk at a time
+    
+    Used where chunks arrive from a stream that is also consumed by something else, so the
+    batches cannot be planned by iterating over the chunks separately.
+    """
+    
+    def __init__(self, max_chunks: int = BATCH_MAX_CHUNKS, max_chars: int = BATCH_MAX_CHARS):
+        """
+        Initialize an empty batcher
+        
+        Args:
+            max_chunks: Maximum number of chunks in a batch
+            max_chars: Maximum combined text length of a batch
+        """
+        self.max_chunks = max_chunks
+        self.max_chars = max_chars
+        self.batch = []
+        self.batch_chars = 0
+    
+    def add(self, chunk_index: int, chunk: Dict) -> Optional[List[int]]:
+        """
+        Add the next chunk
+        
+        Args:
+            chunk_index: Index of the chunk
+            chunk: Document chunk
             
-            # Skip empty keys
-            if not key:
-                continue
+        Returns:
+            The previous batch if this chunk does not fit in it, otherwise None
+        """
+        full_batch = None
+        chunk_chars = len(chunk["text"])
+        if self.batch and (self.batch_chars + chunk_chars > self.max_chars or len(self.batch) >= self.max_chunks):
+            full_batch = self.flush()
+        self.batch.append(chunk_index)
+        self.batch_chars += chunk_chars
+        return full_batch
+    
+    def flush(self) -> Optional[List[int]]:
+        """
+        Take the current batch
+        
+        Returns:
+            The batch, or None if it is empty
+        """
+        batch = self.batch or None
+        self.batch = []
+        self.batch_chars = 0
+        return batch
+
+def group_short_chunks(chunks: Iterable[Dict], skip: Optional[Dict[int, int]] = None,
+                       max_chars: int = BATCH_MAX_CHARS, max_chunks: int = BATCH_MAX_CHUNKS) -> Iterator[List[int]]:
+    """
+    Group consecutive chunks into batches that fit in one LLM call
+    
+    Each batch is yielded as soon as the chunk after it has been read.
+    
+    Args:
+        chunks: Document chunks
+        skip: Indices of chunks to leave out (e.g. duplicates)
+        max_chars: Maximum combined text length of a batch
+        max_chunks: Maximum number of chunks in a batch
+        
+    Returns:
+        Iterator over lists of chunk indices; chunks longer than max_chars are in a batch of their own
+    """
+    batcher = ChunkBatcher(max_chunks, max_chars)
+    for i, chunk in enumerate(chunks):
+        if skip and i in skip:
+            continue
+        
+        batch = batcher.add(i, chunk)
+        if batch:
+            yield batch
+    
+    batch = batcher.flush()
+    if batch:
+        yield batch
+
+def resolve_entities(entities: Dict[str, List[Dict]], max_workers: Optional[int] = None) -> Dict[str, List[Dict]]:
+    """
+    Resolve and deduplicate entities based on name and attributes
+    
+    Args:
+        entities: Lists of entities by type
+        max_workers: Number of processes to resolve entity types in parallel (default: one per
+            type, up to the CPU count); large inputs only, since the entities must be pickled
             
-            # If entity already exists, merge attributes
-            if key in entity_map:
-                entity_map[key] = merge_entities(entity_map[key], entity)
-            else:
-                # Add ID if not present
-                if "id" not in entity:
-                    entity["id"] = str(uuid.uuid4())
-                entity_map[key] = entity
+    Returns:
+        Resolved entities by type
+    """
+    total_entities = sum(len(entity_list) for entity_list in entities.values())
+    if max_workers is None:
+        max_workers = min(len(entities), os.cpu_count() or 1)
+    
+    if max_workers <= 1 or total_entities < PARALLEL_RESOLVE_MIN_ENTITIES:
+        return dict(resolve_entity_list(entity_type, entity_list) for entity_type, entity_list in entities.items())
+    
+    # Assign missing IDs here, since the ID counter is not shared with worker processes
+    for entity_list in entities.values():
+        for entity in entity_list:
+            if "id" not in entity:
+                entity["id"] = new_id()
+    
+    # Resolution is CPU-bound and independent per entity type, so the types are resolved in
+    # separate processes to sidestep the GIL
+    logger.info(f"Resolving {total_entities} entities in {max_workers} processes")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return dict(executor.map(resolve_entity_list, entities.keys(), entities.values()))
+
+def resolve_entity_list(entity_type: str, entity_list: List[Dict]) -> Tuple[str, List[Dict]]:
+    """
+    Resolve and deduplicate the entities of one type
+    
+    Args:
+        entity_type: Type of the entities
+        entity_list: Entities to resolve
         
-        # Convert map back to list
-        resolved_entities[entity_type] = list(entity_map.values())
+    Returns:
+        Tuple of (entity type, resolved entities)
+    """
+    # Create a map to track entities by name
+    entity_map = {}
     
-    return resolved_entities
+    # List field values of merged entities, deduplicated as they are merged
+    list_indexes = {}
+    
+    for entity in entity_list:
+        # Generate a normalized key for comparison
+        if entity_type == "event":
+            name = entity.get("title", "").lower()
+            year = entity.get("year")
+            key = f"{name}_{year}" if year else name
+        else:
+            key = entity.get("name", "").lower()
+        
+        # Skip empty keys
+        if not key:
+            continue
+        
+        # If entity already exists, merge attributes
+        if key in entity_map:
+            if key not in list_indexes:
+                list_indexes[key] = build_list_indexes(entity_map[key])
+            entity_map[key] = merge_entities(entity_map[key], entity, list_indexes[key])
+        else:
+            # Add ID if not present
+            if "id" not in entity:
+                entity["id"] = new_id()
+            entity_map[key] = entity
+    
+    # Convert the deduplicated list fields of merged entities back to lists
+    for key, indexes in list_indexes.items():
+        for field, index in indexes.items():
+            if index:
+                entity_map[key][field] = list(index.values())
+    
+    # Convert map back to list
+    return entity_type, list(entity_map.values())
 
-def merge_entities(entity1: Dict, entity2: Dict) -> Dict:
+def list_item_key(item: Any) -> Any:
+    """
+    Get a hashable key for deduplicating a list field item
+    
+    Args:
+        item: List item, which may be an unhashable dict or list
+        
+    Returns:
+        The item itself if hashable, otherwise its canonical JSON text
+    """
+    try:
+        hash(item)
+        return item
+    except TypeError:
+        return json_utils.dumps(item, sort_keys=True, default=str)
+
+def build_list_indexes(entity: Dict) -> Dict[str, Dict]:
+    """
+    Build the deduplication indexes for an entity's list fields
+    
+    Args:
+        entity: Entity to index
+        
+    Returns:
+        Map of list field to an insertion-ordered map of item key to item
+    """
+    indexes = {}
+    for key in LIST_FIELDS:
+        index = {}
+        for item in entity.get(key) or []:
+            index.setdefault(list_item_key(item), item)
+        indexes[key] = index
+    return indexes
+
+def merge_entities(entity1: Dict, entity2: Dict, list_indexes: Optional[Dict[str, Dict]] = None) -> Dict:
     """
     Merge two entities, combining their attributes
+    
+    Args:
+        entity1: Entity to merge into
+        entity2: Entity to merge from
+        list_indexes: Deduplication indexes of entity1's list fields from build_list_indexes.
+            When given, the indexes are updated in place and the caller converts them back
+            to lists once all merges are done; otherwise the merged lists are set directly.
+            
+    Returns:
+        Merged entity
     """
     # Start with the first entity
     merged = entity1.copy()
     
     # Merge scalar fields (take non-empty values from entity2)
     for key, value in entity2.items():
+        if key in LIST_FIELDS:
+            continue
         if key not in merged or not merged[key]:
             merged[key] = value
         elif key == "description" and value and merged[key] != value:
@@ -530,53 +1431,237 @@ def merge_entities(entity1: Dict, entity2: Dict) -> Dict:
             # For supporting text, concatenate if different
             merged[key] = f"{merged.get('supporting_text', '')} | {value}"
     
-    # Merge list fields
-    for key in ["locations", "actors", "concepts", "expertise", "domain", "alternative_names", "authors"]:
+    # Merge list fields, removing duplicates
+    finalize_lists = list_indexes is None
+    if finalize_lists:
+        list_indexes = build_list_indexes(entity1)
+    
+    for key in LIST_FIELDS:
         if key in entity2 and entity2[key]:
-            if key not in merged:
-                merged[key] = entity2[key]
-            else:
-                # Combine lists and remove duplicates
-                merged[key] = list(set(merged[key] + entity2[key]))
+            index = list_indexes[key]
+            for item in entity2[key]:
+                index.setdefault(list_item_key(item), item)
+            if finalize_lists:
+                merged[key] = list(index.values())
     
     return merged
 
+class EntityDeltaWriter:
+    """
+    Writes the entities extracted from each chunk as intermediate results
+    
+    New entities are appended to a JSON Lines file, one {"entity_type", "entity"} record
+    per line, through a single buffered handle kept open for the whole run, so each update
+    only writes the chunk's own entities. A small progress file is rewritten with the
+    current stats. The entities are not resolved; the consolidated results are written once
+    by save_results at the end.
+    """
+    
+    def __init__(self, output_dir: str, base_filename: str):
+        """
+        Start new intermediate files
+        
+        Args:
+            output_dir: Output directory
+            base_filename: Base filename for the intermediate files
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.entities_path = os.path.join(output_dir, f"{base_filename}_entities_phase1.jsonl")
+        self.progress_path = os.path.join(output_dir, f"{base_filename}_entities_phase1_progress.json")
+        self._file = open(self.entities_path, 'wb', buffering=OUTPUT_BUFFER_SIZE)
+    
+    def write_chunk(self, chunk_entities: Dict[str, List[Dict]], stats: Dict):
+        """
+        Append one chunk's entities and update the progress file
+        
+        Args:
+            chunk_entities: Entities extracted from the chunk by type
+            stats: Progress statistics so far
+        """
+        # The chunk's records are joined into one write, so each chunk costs a single write
+        # syscall when flushed (without fsync) to keep the file complete up to this chunk
+        self._file.write(b"".join(
+            json_utils.dumps_bytes({"entity_type": entity_type, "entity": entity}) + b"\n"
+            for entity_type, entities in chunk_entities.items()
+            for entity in entities
+        ))
+        self._file.flush()
+        json_utils.write_json(self.progress_path, stats)
+    
+    def close(self):
+        """Close the entities file"""
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def chunk_progress_signature(chunks_file: str, start: int, end: Optional[int], entity_types: List[str],
+                             extract_relationships: bool, combine_entity_types: bool, batch_short_chunks: bool,
+                             fuse_relationships: bool) -> str:
+    """
+    Get the signature of a run's settings, stored at the start of its progress file
+    
+    A progress file is only resumed by a run with the same signature, so a run with another
+    chunk selection, entity types, relationship mode, model or prompts starts over instead of
+    restoring results extracted under different settings.
+    
+    Args:
+        chunks_file: Path of the chunks file
+        start: Index of the first selected chunk
+        end: Index of the last selected chunk (None for all remaining chunks)
+        entity_types: Entity types to extract
+        extract_relationships: Whether relationships are extracted
+        combine_entity_types: Whether all entity types are extracted with a single LLM call per chunk
+        batch_short_chunks: Whether consecutive short chunks share LLM calls
+        fuse_relationships: Whether entities and relationships are extracted with a single LLM call
+        
+    Returns:
+        Hex digest identifying the settings
+    """
+    settings = json_utils.dumps([os.path.abspath(chunks_file), start, end, entity_types, extract_relationships,
+                                 combine_entity_types, batch_short_chunks, fuse_relationships])
+    return ResponseCache.make_key("progress", settings, DEFAULT_MODEL, ENTITY_SYSTEM_PROMPT, *ENTITY_PROMPTS.values(),
+                                  COMBINED_EXTRACTION_PROMPT, BATCHED_EXTRACTION_PROMPT, FUSED_EXTRACTION_PROMPT,
+                                  RELATIONSHIP_SYSTEM_PROMPT, RELATIONSHIP_EXTRACTION_PROMPT, BATCHED_RELATIONSHIP_PROMPT)
+
+def load_chunk_progress(progress_path: str, signature: str) -> Dict[int, Dict]:
+    """
+    Load the results of the chunks finished by an earlier run with the same settings
+    
+    Args:
+        progress_path: JSON Lines progress file written by ChunkProgressWriter
+        signature: Signature of the current run's settings, from chunk_progress_signature
+        
+    Returns:
+        Dictionary of chunk results by absolute chunk index (empty if the file does not exist
+        or was written by a run with different settings)
+    """
+    completed = {}
+    if not os.path.exists(progress_path):
+        return completed
+    
+    with open(progress_path, 'rb') as f:
+        for line_number, line in enumerate(f):
+            try:
+                record = json_utils.loads(line)
+            except json.JSONDecodeError:
+                # The last line may be cut off if the run was killed while writing it
+                logger.warning(f"Ignoring an incomplete record in {progress_path}")
+                continue
+            
+            # The first record holds the signature of the settings the file was written with
+            if line_number == 0:
+                if not isinstance(record, dict) or record.get("signature") != signature:
+                    logger.warning(f"{progress_path} was written by a run with different settings, not resuming from it")
+                    return {}
+                continue
+            completed[record["chunk_idx"]] = record["result"]
+    
+    return completed
+
+class ChunkProgressWriter:
+    """
+    Appends each finished chunk's results to the progress file read by load_chunk_progress
+    
+    The file is opened once for the whole run. Each record is written with a single write
+    under an exclusive lock (where fcntl is available), so concurrent writers cannot
+    interleave their lines.
+    """
+    
+    def __init__(self, progress_path: str, signature: Optional[str] = None):
+        """
+        Open the progress file for appending
+        
+        Args:
+            progress_path: JSON Lines progress file
+            signature: Signature of the run's settings, written first when the file is new
+        """
+        self.progress_path = progress_path
+        self._file = open(progress_path, 'a+b')
+        
+        if self._file.seek(0, os.SEEK_END) == 0:
+            self._file.write(json_utils.dumps_bytes({"signature": signature}) + b"\n")
+            self._file.flush()
+        else:
+            # Start on a new line if a killed run left an incomplete last record
+            self._file.seek(-1, os.SEEK_END)
+            if self._file.read(1) != b"\n":
+                self._file.write(b"\n")
+    
+    def write_chunk(self, chunk_index: int, result: Dict):
+        """
+        Append a finished chunk's results
+        
+        Args:
+            chunk_index: Index of the chunk
+            result: Chunk results with "entities" by type and "relationships"
+        """
+        record = json_utils.dumps_bytes({"chunk_idx": chunk_index, "result": result}) + b"\n"
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        try:
+            self._file.write(record)
+            self._file.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+    
+    def close(self):
+        """Close the progress file"""
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
 def save_results(results: Dict, output_dir: str, base_filename: str) -> Dict[str, str]:
     """
     Save extraction results to files
     """
     os.makedirs(output_dir, exist_ok=True)
     
-    # Save entities by type
-    entity_paths = {}
-    for entity_type, entities in results["entities"].items():
-        entity_path = os.path.join(output_dir, f"{base_filename}_{entity_type}s.json")
-        with open(entity_path, 'w', encoding='utf-8') as f:
-            json.dump({f"{entity_type}s": entities}, f, indent=2, ensure_ascii=False)
-        entity_paths[entity_type] = entity_path
-        
-        # Also create CSV for each entity type
-        csv_path = os.path.join(output_dir, f"{base_filename}_{entity_type}s.csv")
-        create_entity_csv(entities, entity_type, csv_path)
-        entity_paths[f"{entity_type}_csv"] = csv_path
-    
-    # Save relationships
-    relationships_path = os.path.join(output_dir, f"{base_filename}_relationships.json")
-    with open(relationships_path, 'w', encoding='utf-8') as f:
-        json.dump({"relationships": results["relationships"]}, f, indent=2, ensure_ascii=False)
-    
-    # Save combined knowledge graph
-    kg_path = os.path.join(output_dir, f"{base_filename}_knowledge_graph.json")
-    kg_entities = {f"{entity_type}s": entities for entity_type, entities in results["entities"].items()}
-    kg_entities["relationships"] = results["relationships"]
-    
-    with open(kg_path, 'w', encoding='utf-8') as f:
-        json.dump(kg_entities, f, indent=2, ensure_ascii=False)
-    
-    # Save stats
-    stats_path = os.path.join(output_dir, f"{base_filename}_extraction_stats.json")
-    with open(stats_path, 'w', encoding='utf-8') as f:
-        json.dump(results["stats"], f, indent=2, ensure_ascii=False)
+    # The files are independent, so write them in parallel; the writes are I/O-bound
+    with ThreadPoolExecutor(max_workers=SAVE_WORKERS) as executor:
+        write_futures = []
+        
+        # Save entities by type
+        entity_paths = {}
+        for entity_type, entities in results["entities"].items():
+            entity_path = os.path.join(output_dir, f"{base_filename}_{entity_type}s.json")
+            write_futures.append(executor.submit(json_utils.write_json, entity_path, {f"{entity_type}s": entities}))
+            entity_paths[entity_type] = entity_path
+            
+            # Also create CSV for each entity type
+            csv_path = os.path.join(output_dir, f"{base_filename}_{entity_type}s.csv")
+            write_futures.append(executor.submit(create_entity_csv, entities, entity_type, csv_path))
+            entity_paths[f"{entity_type}_csv"] = csv_path
+        
+        # Save relationships
+        relationships_path = os.path.join(output_dir, f"{base_filename}_relationships.json")
+        write_futures.append(executor.submit(json_utils.write_json, relationships_path, {"relationships": results["relationships"]}))
+        
+        # Save combined knowledge graph
+        # The graph can be large, so it is streamed one entity at a time instead of serialized whole
+        kg_path = os.path.join(output_dir, f"{base_filename}_knowledge_graph.json")
+        kg_sections = [(f"{entity_type}s", entities) for entity_type, entities in results["entities"].items()]
+        kg_sections.append(("relationships", results["relationships"]))
+        
+        write_futures.append(executor.submit(json_utils.write_json_lists, kg_path, kg_sections))
+        
+        # Save stats
+        stats_path = os.path.join(output_dir, f"{base_filename}_extraction_stats.json")
+        write_futures.append(executor.submit(json_utils.write_json, stats_path, results["stats"]))
+        
+        # Surface any write errors
+        for future in write_futures:
+            future.result()
     
     return {
         "entities": entity_paths,
@@ -589,62 +1674,43 @@ def create_entity_csv(entities: List[Dict], entity_type: str, csv_path: str):
     """
     Create a CSV file for a specific entity type
     """
-    if not entities:
+    if not entities or entity_type not in CSV_COLUMNS:
         return
     
-    with open(csv_path, 'w', encoding='utf-8') as f:
-        if entity_type == "event":
-            f.write("Title,Year,Type,Significance,Description,Supporting_Text\n")
-            for entity in entities:
-                title = entity.get("title", "").replace('"', '""')
-                year = entity.get("year", "")
-                event_type = entity.get("type", "")
-                significance = entity.get("significance", "")
-                description = entity.get("description", "").replace('"', '""')[:200] + "..." if len(entity.get("description", "")) > 200 else entity.get("description", "")
-                supporting_text = entity.get("supporting_text", "").replace('"', '""')[:300] + "..." if len(entity.get("supporting_text", "")) > 300 else entity.get("supporting_text", "")
-                f.write(f'"{title}",{year},"{event_type}",{significance},"{description}","{supporting_text}"\n')
-        
-        elif entity_type == "actor":
-            f.write("Name,Type,Role,Country,Description,Supporting_Text\n")
-            for entity in entities:
-                name = entity.get("name", "").replace('"', '""')
-                actor_type = entity.get("type", "")
-                role = entity.get("role", "").replace('"', '""')
-                country = entity.get("country", "")
-                description = entity.get("description", "").replace('"', '""')[:200] + "..." if len(entity.get("description", "")) > 200 else entity.get("description", "")
-                supporting_text = entity.get("supporting_text", "").replace('"', '""')[:300] + "..." if len(entity.get("supporting_text", "")) > 300 else entity.get("supporting_text", "")
-                f.write(f'"{name}","{actor_type}","{role}","{country}","{description}","{supporting_text}"\n')
-        
-        elif entity_type == "concept":
-            f.write("Name,Definition,Significance,Domain,Supporting_Text\n")
-            for entity in entities:
-                name = entity.get("name", "").replace('"', '""')
-                definition = entity.get("definition", "").replace('"', '""')[:200] + "..." if len(entity.get("definition", "")) > 200 else entity.get("definition", "")
-                significance = entity.get("significance", "")
-                domain = ", ".join(entity.get("domain", [])) if entity.get("domain") else ""
-                supporting_text = entity.get("supporting_text", "").replace('"', '""')[:300] + "..." if len(entity.get("supporting_text", "")) > 300 else entity.get("supporting_text", "")
-                f.write(f'"{name}","{definition}",{significance},"{domain}","{supporting_text}"\n')
-        
-        elif entity_type == "publication":
-            f.write("Title,Year,Type,Authors,Publisher,Supporting_Text\n")
-            for entity in entities:
-                title = entity.get("title", "").replace('"', '""')
-                year = entity.get("year", "")
-                pub_type = entity.get("type", "")
-                authors = ", ".join(entity.get("authors", [])) if entity.get("authors") else ""
-                publisher = entity.get("publisher", "").replace('"', '""')
-                supporting_text = entity.get("supporting_text", "").replace('"', '""')[:300] + "..." if len(entity.get("supporting_text", "")) > 300 else entity.get("supporting_text", "")
-                f.write(f'"{title}",{year},"{pub_type}","{authors}","{publisher}","{supporting_text}"\n')
-        
-        elif entity_type == "location":
-            f.write("Name,Type,Country,Description,Supporting_Text\n")
-            for entity in entities:
-                name = entity.get("name", "").replace('"', '""')
-                location_type = entity.get("type", "")
-                country = entity.get("country", "")
-                description = entity.get("description", "").replace('"', '""')[:200] + "..." if len(entity.get("description", "")) > 200 else entity.get("description", "")
-                supporting_text = entity.get("supporting_text", "").replace('"', '""')[:300] + "..." if len(entity.get("supporting_text", "")) > 300 else entity.get("supporting_text", "")
-                f.write(f'"{name}","{location_type}","{country}","{description}","{supporting_text}"\n')
+    columns = CSV_COLUMNS[entity_type]
+    fields = [(field, max_length) for _, field, max_length in columns]
+    
+    def rows():
+        for entity in entities:
+            get = entity.get
+            yield [format_csv_value(get(field), max_length) for field, max_length in fields]
+    
+    with open(csv_path, 'w', encoding='utf-8', newline='', buffering=CSV_BUFFER_SIZE) as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+        writer.writerow([header for header, _, _ in columns])
+        writer.writerows(rows())
+
+def format_csv_value(value: Any, max_length: Optional[int] = None) -> Any:
+    """
+    Format an entity field for a CSV cell
+    
+    Args:
+        value: Field value from the entity
+        max_length: Length to truncate text to, with "..." appended
+        
+    Returns:
+        Value to write to the cell
+    """
+    # Most fields are strings, so check for them first
+    if isinstance(value, str):
+        if max_length is not None and len(value) > max_length:
+            return value[:max_length] + "..."
+        return value
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return format_csv_value(", ".join(str(item) for item in value), max_length)
+    return value
 
 def main():
     """Main function to process document chunks with an LLM"""
@@ -659,104 +1725,182 @@ def main():
     parser.add_argument("--chunk-index", type=int, default=None, help="Process only the chunk at this index (0-based)")
     parser.add_argument("--chunk-range", type=str, default=None, help="Process chunks in this range (e.g., '0-5')")
     parser.add_argument("--update-after-each", action="store_true", help="Write/update output files after each chunk is processed")
+    parser.add_argument("--separate-entity-prompts", action="store_true", help="Use one LLM call per entity type instead of a combined prompt")
+    parser.add_argument("--concurrency", type=int, default=None, help="Initial number of LLM requests in flight at once, adapted to the API's rate limits (default: 4 per CPU, 4-32)")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="Hard cap on concurrent LLM requests while adapting to rate limits")
+    parser.add_argument("--requests-per-minute", type=int, default=None, help="Keep the LLM request rate under this many requests per minute (e.g. your API tier's limit)")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES, help="Maximum retries per LLM request on rate limit or server errors")
+    parser.add_argument("--cache-dir", default=None, help="Directory for the LLM response cache (default: <output-dir>/.llm_cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the LLM instead of reusing cached responses")
+    parser.add_argument("--use-batch-api", action="store_true", help="Submit all LLM requests as one Message Batches API job (cheaper, but results arrive in bulk)")
+    parser.add_argument("--no-chunk-batching", action="store_true", help="Do not combine consecutive short chunks into a single LLM call")
+    parser.add_argument("--fused-prompt", action="store_true", help="Extract each chunk's entities and relationships with a single LLM call")
+    parser.add_argument("--resume", dest="resume", action="store_true", default=True, help="Skip chunks recorded in the progress file by an interrupted run with the same settings (default)")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", help="Ignore the progress file and process all chunks again")
     args = parser.parse_args()
     
+    # Check for the client library up front instead of after the chunks have been loaded;
+    # anthropic itself is only imported once the client is created
+    if importlib.util.find_spec("anthropic") is None:
+        logger.error("Anthropic package not installed. Please install it with 'pip install anthropic'")
+        sys.exit(1)
+    
     try:
-        # Load document chunks
-        with open(args.chunks_file, 'r', encoding='utf-8') as f:
-            chunks_data = json.load(f)
+        # Work out which chunks are needed before loading, so the others are never kept in memory
+        start, end = 0, None
+        if args.chunk_index is not None:
+            start, end = args.chunk_index, args.chunk_index
+        elif args.chunk_range is not None:
+            try:
+                start, end = map(int, args.chunk_range.split('-'))
+            except ValueError:
+                logger.error(f"Invalid chunk range format: {args.chunk_range}. Use 'start-end' format (e.g., '0-5')")
+                sys.exit(1)
+        elif args.max_chunks:
+            end = args.max_chunks - 1
         
-        # Extract chunks from the loaded data
-        if isinstance(chunks_data, list):
-            chunks = chunks_data
-        else:
-            chunks = chunks_data.get("chunks", [])
+        # A selection that cannot match any chunk is rejected without reading the file
+        if start < 0 or (end is not None and end < start):
+            if args.chunk_index is not None:
+                logger.error(f"Chunk index {args.chunk_index} is out of range")
+            elif args.chunk_range is not None:
+                logger.error(f"Chunk range {args.chunk_range} is out of range")
+            else:
+                logger.error(f"--max-chunks must be positive, got {args.max_chunks}")
+            sys.exit(1)
         
-        logger.info(f"Loaded {len(chunks)} chunks from {args.chunks_file}")
+        # Load document chunks, streaming the file and stopping after the last selected chunk
+        chunk_items = json_utils.iter_json_items(args.chunks_file, "chunks")
+        stream_chunks = end is None and not args.use_batch_api
+        if stream_chunks:
+            # Without a selection the chunks are handed to process_chunks as they are parsed, so
+            # the first LLM requests go out while the rest of the file is still being read
+            chunks = chunk_items
+        else:
+            try:
+                chunks = list(itertools.islice(chunk_items, start, None if end is None else end + 1))
+            finally:
+                chunk_items.close()
         
         # Process only a specific chunk if requested
         if args.chunk_index is not None:
-            if 0 <= args.chunk_index < len(chunks):
+            if len(chunks) == 1:
                 logger.info(f"Processing only chunk at index {args.chunk_index}")
-                chunks = [chunks[args.chunk_index]]
             else:
-                logger.error(f"Chunk index {args.chunk_index} is out of range (0-{len(chunks)-1})")
+                total = sum(1 for _ in json_utils.iter_json_items(args.chunks_file, "chunks"))
+                logger.error(f"Chunk index {args.chunk_index} is out of range (0-{total-1})")
                 sys.exit(1)
         # Process a range of chunks if requested
         elif args.chunk_range is not None:
-            try:
-                start, end = map(int, args.chunk_range.split('-'))
-                if 0 <= start <= end < len(chunks):
-                    logger.info(f"Processing chunks in range {start}-{end}")
-                    chunks = chunks[start:end+1]
-                else:
-                    logger.error(f"Chunk range {args.chunk_range} is out of range (0-{len(chunks)-1})")
-                    sys.exit(1)
-            except ValueError:
-                logger.error(f"Invalid chunk range format: {args.chunk_range}. Use 'start-end' format (e.g., '0-5')")
+            if chunks and len(chunks) == end - start + 1:
+                logger.info(f"Processing chunks in range {start}-{end}")
+            else:
+                total = sum(1 for _ in json_utils.iter_json_items(args.chunks_file, "chunks"))
+                logger.error(f"Chunk range {args.chunk_range} is out of range (0-{total-1})")
                 sys.exit(1)
         # Limit chunks if requested
-        elif args.max_chunks and args.max_chunks < len(chunks):
+        elif args.max_chunks:
             logger.info(f"Limiting to {args.max_chunks} chunks")
-            chunks = chunks[:args.max_chunks]
         
-        try:
-            import anthropic
-            import os
-            
-            # Initialize Anthropic client using environment variable
-            api_key = os.environ.get("ANTHROPIC_API_KEY")
-            if not api_key:
-                logger.error("ANTHROPIC_API_KEY environment variable not set")
-                sys.exit(1)
-                
-            client = anthropic.Anthropic(api_key=api_key)
-            
-            # Initialize LLM processor
-            processor = LLMProcessor(llm_client=client)
-            
-            # Get base filename for outputs
-            base_filename = os.path.splitext(os.path.basename(args.chunks_file))[0]
-            if base_filename.endswith("_chunks"):
-                base_filename = base_filename[:-7]  # Remove "_chunks" suffix
-            
-            # Process chunks
-            results = processor.process_chunks(
-                chunks=chunks,
-                entity_types=args.entity_types,
-                extract_relationships=not args.no_relationships,
-                update_after_each=args.update_after_each,
-                output_dir=args.output_dir,
-                base_filename=base_filename
-            )
-            
-            # Save results
-            output_paths = save_results(results, args.output_dir, base_filename)
-            
-            # Log results
-            logger.info(f"Extraction complete. Files saved to {args.output_dir}")
-            for entity_type, path in output_paths["entities"].items():
-                if not entity_type.endswith("_csv"):
-                    logger.info(f"  - {entity_type.capitalize()}s JSON: {path}")
-                else:
-                    logger.info(f"  - {entity_type.replace('_csv', '').capitalize()}s CSV: {path}")
-            
-            logger.info(f"  - Relationships: {output_paths['relationships']}")
-            logger.info(f"  - Knowledge Graph: {output_paths['knowledge_graph']}")
-            logger.info(f"  - Stats: {output_paths['stats']}")
-            
-            # Print summary statistics
-            logger.info("Extraction Summary:")
-            for entity_type, count in results["stats"]["entity_counts"].items():
-                logger.info(f"  - {entity_type.capitalize()}s: {count}")
-            
-            logger.info(f"  - Relationships: {results['stats']['relationship_count']}")
-            logger.info(f"  - Chunks Processed: {results['stats']['chunks_processed']}/{results['stats']['total_chunks']}")
-            
-        except ImportError:
-            logger.error("Anthropic package not installed. Please install it with 'pip install anthropic'")
+        if stream_chunks:
+            logger.info(f"Streaming chunks from {args.chunks_file}")
+        else:
+            logger.info(f"Loaded {len(chunks)} chunks from {args.chunks_file}")
+        
+        # Initialize Anthropic client using environment variable
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not api_key:
+            logger.error("ANTHROPIC_API_KEY environment variable not set")
             sys.exit(1)
             
+        # Requests start at the initial concurrency, back off on 429 responses and ramp up again
+        limiter = AdaptiveConcurrencyLimiter(args.concurrency or default_concurrency(), args.max_concurrency,
+                                             requests_per_minute=args.requests_per_minute)
+        client = create_anthropic_client(api_key, max_retries=args.max_retries, limiter=limiter)
+        
+        # Initialize LLM processor
+        cache_dir = None
+        if not args.no_cache:
+            cache_dir = args.cache_dir or os.path.join(args.output_dir, ".llm_cache")
+        processor = LLMProcessor(llm_client=client, cache_dir=cache_dir)
+        
+        # Get base filename for outputs
+        base_filename = os.path.splitext(os.path.basename(args.chunks_file))[0]
+        if base_filename.endswith("_chunks"):
+            base_filename = base_filename[:-7]  # Remove "_chunks" suffix
+        
+        # Each finished chunk is recorded so that an interrupted run can pick up where it stopped;
+        # a progress file written with other settings is discarded instead of resumed
+        os.makedirs(args.output_dir, exist_ok=True)
+        progress_path = os.path.join(args.output_dir, f"{base_filename}.progress.jsonl")
+        progress_signature = chunk_progress_signature(
+            args.chunks_file, start, end, args.entity_types, not args.no_relationships,
+            not args.separate_entity_prompts, not args.no_chunk_batching, args.fused_prompt
+        )
+        completed_chunks = load_chunk_progress(progress_path, progress_signature) if args.resume else {}
+        if not completed_chunks and os.path.exists(progress_path):
+            os.remove(progress_path)
+        
+        # Run all requests as one batch job first; process_chunks then reads them from the cache
+        if args.use_batch_api:
+            if args.update_after_each:
+                logger.warning("--use-batch-api is ignored with --update-after-each, which needs results as they arrive")
+            elif len(chunks) < BATCH_API_MIN_CHUNKS:
+                logger.info(f"Fewer than {BATCH_API_MIN_CHUNKS} chunks, not using the batch API")
+            else:
+                processor.prefetch_with_batch_api(
+                    chunks=chunks,
+                    entity_types=args.entity_types,
+                    extract_relationships=not args.no_relationships,
+                    combine_entity_types=not args.separate_entity_prompts,
+                    batch_short_chunks=not args.no_chunk_batching,
+                    fuse_relationships=args.fused_prompt
+                )
+        
+        # Process chunks
+        results = processor.process_chunks(
+            chunks=chunks,
+            entity_types=args.entity_types,
+            extract_relationships=not args.no_relationships,
+            update_after_each=args.update_after_each,
+            output_dir=args.output_dir,
+            base_filename=base_filename,
+            concurrency=limiter.maximum,
+            combine_entity_types=not args.separate_entity_prompts,
+            batch_short_chunks=not args.no_chunk_batching,
+            fuse_relationships=args.fused_prompt,
+            progress_path=progress_path,
+            completed_chunks=completed_chunks,
+            progress_signature=progress_signature,
+            chunk_offset=start
+        )
+        
+        # Save results
+        output_paths = save_results(results, args.output_dir, base_filename)
+        
+        # The run finished, so a later run starts from scratch
+        os.remove(progress_path)
+        
+        # Log results
+        logger.info(f"Extraction complete. Files saved to {args.output_dir}")
+        for entity_type, path in output_paths["entities"].items():
+            if not entity_type.endswith("_csv"):
+                logger.info(f"  - {entity_type.capitalize()}s JSON: {path}")
+            else:
+                logger.info(f"  - {entity_type.replace('_csv', '').capitalize()}s CSV: {path}")
+        
+        logger.info(f"  - Relationships: {output_paths['relationships']}")
+        logger.info(f"  - Knowledge Graph: {output_paths['knowledge_graph']}")
+        logger.info(f"  - Stats: {output_paths['stats']}")
+        
+        # Print summary statistics
+        logger.info("Extraction Summary:")
+        for entity_type, count in results["stats"]["entity_counts"].items():
+            logger.info(f"  - {entity_type.capitalize()}s: {count}")
+        
+        logger.info(f"  - Relationships: {results['stats']['relationship_count']}")
+        logger.info(f"  - Chunks Processed: {results['stats']['chunks_processed']}/{results['stats']['total_chunks']}")
+        
     except Exception as e:
         logger.error(f"Error processing chunks: {str(e)}")
         import traceback
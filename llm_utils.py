@@ -0,0 +1,349 @@
+import contextlib
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Model used for extraction and critic requests
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+
+# Set EMPOHOP_HTTP2=1 to multiplex concurrent requests over HTTP/2 (requires the h2 package)
+HTTP2_ENV_VAR = "EMPOHOP_HTTP2"
+
+# Connection pool size for the Anthropic client; enough for the concurrent extraction requests
+MAX_CONNECTIONS = 64
+MAX_KEEPALIVE_CONNECTIONS = 32
+
+# Retries for rate limit (429), overloaded and server errors, with the SDK's exponential backoff
+DEFAULT_MAX_RETRIES = 5
+
+# Upper bound on concurrent LLM requests when adapting to rate limits
+DEFAULT_MAX_CONCURRENCY = MAX_CONNECTIONS
+
+# Maximum number of requests submitted in one Message Batches API batch
+MAX_BATCH_REQUESTS = 10000
+
+def default_concurrency() -> int:
+    """
+    Pick a starting number of concurrent LLM requests from the CPUs available to this process
+    
+    Returns:
+        Four requests per CPU, between 4 and 32
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 4
+    return min(32, max(4, cpus * 4))
+
+class RequestRateLimiter:
+    """
+    Limits how many requests start within any sliding window of time (e.g. requests per minute)
+    """
+    
+    def __init__(self, requests_per_minute: int, window: float = 60.0):
+        """
+        Initialize the limiter
+        
+        Args:
+            requests_per_minute: Maximum number of requests started per window
+            window: Length of the window in seconds
+        """
+        self.requests_per_minute = max(1, requests_per_minute)
+        self.window = window
+        self._starts = deque()
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        """Block until a request can start without exceeding the limit, and record its start"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._starts and now - self._starts[0] >= self.window:
+                    self._starts.popleft()
+                if len(self._starts) < self.requests_per_minute:
+                    self._starts.append(now)
+                    return
+                # Sleep until the oldest request in the window drops out of it
+                delay = self.window - (now - self._starts[0])
+            time.sleep(delay)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of LLM requests in flight and adapts the limit to the API's rate limits
+    
+    Each rate-limited (429) response halves the limit until the rate limit window resets,
+    after which the earlier limit is restored; every few successful responses in a row raise
+    the limit by one, up to the maximum. Used as a context manager around each request.
+    """
+    
+    def __init__(self, initial: int, maximum: int = DEFAULT_MAX_CONCURRENCY, increase_after: int = 5,
+                 requests_per_minute: Optional[int] = None):
+        """
+        Initialize the limiter
+        
+        Args:
+            initial: Starting number of concurrent requests
+            maximum: Hard cap on concurrent requests
+            increase_after: Consecutive successful responses before the limit is raised
+            requests_per_minute: Also keep the request rate under this many requests per minute
+        """
+        self.maximum = max(1, maximum)
+        self.limit = min(max(1, initial), self.maximum)
+        self.increase_after = increase_after
+        self._in_flight = 0
+        self._successes = 0
+        self._restore_limit = None
+        self._restore_at = 0.0
+        self._condition = threading.Condition()
+        self.request_rate = RequestRateLimiter(requests_per_minute) if requests_per_minute else None
+    
+    def __enter__(self):
+        with self._condition:
+            while True:
+                self._restore_if_due()
+                if self._in_flight < self.limit:
+                    break
+                # Wake up when a lowered limit is due to be restored, if nobody finishes first
+                timeout = None
+                if self._restore_limit is not None:
+                    timeout = max(0.0, self._restore_at - time.monotonic())
+                self._condition.wait(timeout)
+            self._in_flight += 1
+        
+        if self.request_rate is not None:
+            try:
+                self.request_rate.wait()
+            except BaseException:
+                self.__exit__(None, None, None)
+                raise
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+        return False
+    
+    def _restore_if_due(self):
+        """Restore the limit from before the last rate limit once its window has reset (lock held)"""
+        if self._restore_limit is not None and time.monotonic() >= self._restore_at:
+            self.limit = max(self.limit, self._restore_limit)
+            self._restore_limit = None
+            logger.info(f"Rate limit window reset, concurrency back to {self.limit}")
+            self._condition.notify_all()
+    
+    def record_success(self):
+        """Count a successful response, raising the limit after enough of them in a row"""
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.increase_after:
+                self._successes = 0
+                if self.limit < self.maximum:
+                    self.limit += 1
+                    self._condition.notify()
+    
+    def record_rate_limit(self, reset_after: float):
+        """
+        Halve the limit after a rate-limited response
+        
+        Args:
+            reset_after: Seconds until the rate limit window resets
+        """
+        with self._condition:
+            self._successes = 0
+            if self._restore_limit is None:
+                self._restore_limit = self.limit
+            self.limit = max(1, self.limit // 2)
+            self._restore_at = max(self._restore_at, time.monotonic() + reset_after)
+            logger.warning(f"Rate limited, reducing concurrency to {self.limit} for {reset_after:.0f}s")
+    
+    def observe_response(self, response):
+        """
+        httpx response hook that feeds every API response, including retried ones, to the limiter
+        
+        Args:
+            response: httpx.Response
+        """
+        if response.status_code == 429:
+            self.record_rate_limit(rate_limit_reset_after(response.headers))
+        elif response.status_code < 400:
+            self.record_success()
+
+def rate_limit_reset_after(headers) -> float:
+    """
+    Get the number of seconds until a rate limit resets from the response headers
+    
+    Args:
+        headers: Response headers
+        
+    Returns:
+        Seconds from retry-after or anthropic-ratelimit-requests-reset, or 60 if neither is usable
+    """
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+    
+    reset = headers.get("anthropic-ratelimit-requests-reset")
+    if reset:
+        try:
+            reset_at = datetime.fromisoformat(reset.replace("Z", "+00:00"))
+            return max(0.0, reset_at.timestamp() - time.time())
+        except ValueError:
+            pass
+    
+    return 60.0
+
+class RateLimitedClient:
+    """
+    Wraps an Anthropic client so that its messages calls wait for a slot in a concurrency limiter
+    """
+    
+    def __init__(self, client, limiter: AdaptiveConcurrencyLimiter):
+        """
+        Initialize the wrapper
+        
+        Args:
+            client: anthropic.Anthropic client
+            limiter: Limiter shared by all requests made through this client
+        """
+        self._client = client
+        self.limiter = limiter
+        self.messages = _RateLimitedMessages(client.messages, limiter)
+    
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+class _RateLimitedMessages:
+    """Messages resource whose create and stream calls go through a concurrency limiter"""
+    
+    def __init__(self, messages, limiter: AdaptiveConcurrencyLimiter):
+        self._messages = messages
+        self._limiter = limiter
+    
+    def create(self, **kwargs):
+        with self._limiter:
+            return self._messages.create(**kwargs)
+    
+    @contextlib.contextmanager
+    def stream(self, **kwargs):
+        # The slot is held until the stream is closed, not just until the headers arrive
+        with self._limiter:
+            with self._messages.stream(**kwargs) as stream:
+                yield stream
+    
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+def create_anthropic_client(api_key: str, max_retries: int = DEFAULT_MAX_RETRIES,
+                            limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+    """
+    Create an Anthropic client with a connection pool sized for concurrent requests
+    
+    Connections are kept alive and reused across requests, so concurrent calls do not each
+    pay for a new TCP/TLS handshake. HTTP/2 is enabled when EMPOHOP_HTTP2=1 is set and
+    the h2 package is installed. Rate-limited and failed requests are retried with
+    exponential backoff by the SDK, which matters once many requests run concurrently.
+    
+    Args:
+        api_key: Anthropic API key
+        max_retries: Maximum number of retries per request
+        limiter: Limiter to run messages calls through and to report responses to
+        
+    Returns:
+        anthropic.Anthropic client, wrapped in a RateLimitedClient when a limiter is given
+        
+    Raises:
+        ImportError: If the anthropic package is not installed
+    """
+    import anthropic
+    import httpx
+    
+    http2 = os.environ.get(HTTP2_ENV_VAR) == "1"
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning(f"{HTTP2_ENV_VAR}=1 but the h2 package is not installed, using HTTP/1.1")
+            http2 = False
+    
+    # DefaultHttpxClient keeps the SDK's default timeouts and redirect handling
+    http_client = anthropic.DefaultHttpxClient(
+        http2=http2,
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS),
+        event_hooks={"response": [limiter.observe_response]} if limiter is not None else None
+    )
+    client = anthropic.Anthropic(api_key=api_key, http_client=http_client, max_retries=max_retries)
+    if limiter is not None:
+        return RateLimitedClient(client, limiter)
+    return client
+
+def response_content(message) -> Union[str, Dict]:
+    """
+    Get the content of a messages API response
+    
+    Args:
+        message: Message returned by messages.create or by the batch API
+        
+    Returns:
+        The input of the first tool_use block if the model called a tool, which the API
+        delivers already parsed, and otherwise the text of the text blocks
+    """
+    for block in message.content:
+        if block.type == "tool_use":
+            return block.input
+    return "".join(block.text for block in message.content if block.type == "text")
+
+def run_message_batch(client, requests: Dict[str, Dict], poll_interval: float = 30.0,
+                      max_poll_interval: Optional[float] = None) -> Dict[str, Union[str, Dict]]:
+    """
+    Run requests through the Anthropic Message Batches API and wait for the results
+    
+    Batches are processed asynchronously by the API at a discount, so this suits large
+    runs where results are not needed as they arrive.
+    
+    Args:
+        client: anthropic.Anthropic client
+        requests: Keyword arguments for messages.create by custom ID ([a-zA-Z0-9_-], up to 64 characters)
+        poll_interval: Seconds to wait before the first status check
+        max_poll_interval: If set, the wait doubles after each check up to this many seconds
+        
+    Returns:
+        Response content by custom ID, from response_content, for the requests that succeeded
+    """
+    request_items = list(requests.items())
+    responses = {}
+    
+    for start in range(0, len(request_items), MAX_BATCH_REQUESTS):
+        batch_items = request_items[start:start + MAX_BATCH_REQUESTS]
+        batch = client.messages.batches.create(
+            requests=[{"custom_id": custom_id, "params": params} for custom_id, params in batch_items]
+        )
+        logger.info(f"Submitted message batch {batch.id} with {len(batch_items)} requests")
+        
+        wait = poll_interval
+        while batch.processing_status != "ended":
+            time.sleep(wait)
+            if max_poll_interval is not None:
+                wait = min(wait * 2, max_poll_interval)
+            batch = client.messages.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            logger.info(f"Message batch {batch.id}: {counts.processing} processing, "
+                        f"{counts.succeeded} succeeded, {counts.errored} errored")
+        
+        for entry in client.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                logger.warning(f"Batch request {entry.custom_id} did not succeed: {entry.result.type}")
+                continue
+            responses[entry.custom_id] = response_content(entry.result.message)
+    
+    return responses
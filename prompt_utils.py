@@ -0,0 +1,120 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Section of the prompt templates that holds the chunk text
+TEXT_SECTION = "Text to analyze:\n{text}\n"
+
+# Marks a prompt block as cacheable by Anthropic's prompt cache
+CACHE_CONTROL = {"type": "ephemeral"}
+
+@lru_cache(maxsize=None)
+def split_prompt_template(prompt_template: str) -> Tuple[str, str]:
+    """
+    Split a prompt template around its {text} placeholder
+    
+    The halves are computed once per template with the doubled {{ }} braces already
+    unescaped, so a prompt can be built by concatenation instead of str.format
+    re-parsing every brace of the JSON schema on each call.
+    
+    Args:
+        prompt_template: Prompt template with a single {text} placeholder
+        
+    Returns:
+        Tuple of (prefix, suffix) to concatenate around the text
+        
+    Raises:
+        KeyError: If the template has no {text} placeholder
+    """
+    if "{text}" not in prompt_template:
+        raise KeyError("text")
+    
+    prefix, suffix = prompt_template.split("{text}", 1)
+    return (
+        prefix.replace("{{", "{").replace("}}", "}"),
+        suffix.replace("{{", "{").replace("}}", "}")
+    )
+
+def build_prompt(prompt_template: str, text: str) -> str:
+    """
+    Build a prompt from a template and the text to analyze
+    
+    Args:
+        prompt_template: Prompt template with a single {text} placeholder
+        text: Text to insert
+        
+    Returns:
+        The prompt, equivalent to prompt_template.format(text=text)
+    """
+    prefix, suffix = split_prompt_template(prompt_template)
+    return prefix + text + suffix
+
+@lru_cache(maxsize=None)
+def get_prompt_instructions(prompt_template: str) -> Optional[str]:
+    """
+    Get the static instructions of a prompt template, without its text section
+    
+    Computed once per template, since the instructions are identical for every chunk.
+    
+    Args:
+        prompt_template: Prompt template
+        
+    Returns:
+        The instructions, or None if the template has no standard "Text to analyze" section
+    """
+    if TEXT_SECTION not in prompt_template:
+        return None
+    return prompt_template.replace(TEXT_SECTION, "").format()
+
+@lru_cache(maxsize=None)
+def get_system_blocks(system_prompt: str) -> List[Dict]:
+    """
+    Get the system parameter for a system prompt, marked as cacheable
+    
+    Built once per system prompt and shared by every request that uses it, so callers
+    must not modify the returned list.
+    
+    Args:
+        system_prompt: System prompt text
+        
+    Returns:
+        List with the system prompt as a single cacheable text block
+    """
+    return [{"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}]
+
+def build_prompt_content(prompt_template: str, text: str) -> List[Dict]:
+    """
+    Build the user message content for a prompt template and chunk text
+    
+    The static instructions and JSON schema are sent first as a cacheable block so that
+    repeated calls with the same template can be served from Anthropic's prompt cache;
+    only the chunk text follows as a variable block.
+    
+    Args:
+        prompt_template: Prompt template with a "Text to analyze" section
+        text: Chunk text to analyze
+        
+    Returns:
+        List of content blocks for the user message
+    """
+    instructions = get_prompt_instructions(prompt_template)
+    if instructions is None:
+        # Templates without the standard text section are sent as a single block
+        return [{"type": "text", "text": build_prompt(prompt_template, text)}]
+    
+    return [
+        {"type": "text", "text": instructions, "cache_control": CACHE_CONTROL},
+        {"type": "text", "text": f"Text to analyze:\n{text}"}
+    ]
+
+def build_batch_chunk(chunks: List[Dict]) -> Dict:
+    """
+    Combine several chunks into one pseudo-chunk for a batched prompt
+    
+    Args:
+        chunks: Document chunks to combine
+        
+    Returns:
+        Chunk whose text holds each chunk after a "--- CHUNK N ---" marker
+    """
+    batch_text = "\n\n".join(f"--- CHUNK {n} ---\n{chunk['text']}" for n, chunk in enumerate(chunks))
+    return {"chunk_id": chunks[0].get("chunk_id", "batch"), "text": batch_text}
@@ -1,9 +1,17 @@
+import itertools
 import json
 import logging
+import operator
+import os
 import re
-import uuid
-from typing import Dict, List, Optional, Any
-import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple, Union
+import json_utils
+from id_utils import new_id
+from llm_utils import DEFAULT_MODEL, default_concurrency, response_content
+from prompt_utils import build_batch_chunk, build_prompt_content, get_system_blocks
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -43,19 +51,432 @@ Respond in the following JSON format:
 }}
 """
 
+# Relationship prompt for several chunks at once, with one relationship list per chunk.
+# Built from the single-chunk prompt so both always ask for the same relationship fields
+_RELATIONSHIP_INSTRUCTIONS, _RELATIONSHIP_SCHEMA = RELATIONSHIP_EXTRACTION_PROMPT.split("Respond in the following JSON format:\n")
+BATCHED_RELATIONSHIP_PROMPT = (
+    _RELATIONSHIP_INSTRUCTIONS.replace(
+        "For each relationship, include supporting text that evidences this relationship.\n",
+        "For each relationship, include supporting text that evidences this relationship.\n"
+        "The text consists of several chunks, each starting with a \"--- CHUNK N ---\" marker. "
+        "Extract the relationships of each chunk separately, and use an empty list for chunks "
+        "without relationships.\n"
+    )
+    + "Respond in the following JSON format, with one entry per chunk, where chunk_index is "
+    + "the N from the chunk's marker and each entry holds the relationships of that chunk:\n"
+    + "{{\n  \"chunks\": [\n    {{\n      \"chunk_index\": N,\n"
+    + "".join(f"    {line}\n" for line in _RELATIONSHIP_SCHEMA.strip().splitlines()[1:-1])
+    + "    }}\n  ]\n}}\n"
+)
+
+# Maximum number of chunks whose relationships are extracted with one LLM call
+RELATIONSHIP_BATCH_SIZE = 8
+
+# Batched responses hold the relationships of several chunks, so they get a larger token budget
+BATCHED_RELATIONSHIP_MAX_TOKENS = 16000
+
+# Schema of one extracted relationship, matching the JSON format in the prompts
+RELATIONSHIP_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "source": {"type": "string", "description": "Source entity name"},
+        "source_type": {"type": "string", "enum": ["Event", "Actor", "Concept", "Publication", "Location"]},
+        "target": {"type": "string", "description": "Target entity name"},
+        "target_type": {"type": "string", "enum": ["Event", "Actor", "Concept", "Publication", "Location"]},
+        "relationship_type": {"type": "string", "description": "Influences, Participates, Develops, etc."},
+        "description": {"type": "string", "description": "Description of the relationship"},
+        "strength": {"type": "integer", "minimum": 1, "maximum": 5},
+        "supporting_text": {"type": "string", "description": "The exact text excerpt that supports this relationship"}
+    },
+    "required": ["source", "source_type", "target", "target_type", "relationship_type"]
+}
+
+# Tools the model is made to call with its relationships, so the API returns them already
+# parsed instead of as JSON text in the response
+RELATIONSHIP_TOOL = {
+    "name": "submit_relationships",
+    "description": "Submit the relationships extracted from the text",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "relationships": {"type": "array", "items": RELATIONSHIP_SCHEMA}
+        },
+        "required": ["relationships"]
+    }
+}
+BATCHED_RELATIONSHIP_TOOL = {
+    "name": "submit_chunk_relationships",
+    "description": "Submit the relationships extracted from each chunk of the text",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "chunks": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "chunk_index": {"type": "integer", "description": "The N from the chunk's marker"},
+                        "relationships": {"type": "array", "items": RELATIONSHIP_SCHEMA}
+                    },
+                    "required": ["chunk_index", "relationships"]
+                }
+            }
+        },
+        "required": ["chunks"]
+    }
+}
+
+# System prompt for relationship extraction
+RELATIONSHIP_SYSTEM_PROMPT = "You are an expert in extracting relationships between entities in planetary health texts."
+
+# Year mentioned in an entity name
+YEAR_PATTERN = re.compile(r'\b(19|20)\d{2}\b')
+
+# Constant fields of entities auto-created from relationships, by entity type
+AUTO_CREATED_ENTITY_FIELDS = {
+    "event": {"type": "Other", "significance": 3},  # Medium significance by default
+    "actor": {"type": "Other", "role": "Extracted from relationship"},
+    "concept": {"significance": 3},
+    "publication": {"type": "Other"},
+    "location": {"type": "Other"}
+}
+
+# Field holding the name of an entity, for types that do not use "name"
+ENTITY_NAME_FIELDS = {"event": "title"}
+
+# Fields that identify a relationship when deduplicating, read with one C call
+RELATIONSHIP_KEY = operator.itemgetter("source_id", "target_id", "relationship_type")
+
+# Entity types whose year is taken from the name when it mentions one
+YEAR_ENTITY_TYPES = frozenset({"event", "publication"})
+
+# Patterns used to normalize entity names for fuzzy matching, compiled once
+PARENTHETICAL_PATTERN = re.compile(r'\s*\([^)]*\)')
+ARTICLE_PREFIX_PATTERN = re.compile(r'^(the|a|an)\s+')
+GENERIC_SUFFIX_PATTERN = re.compile(r'\s+(movements?|laws?|concepts?|theories|theorys?|models?)$')
+ABBREVIATIONS = {
+    'ron': 'rights of nature',
+    'us': 'united states',
+    'uk': 'united kingdom'
+}
+ABBREVIATION_PATTERN = re.compile(r'\b(' + '|'.join(map(re.escape, ABBREVIATIONS)) + r')\b')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Words that make a partial name match more likely to be the same entity
+KEY_WORDS = frozenset({'rights', 'nature', 'environmental', 'indigenous', 'constitutional', 'treaty', 'development'})
+
+# Similarity added when two names share one of the KEY_WORDS
+KEY_WORD_BONUS = 0.2
+
+# Similarity of two names when one contains the other
+CONTAINMENT_SIMILARITY = 0.8
+
+# Length of the character n-grams that find names containing, or contained in, a target
+NAME_GRAM_LENGTH = 3
+
+# Minimum number of distinct names in a block before their fuzzy matches are computed in parallel
+PARALLEL_MATCH_MIN_NAMES = 5000
+
+# Number of relationships whose names are fuzzy-matched together before they are resolved
+RESOLVE_BLOCK_SIZE = 50000
+
+# Words hyphenated across a line break in extracted PDF text
+LINE_BREAK_HYPHEN_PATTERN = re.compile(r'(\w)-[ \t]*\n\s*(\w)')
+
+def normalize_chunk_text(text: str) -> str:
+    """
+    Normalize chunk text so that copies differing only in layout compare equal
+    
+    Shared boilerplate and abstracts come out of different documents with different line
+    wrapping, hyphenation and capitalization, which an exact text match misses.
+    
+    Args:
+        text: Chunk text
+        
+    Returns:
+        Lowercased text with line-break hyphenation removed and whitespace collapsed
+    """
+    text = LINE_BREAK_HYPHEN_PATTERN.sub(r'\1\2', text)
+    return WHITESPACE_PATTERN.sub(' ', text).strip().lower()
+
+@lru_cache(maxsize=65536)
+def normalize_entity_name(name: str) -> str:
+    """
+    Normalize an entity name for fuzzy matching
+    
+    Cached, since the same entity names are compared against every relationship.
+    
+    Args:
+        name: Entity name
+        
+    Returns:
+        Lowercased name without qualifiers, articles, generic suffixes and punctuation
+    """
+    if not name:
+        return ""
+    
+    # Convert to lowercase
+    normalized = name.lower()
+    
+    # Remove common parenthetical qualifiers
+    normalized = PARENTHETICAL_PATTERN.sub('', normalized)
+    
+    # Remove common prefixes/suffixes
+    normalized = ARTICLE_PREFIX_PATTERN.sub('', normalized)
+    normalized = GENERIC_SUFFIX_PATTERN.sub('', normalized)
+    
+    # Replace common abbreviations
+    normalized = ABBREVIATION_PATTERN.sub(lambda match: ABBREVIATIONS[match.group(1)], normalized)
+    
+    # Remove extra whitespace and punctuation
+    normalized = PUNCTUATION_PATTERN.sub('', normalized)
+    normalized = WHITESPACE_PATTERN.sub(' ', normalized).strip()
+    
+    return normalized
+
+def name_similarity(norm1: str, norm2: str, words1: Optional[frozenset] = None, words2: Optional[frozenset] = None) -> float:
+    """
+    Calculate the similarity of two normalized entity names from their word overlap
+    
+    Args:
+        norm1: First name, from normalize_entity_name
+        norm2: Second name, from normalize_entity_name
+        words1: Words of the first name, if already split
+        words2: Words of the second name, if already split
+        
+    Returns:
+        Similarity between 0 and 1
+    """
+    if not norm1 or not norm2:
+        return 0.0
+    
+    # Exact match after normalization
+    if norm1 == norm2:
+        return 1.0
+    
+    # Check if one is contained in the other
+    if norm1 in norm2 or norm2 in norm1:
+        return CONTAINMENT_SIMILARITY
+    
+    # Calculate word overlap
+    if words1 is None:
+        words1 = frozenset(norm1.split())
+    if words2 is None:
+        words2 = frozenset(norm2.split())
+    
+    if not words1 or not words2:
+        return 0.0
+    
+    intersection = words1.intersection(words2)
+    
+    # Jaccard similarity
+    jaccard = len(intersection) / (len(words1) + len(words2) - len(intersection))
+    
+    # Boost score if key words match
+    key_word_bonus = 0.0
+    
+    if not KEY_WORDS.isdisjoint(intersection):
+        key_word_bonus = KEY_WORD_BONUS
+    
+    return min(1.0, jaccard + key_word_bonus)
+
+def name_grams(normalized_name: str) -> frozenset:
+    """
+    Get the character n-grams of a normalized entity name
+    
+    Args:
+        normalized_name: Name from normalize_entity_name
+        
+    Returns:
+        Set of the name's NAME_GRAM_LENGTH-character substrings, empty if the name is shorter
+    """
+    return frozenset(normalized_name[n:n + NAME_GRAM_LENGTH] for n in range(len(normalized_name) - NAME_GRAM_LENGTH + 1))
+
+def build_entity_lookup(entities_by_type: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+    """
+    Index entities by ID
+    
+    Args:
+        entities_by_type: Dictionary of entities organized by type
+        
+    Returns:
+        Dictionary of entities by ID
+    """
+    return {entity["id"]: entity for entity_list in entities_by_type.values() for entity in entity_list}
+
+class EntityNameIndex:
+    """
+    Normalized names of the entities of one type, indexed for fuzzy matching
+    
+    A name can only be a fuzzy match for a target if they share a word or one contains the
+    other (e.g. "wetland" and "wetlands"). Names sharing a word are found through the word
+    postings. A name containing the target has all of the target's character n-grams, and a
+    name contained in the target starts with one of them, so the n-gram postings find those.
+    Either way only a short list of candidates is scored instead of every entity.
+    """
+    
+    def __init__(self):
+        """Initialize an empty index"""
+        self.names = []
+        self.ids = []
+        self.words = []
+        self.postings = {}
+        self.gram_postings = {}
+        self.first_gram_postings = {}
+        self.short_names = []
+    
+    def add(self, normalized_name: str, entity_id: Optional[str]):
+        """
+        Add an entity
+        
+        Args:
+            normalized_name: Entity name, from normalize_entity_name
+            entity_id: ID of the entity
+        """
+        position = len(self.names)
+        words = frozenset(normalized_name.split())
+        self.names.append(normalized_name)
+        self.ids.append(entity_id)
+        self.words.append(words)
+        for word in words:
+            self.postings.setdefault(word, []).append(position)
+        
+        grams = name_grams(normalized_name)
+        if grams:
+            for gram in grams:
+                self.gram_postings.setdefault(gram, []).append(position)
+            self.first_gram_postings.setdefault(normalized_name[:NAME_GRAM_LENGTH], []).append(position)
+        else:
+            self.short_names.append(position)
+    
+    def candidates(self, words: set) -> List[int]:
+        """
+        Find the entities that share at least one word with a name
+        
+        Args:
+            words: Words of the normalized name
+            
+        Returns:
+            Positions of the matching entities in names and ids, in the order they were added
+        """
+        positions = set()
+        for word in words:
+            positions.update(self.postings.get(word, ()))
+        return sorted(positions)
+    
+    def containment_candidates(self, normalized_name: str) -> List[int]:
+        """
+        Find the entities whose names might contain a name or be contained in it
+        
+        Args:
+            normalized_name: Name to match, from normalize_entity_name
+            
+        Returns:
+            Positions of the possible matches in names and ids, in the order they were added
+        """
+        grams = name_grams(normalized_name)
+        if not grams:
+            # Any name may contain a name shorter than an n-gram
+            return list(range(len(self.names)))
+        
+        # A name containing the target is in every one of its grams' postings, so the shortest will do
+        positions = set(self.short_names)
+        positions.update(min((self.gram_postings.get(gram, ()) for gram in grams), key=len))
+        for gram in grams:
+            positions.update(self.first_gram_postings.get(gram, ()))
+        return sorted(positions)
+    
+    def best_match(self, normalized_name: str, threshold: float = 0.6, start: int = 0) -> Tuple[Optional[str], float]:
+        """
+        Find the entity whose name is most similar to a name
+        
+        Only entities that share a word with the name are scored with name_similarity, and
+        the names containing it or contained in it are checked if they could score higher.
+        
+        Args:
+            normalized_name: Name to match, from normalize_entity_name
+            threshold: Score a match must exceed
+            start: Only consider entities added at or after this position
+            
+        Returns:
+            Tuple of (ID of the earliest entity with the best score, or None if no score exceeds
+            the threshold, best score or the threshold)
+        """
+        if not normalized_name:
+            return None, threshold
+        
+        target_words = frozenset(normalized_name.split())
+        positions = self.candidates(target_words)
+        if start:
+            positions = [position for position in positions if position >= start]
+        
+        # Candidate words were split once, when they were indexed
+        scores = ((position, name_similarity(normalized_name, self.names[position], target_words, self.words[position]))
+                  for position in positions)
+        
+        best_position = None
+        best_score = threshold
+        
+        for position, score in scores:
+            if score > best_score:
+                best_score = score
+                best_position = position
+        
+        # Names without a shared word can still contain the target or be contained in it
+        if best_score <= CONTAINMENT_SIMILARITY and threshold < CONTAINMENT_SIMILARITY:
+            for position in self.containment_candidates(normalized_name):
+                if best_position is not None and best_score == CONTAINMENT_SIMILARITY and position >= best_position:
+                    break
+                name = self.names[position]
+                if position >= start and (normalized_name in name or name in normalized_name):
+                    best_score = CONTAINMENT_SIMILARITY
+                    best_position = position
+                    break
+        
+        if best_position is None:
+            return None, threshold
+        return self.ids[best_position], best_score
+
+def match_entity_names(lookups: List[Tuple[str, str]], match_candidates: Dict[str, EntityNameIndex],
+                       threshold: float = 0.6) -> List[Tuple[Optional[str], float]]:
+    """
+    Fuzzy-match entity names against indexed entities
+    
+    A module-level function so that blocks of names can be matched in worker processes.
+    
+    Args:
+        lookups: (entity type, entity name) pairs
+        match_candidates: Entity name index by type
+        threshold: Score a match must exceed
+        
+    Returns:
+        (entity ID or None, score) for each lookup, from EntityNameIndex.best_match
+    """
+    results = []
+    for entity_type, entity_name in lookups:
+        index = match_candidates.get(entity_type)
+        if index is None:
+            results.append((None, threshold))
+        else:
+            results.append(index.best_match(normalize_entity_name(entity_name), threshold))
+    return results
+
 class RelationshipProcessor:
     """
     Handles extraction, resolution, and processing of relationships between entities
     """
     
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, cache=None):
         """
         Initialize the relationship processor
         
         Args:
             llm_client: Client for the primary LLM
+            cache: ResponseCache for parsed LLM responses (optional)
         """
         self.llm_client = llm_client
+        self.cache = cache
         logger.info("Initialized RelationshipProcessor")
     
     def extract_relationships_from_chunk(self, chunk: Dict) -> List[Dict]:
@@ -69,126 +490,400 @@ class RelationshipProcessor:
             List of extracted relationships
         """
         try:
-            # Format prompt with chunk text
-            prompt = RELATIONSHIP_EXTRACTION_PROMPT.format(text=chunk["text"])
+            # Return cached relationships if this chunk text was already processed
+            cache_key = None
+            if self.cache is not None:
+                cached_relationships = self.cached_chunk_relationships(chunk)
+                if cached_relationships is not None:
+                    return cached_relationships
+                cache_key = self.relationship_cache_key(chunk)
             
             # Call LLM API
-            response = self.llm_client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=8000,
-                system="You are an expert in extracting relationships between entities in planetary health texts.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1
-            )
-
-            # Get the raw response content
-            content = response.content[0].text.strip()
+            response = self.llm_client.messages.create(**self.build_relationship_request(chunk))
+            relationships = self.parse_relationship_response(response_content(response), chunk, cache_key)
+            # Share the relationships with near-duplicate chunks, if the response parsed and was cached
+            if cache_key is not None and self.cache.contains(cache_key):
+                self.cache.set(self.near_duplicate_cache_key(chunk), relationships)
+            return relationships
+        
+        except Exception as e:
+            logger.error(f"Error extracting relationships from chunk: {str(e)}")
+            return []
+    
+    def extract_relationships_from_chunk_batch(self, chunks: List[Dict]) -> List[List[Dict]]:
+        """
+        Extract relationships from several document chunks with a single LLM call
+        
+        Chunks whose relationships are already cached, including under a near-duplicate chunk's
+        key, are left out of the batch. Chunks the response leaves out, or all of them if the
+        batched response cannot be parsed, are extracted individually with
+        extract_relationships_from_chunk instead.
+        
+        Args:
+            chunks: Document chunks to process together
+            
+        Returns:
+            List of extracted relationships for each chunk, in order
+        """
+        results = [None] * len(chunks)
+        if self.cache is not None:
+            results = [self.cached_chunk_relationships(chunk) for chunk in chunks]
+        
+        pending = [n for n, relationships in enumerate(results) if relationships is None]
+        if len(pending) == 1:
+            results[pending[0]] = self.extract_relationships_from_chunk(chunks[pending[0]])
+        elif pending:
+            pending_chunks = [chunks[n] for n in pending]
+            for n, relationships in zip(pending, self._extract_relationships_from_uncached_batch(pending_chunks)):
+                results[n] = relationships
+        
+        return results
+    
+    def _extract_relationships_from_uncached_batch(self, chunks: List[Dict]) -> List[List[Dict]]:
+        """
+        Extract relationships from several uncached document chunks with a single LLM call
+        
+        Args:
+            chunks: Document chunks to process together
+            
+        Returns:
+            List of extracted relationships for each chunk, in order
+        """
+        batch_chunk = build_batch_chunk(chunks)
+        results = None
+        try:
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.relationship_cache_key(batch_chunk, BATCHED_RELATIONSHIP_PROMPT)
+                results = self.cache.get(cache_key)
             
+            if results is None:
+                response = self.llm_client.messages.create(**self.build_relationship_request(batch_chunk, BATCHED_RELATIONSHIP_PROMPT))
+                results = self.parse_relationship_batch_response(response_content(response), len(chunks), cache_key)
+        
+        except Exception as e:
+            logger.error(f"Error extracting relationships from chunk batch: {str(e)}")
+        
+        if not isinstance(results, list) or len(results) != len(chunks):
+            results = [None] * len(chunks)
+        
+        # Cache each chunk's relationships under its own key, so the chunk and its near
+        # duplicates are found again whichever batch they end up in
+        if self.cache is not None:
+            for chunk, relationships in zip(chunks, results):
+                if relationships is not None:
+                    self.cache.set(self.near_duplicate_cache_key(chunk), relationships)
+        
+        missing = [n for n, relationships in enumerate(results) if relationships is None]
+        if missing:
+            logger.warning(f"Batched relationship response is missing {len(missing)} of {len(chunks)} chunks, processing them individually")
+            for n in missing:
+                results[n] = self.extract_relationships_from_chunk(chunks[n])
+        
+        for chunk, relationships in zip(chunks, results):
+            for rel in relationships:
+                if isinstance(rel, dict):
+                    rel["source_chunk"] = chunk.get("chunk_id", "unknown")
+        
+        return results
+    
+    def cached_chunk_relationships(self, chunk: Dict) -> Optional[List[Dict]]:
+        """
+        Look up a chunk's cached relationships, by its exact text or its normalized text
+        
+        Args:
+            chunk: Document chunk with text and metadata
+            
+        Returns:
+            Cached relationships attributed to the chunk, or None if none are cached
+        """
+        cached_relationships = self.cache.get(self.relationship_cache_key(chunk))
+        if cached_relationships is None:
+            # Fall back to the relationships of a chunk with the same text in a different layout
+            cached_relationships = self.cache.get(self.near_duplicate_cache_key(chunk))
+        
+        if cached_relationships is not None:
+            for rel in cached_relationships:
+                if isinstance(rel, dict):
+                    rel["source_chunk"] = chunk.get("chunk_id", "unknown")
+        return cached_relationships
+    
+    def parse_relationship_batch_response(self, response: Union[str, Dict], chunk_count: int, cache_key: Optional[str] = None) -> Optional[List[Optional[List[Dict]]]]:
+        """
+        Parse a batched relationship extraction response
+        
+        Args:
+            response: Tool input of the LLM response, or its raw text
+            chunk_count: Number of chunks in the batch
+            cache_key: Key to cache the parsed relationships under, once every chunk is present
+            
+        Returns:
+            Relationships for each chunk, with None for chunks the response leaves out,
+            or None if the response is not valid JSON
+        """
+        if isinstance(response, dict):
+            result = response
+        else:
+            try:
+                result = json_utils.loads_json_object(json_utils.extract_json_text(response.strip()))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse batched relationship extraction response as JSON: {str(e)}")
+                return None
+        
+        results = [None] * chunk_count
+        chunk_results = result.get("chunks") if isinstance(result, dict) else None
+        for chunk_result in chunk_results or []:
+            if not isinstance(chunk_result, dict):
+                continue
+            n = chunk_result.get("chunk_index")
+            relationships = chunk_result.get("relationships", [])
+            if isinstance(n, int) and 0 <= n < chunk_count and results[n] is None and isinstance(relationships, list):
+                results[n] = relationships
+        
+        if cache_key is not None and None not in results:
+            self.cache.set(cache_key, results)
+        
+        return results
+    
+    def relationship_cache_key(self, chunk: Dict, prompt_template: str = RELATIONSHIP_EXTRACTION_PROMPT) -> str:
+        """
+        Get the response cache key for a chunk's relationship extraction
+        
+        Args:
+            chunk: Document chunk with text and metadata
+            prompt_template: Relationship prompt template
+            
+        Returns:
+            Cache key
+        """
+        return self.cache.make_key("relationship", DEFAULT_MODEL, RELATIONSHIP_SYSTEM_PROMPT, prompt_template, chunk["text"])
+    
+    def near_duplicate_cache_key(self, chunk: Dict) -> str:
+        """
+        Get the response cache key shared by chunks whose text only differs in layout
+        
+        Args:
+            chunk: Document chunk with text and metadata
+            
+        Returns:
+            Cache key of the chunk's normalized text
+        """
+        return self.cache.make_key("relationship-normalized", DEFAULT_MODEL, RELATIONSHIP_SYSTEM_PROMPT,
+                                   RELATIONSHIP_EXTRACTION_PROMPT, normalize_chunk_text(chunk["text"]))
+    
+    def build_relationship_request(self, chunk: Dict, prompt_template: str = RELATIONSHIP_EXTRACTION_PROMPT) -> Dict:
+        """
+        Build the messages API arguments for extracting relationships from a chunk
+        
+        Args:
+            chunk: Document chunk with text and metadata
+            prompt_template: Relationship prompt template (BATCHED_RELATIONSHIP_PROMPT for a
+                chunk built by build_batch_chunk)
+            
+        Returns:
+            Keyword arguments for messages.create
+        """
+        batched = prompt_template == BATCHED_RELATIONSHIP_PROMPT
+        tool = BATCHED_RELATIONSHIP_TOOL if batched else RELATIONSHIP_TOOL
+        return {
+            "model": DEFAULT_MODEL,
+            "max_tokens": BATCHED_RELATIONSHIP_MAX_TOKENS if batched else 8000,
+            "system": get_system_blocks(RELATIONSHIP_SYSTEM_PROMPT),
+            "messages": [
+                {"role": "user", "content": build_prompt_content(prompt_template, chunk["text"])}
+            ],
+            "tools": [tool],
+            "tool_choice": {"type": "tool", "name": tool["name"]},
+            "temperature": 0.1
+        }
+    
+    def parse_relationship_response(self, response: Union[str, Dict], chunk: Dict, cache_key: Optional[str] = None) -> List[Dict]:
+        """
+        Parse a relationship extraction response
+        
+        Args:
+            response: Tool input of the LLM response, or its raw text
+            chunk: Document chunk the response is for
+            cache_key: Key to cache the parsed relationships under
+            
+        Returns:
+            List of extracted relationships
+        """
+        if isinstance(response, dict):
+            # Tool input arrives already parsed
+            result = response
+        else:
             # Parse response
             try:
-                # Try to extract JSON from the response if it's wrapped in markdown code blocks
-                if "```json" in content:
-                    json_start = content.find("```json") + 7
-                    json_end = content.find("```", json_start)
-                    if json_end != -1:
-                        json_content = content[json_start:json_end].strip()
-                        content = json_content
-                elif "```" in content:
-                    json_start = content.find("```") + 3
-                    json_end = content.find("```", json_start)
-                    if json_end != -1:
-                        json_content = content[json_start:json_end].strip()
-                        content = json_content
-                
-                # Try to find JSON object in the content
-                json_start = content.find("{")
-                json_end = content.rfind("}")
-                if json_start != -1 and json_end != -1 and json_end > json_start:
-                    json_content = content[json_start:json_end+1].strip()
-                    content = json_content
+                # Extract the JSON object, whether or not it is wrapped in a markdown code block
+                content = json_utils.extract_json_text(response.strip())
                 
                 # Parse the JSON
-                result = json.loads(content)
-                relationships = result.get("relationships", [])
-                
-                # Add chunk info to relationships for tracking
-                for rel in relationships:
-                    if isinstance(rel, dict):
-                        rel["source_chunk"] = chunk.get("chunk_id", "unknown")
-                
-                return relationships
+                result = json_utils.loads_json_object(content)
                 
             except json.JSONDecodeError as e:
                 logger.warning(f"Failed to parse relationship extraction response as JSON: {str(e)}")
                 return []
-                
-        except Exception as e:
-            logger.error(f"Error extracting relationships from chunk: {str(e)}")
+        
+        relationships = result.get("relationships") if isinstance(result, dict) else None
+        if not isinstance(relationships, list):
+            # E.g. a tool call cut off at max_tokens; not cached, so the chunk is retried next run
+            logger.warning("Relationship extraction response has no relationships list")
             return []
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, relationships)
+        
+        # Add chunk info to relationships for tracking
+        for rel in relationships:
+            if isinstance(rel, dict):
+                rel["source_chunk"] = chunk.get("chunk_id", "unknown")
+        
+        return relationships
     
-    def extract_relationships_from_chunks(self, chunks: List[Dict]) -> List[Dict]:
+    def extract_relationships_from_chunks(self, chunks: List[Dict], concurrency: Optional[int] = None,
+                                          batch_size: int = RELATIONSHIP_BATCH_SIZE) -> List[Dict]:
         """
         Extract relationships from multiple document chunks
         
         Args:
             chunks: List of document chunks
+            concurrency: Maximum number of LLM requests in flight at once (default: from
+                default_concurrency); rate limits are handled by the client's limiter
+            batch_size: Number of consecutive chunks to extract with a single LLM call
             
         Returns:
             List of all extracted relationships
         """
-        all_relationships = []
+        all_relationships = list(itertools.chain.from_iterable(self.iter_extract_relationships(chunks, concurrency, batch_size)))
+        logger.info(f"Extracted {len(all_relationships)} relationships from all chunks")
+        return all_relationships
+    
+    def iter_extract_relationships(self, chunks: Iterable[Dict], concurrency: Optional[int] = None,
+                                   batch_size: int = RELATIONSHIP_BATCH_SIZE) -> Iterator[List[Dict]]:
+        """
+        Extract relationships from document chunks, yielding each chunk's relationships in order
         
-        logger.info(f"Extracting relationships from {len(chunks)} chunks")
+        Only a bounded number of chunk batches are submitted ahead of the one being yielded, so
+        chunks can be a stream and a consumer such as resolve_relationships_with_entities can
+        process and drop each chunk's relationships instead of holding them all.
         
-        for i, chunk in enumerate(chunks):
-            logger.info(f"Processing chunk {i+1}/{len(chunks)} for relationships")
-            
-            chunk_relationships = self.extract_relationships_from_chunk(chunk)
-            
-            # Add chunk index for tracking
-            for rel in chunk_relationships:
-                if isinstance(rel, dict):
-                    rel["source_chunk"] = i
-                    if "id" not in rel:
-                        rel["id"] = str(uuid.uuid4())
-            
-            all_relationships.extend(chunk_relationships)
+        Args:
+            chunks: Document chunks, or an iterator that yields them
+            concurrency: Maximum number of LLM requests in flight at once (default: from
+                default_concurrency); rate limits are handled by the client's limiter
+            batch_size: Number of consecutive chunks to extract with a single LLM call
             
-            # Add a short delay to avoid rate limiting
-            time.sleep(0.5)
+        Returns:
+            Iterator over the relationships of each chunk, with source_chunk set to its index
+        """
+        if concurrency is None:
+            concurrency = default_concurrency()
+        chunk_iter = iter(chunks)
+        batch_size = max(1, batch_size)
+        max_pending = 2 * max(1, concurrency)
+        pending = deque()
+        start = 0
         
-        logger.info(f"Extracted {len(all_relationships)} relationships from all chunks")
-        return all_relationships
+        # LLM calls are I/O-bound, so the chunk batches are extracted concurrently and collected in order
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            while True:
+                # Keep the pool busy with the next batches while the oldest one is yielded
+                while len(pending) < max_pending:
+                    batch = list(itertools.islice(chunk_iter, batch_size))
+                    if not batch:
+                        break
+                    pending.append((start, executor.submit(self.extract_relationships_from_chunk_batch, batch)))
+                    start += len(batch)
+                
+                if not pending:
+                    break
+                
+                batch_start, future = pending.popleft()
+                for i, relationships in enumerate(future.result(), batch_start):
+                    logger.info(f"Processing chunk {i+1} for relationships")
+                    yield self.assign_source_chunk(relationships, i)
     
-    def resolve_relationships_with_entities(self, relationships: List[Dict], entities_by_type: Dict[str, List[Dict]]) -> List[Dict]:
+    def assign_source_chunk(self, relationships: List[Dict], chunk_index: int) -> List[Dict]:
+        """
+        Add the chunk index and an ID to relationships extracted from a chunk
+        
+        Args:
+            relationships: Relationships extracted from the chunk
+            chunk_index: Index of the chunk in the document
+            
+        Returns:
+            The same relationships
+        """
+        for rel in relationships:
+            if isinstance(rel, dict):
+                rel["source_chunk"] = chunk_index
+                if "id" not in rel:
+                    rel["id"] = new_id()
+        return relationships
+    
+    def resolve_relationships_with_entities(self, relationships: Iterable[Dict], entities_by_type: Dict[str, List[Dict]],
+                                            max_workers: Optional[int] = None, deduplicate: bool = False) -> List[Dict]:
         """
         Resolve relationships by mapping entity names to IDs using fuzzy matching.
         If an entity doesn't exist, it will be created with a flag indicating it was extracted from a relationship.
         
         Args:
-            relationships: List of relationships to resolve
+            relationships: Relationships to resolve, as a list or an iterator (e.g. chained from
+                iter_extract_relationships), which is consumed once
             entities_by_type: Dictionary of entities organized by type
+            max_workers: Number of processes to fuzzy-match large blocks of names in (default:
+                the CPU count)
+            deduplicate: Whether to drop duplicates as they are resolved, with the same result as
+                calling deduplicate_relationships on the resolved list
             
         Returns:
             List of resolved relationships with entity IDs
         """
         # Build entity map for fuzzy matching
-        entity_map = self._build_entity_map_with_fuzzy_keys(entities_by_type)
+        entity_map, entity_counts, match_candidates = self._build_entity_indexes(entities_by_type)
+        
+        # Entity names repeat across relationships, so each (type, normalized name) is fuzzy-matched against
+        # the existing entities once; entities created in this pass are indexed separately
+        fuzzy_matches = {}
+        created_candidates = {}
+        created_matches = {}
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        
+        def match_blocks():
+            # Each block's new names are matched before the block is resolved, in parallel if there are many
+            relationship_iter = iter(relationships)
+            while True:
+                block = list(itertools.islice(relationship_iter, RESOLVE_BLOCK_SIZE))
+                if not block:
+                    return
+                self._match_relationship_names(block, entity_map, match_candidates, fuzzy_matches, max_workers)
+                yield from block
+        
+        # (source ID, target ID, type) of the relationships kept so far, when deduplicating
+        seen_keys = set()
+        duplicate_count = 0
         
         resolved_relationships = []
         # Initialize created_entities with all possible entity types, not just the ones in entities_by_type
         all_entity_types = ["event", "actor", "concept", "publication", "location"]
         created_entities = {entity_type: [] for entity_type in all_entity_types}
         
-        logger.info(f"Resolving {len(relationships)} relationships with fuzzy matching")
-        logger.info(f"Entity map keys: {list(entity_map.keys())}")
-        for entity_type, entities in entity_map.items():
-            logger.info(f"  {entity_type}: {len(set(entities.values()))} unique entities")
+        logger.info("Resolving relationships with fuzzy matching")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Entity map keys: {list(entity_map.keys())}")
+            for entity_type, entity_count in entity_counts.items():
+                logger.info(f"  {entity_type}: {entity_count} named entities")
         
-        for i, rel in enumerate(relationships):
-            logger.debug(f"Processing relationship {i+1}: {rel}")
+        # Per-relationship messages are only formatted when debug logging is on; the created
+        # entities are summarized per type after the loop
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        relationship_count = 0
+        for i, rel in enumerate(match_blocks()):
+            relationship_count += 1
+            if debug_enabled:
+                logger.debug(f"Processing relationship {i+1}: {rel}")
             
             source_type = rel.get("source_type", "").lower()
             target_type = rel.get("target_type", "").lower()
@@ -197,16 +892,18 @@ class RelationshipProcessor:
             
             # Skip if missing required fields
             if not source_type or not target_type or not source_name or not target_name:
-                logger.debug(f"Skipping relationship - missing required fields")
+                if debug_enabled:
+                    logger.debug("Skipping relationship - missing required fields")
                 continue
             
             # Look up source and target IDs with fuzzy matching
-            source_id = self._find_entity_id(source_name, source_type, entity_map, entities_by_type)
-            target_id = self._find_entity_id(target_name, target_type, entity_map, entities_by_type)
+            source_id = self._resolve_entity_id(source_name, source_type, entity_map, match_candidates, created_candidates, fuzzy_matches, created_matches)
+            target_id = self._resolve_entity_id(target_name, target_type, entity_map, match_candidates, created_candidates, fuzzy_matches, created_matches)
             
             # Create missing entities if needed
             if not source_id:
-                logger.info(f"Creating new entity for source: {source_name} ({source_type})")
+                if debug_enabled:
+                    logger.debug(f"Creating new entity for source: {source_name} ({source_type})")
                 source_entity = self._create_entity_from_relationship(source_name, source_type, rel, "source")
                 
                 # Ensure the entity type exists in all dictionaries
@@ -224,9 +921,11 @@ class RelationshipProcessor:
                 if source_type not in entities_by_type:
                     entities_by_type[source_type] = []
                 entities_by_type[source_type].append(source_entity)
+                self._add_match_candidate(created_candidates, source_type, source_name, source_id)
             
             if not target_id:
-                logger.info(f"Creating new entity for target: {target_name} ({target_type})")
+                if debug_enabled:
+                    logger.debug(f"Creating new entity for target: {target_name} ({target_type})")
                 target_entity = self._create_entity_from_relationship(target_name, target_type, rel, "target")
                 
                 # Ensure the entity type exists in all dictionaries
@@ -244,10 +943,20 @@ class RelationshipProcessor:
                 if target_type not in entities_by_type:
                     entities_by_type[target_type] = []
                 entities_by_type[target_type].append(target_entity)
+                self._add_match_candidate(created_candidates, target_type, target_name, target_id)
+            
+            if deduplicate:
+                key = (source_id, target_id, rel.get("relationship_type"))
+                if key in seen_keys:
+                    duplicate_count += 1
+                    if debug_enabled:
+                        logger.debug(f"Skipping duplicate relationship: {key}")
+                    continue
+                seen_keys.add(key)
             
             # Create resolved relationship
             resolved_rel = {
-                "id": str(uuid.uuid4()),
+                "id": new_id(),
                 "source_id": source_id,
                 "source_type": source_type,
                 "target_id": target_id,
@@ -266,47 +975,131 @@ class RelationshipProcessor:
             if entities:
                 logger.info(f"Created {len(entities)} new {entity_type} entities from relationships")
         
-        logger.info(f"Successfully resolved: {len(resolved_relationships)}/{len(relationships)} relationships")
+        logger.info(f"Successfully resolved: {len(resolved_relationships) + duplicate_count}/{relationship_count} relationships")
+        if deduplicate:
+            logger.info(f"Deduplicated relationships: {len(resolved_relationships)}/{len(resolved_relationships) + duplicate_count} kept")
         return resolved_relationships
     
-    def _build_entity_map_with_fuzzy_keys(self, entities: Dict[str, List[Dict]]) -> Dict[str, Dict[str, str]]:
+    def _build_entity_indexes(self, entities: Dict[str, List[Dict]]) -> Tuple[Dict[str, Dict[str, str]], Dict[str, int], Dict[str, EntityNameIndex]]:
         """
-        Build a map of entity names to IDs by type, including normalized names for fuzzy matching
+        Build a map of entity names to IDs by type, including normalized names for fuzzy matching,
+        count the mapped entities of each type, and index the normalized names for fuzzy matching,
+        all in one pass that reads and normalizes each entity's name once
         """
         entity_map = {entity_type: {} for entity_type in entities.keys()}
+        entity_counts = dict.fromkeys(entities.keys(), 0)
+        match_candidates = {}
         
         for entity_type, entity_list in entities.items():
+            type_map = entity_map[entity_type]
+            name_field = ENTITY_NAME_FIELDS.get(entity_type, "name")
+            index = None
             for entity in entity_list:
-                if entity_type == "event":
-                    original_name = entity.get("title", "")
-                else:
-                    original_name = entity.get("name", "")
+                original_name = entity.get(name_field, "")
                 
                 # Skip empty names
                 if not original_name:
                     continue
                 
                 entity_id = entity["id"]
+                entity_counts[entity_type] += 1
                 
                 # Store both original and normalized versions
-                entity_map[entity_type][original_name.lower()] = entity_id
+                lowered = original_name.lower()
+                type_map[lowered] = entity_id
                 
                 normalized = self._normalize_name(original_name)
-                if normalized and normalized != original_name.lower():
-                    entity_map[entity_type][normalized] = entity_id
+                if not normalized:
+                    # Names that normalize to nothing can never match
+                    continue
+                if normalized != lowered:
+                    type_map[normalized] = entity_id
+                
+                if index is None:
+                    index = match_candidates[entity_type] = EntityNameIndex()
+                index.add(normalized, entity_id)
+        
+        return entity_map, entity_counts, match_candidates
+    
+    def _add_match_candidate(self, match_candidates: Dict[str, EntityNameIndex], entity_type: str, entity_name: str, entity_id: Optional[str]):
+        """
+        Add an entity to the fuzzy matching candidates of its type
+        """
+        normalized = self._normalize_name(entity_name)
+        
+        # Names that normalize to nothing can never match
+        if not normalized:
+            return
+        
+        match_candidates.setdefault(entity_type, EntityNameIndex()).add(normalized, entity_id)
+    
+    def _resolve_entity_id(self, entity_name: str, entity_type: str, entity_map: Dict[str, Dict[str, str]], match_candidates: Dict[str, EntityNameIndex],
+                           created_candidates: Dict[str, EntityNameIndex], fuzzy_matches: Dict[Tuple[str, str], Tuple[Optional[str], float]],
+                           created_matches: Dict[Tuple[str, str], Tuple[Optional[str], float, int]]) -> Optional[str]:
+        """
+        Find entity ID using exact match first, then fuzzy matching, during a resolution pass
         
-        return entity_map
+        The fuzzy matches against the entities that existed before the pass are computed once
+        per normalized name and reused, since names that normalize alike always get the same
+        match. Entities created during the pass come after those in match order,
+        so one of them is only chosen if it scores higher than the best existing entity, which
+        gives the same result as matching against all of them.
+        """
+        key = entity_name.lower()
+        type_map = entity_map.get(entity_type)
+        if type_map and key in type_map:
+            return type_map[key]
+        
+        normalized = self._normalize_name(entity_name)
+        lookup = (entity_type, normalized)
+        if lookup not in fuzzy_matches:
+            fuzzy_matches[lookup] = match_entity_names([(entity_type, entity_name)], match_candidates)[0]
+        best_match, best_score = fuzzy_matches[lookup]
+        
+        # The created entities are only appended to, so each lookup only scores those added since it last ran
+        created_index = created_candidates.get(entity_type)
+        if created_index is not None:
+            created_match, created_score, searched = created_matches.get(lookup, (None, best_score, 0))
+            if searched < len(created_index.names):
+                new_match, new_score = created_index.best_match(normalized, created_score, searched)
+                if new_match:
+                    created_match, created_score = new_match, new_score
+                created_matches[lookup] = (created_match, created_score, len(created_index.names))
+            if created_match:
+                return created_match
+        
+        return best_match
     
-    def _find_entity_id(self, entity_name: str, entity_type: str, entity_map: Dict[str, Dict[str, str]], entities_by_type: Dict[str, List[Dict]]) -> Optional[str]:
+    def _match_relationship_names(self, relationships: List[Dict], entity_map: Dict[str, Dict[str, str]], match_candidates: Dict[str, EntityNameIndex],
+                                  fuzzy_matches: Dict[Tuple[str, str], Tuple[Optional[str], float]], max_workers: int):
         """
-        Find entity ID using exact match first, then fuzzy matching
+        Fuzzy-match the new source and target names of a block of relationships in parallel
+        
+        Matching is CPU-bound and reads only the index of existing entities, so the names are
+        split over worker processes; smaller blocks are left to be matched as they are resolved.
         """
-        # Try exact match first
-        if entity_type in entity_map and entity_name.lower() in entity_map[entity_type]:
-            return entity_map[entity_type][entity_name.lower()]
+        lookups = {}
+        for rel in relationships:
+            for type_field, name_field in (("source_type", "source"), ("target_type", "target")):
+                entity_type = rel.get(type_field, "").lower()
+                entity_name = rel.get(name_field, "")
+                key = entity_name.lower()
+                if entity_type and key and key not in entity_map.get(entity_type, {}):
+                    lookup = (entity_type, self._normalize_name(entity_name))
+                    if lookup not in fuzzy_matches:
+                        lookups.setdefault(lookup, (entity_type, entity_name))
+        
+        if max_workers <= 1 or len(lookups) < PARALLEL_MATCH_MIN_NAMES:
+            return
         
-        # Try fuzzy matching
-        return self._find_best_entity_match(entity_name, entity_type, entities_by_type)
+        logger.info(f"Fuzzy-matching {len(lookups)} entity names in {max_workers} processes")
+        keys = list(lookups)
+        shards = [keys[n::max_workers] for n in range(max_workers)]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(match_entity_names, ([lookups[key] for key in shard] for shard in shards),
+                                   itertools.repeat(match_candidates))
+            for shard, shard_results in zip(shards, results):
+                fuzzy_matches.update(zip(shard, shard_results))
     
     def _create_entity_from_relationship(self, entity_name: str, entity_type: str, relationship: Dict, role: str) -> Dict:
         """
@@ -321,7 +1114,7 @@ class RelationshipProcessor:
         Returns:
             Newly created entity
         """
-        entity_id = str(uuid.uuid4())
+        entity_id = new_id()
         
         # Base entity with common fields
         entity = {
@@ -340,155 +1133,52 @@ class RelationshipProcessor:
         if entity_type == "event":
             entity["title"] = entity_name
             entity["description"] = f"Auto-created event from relationship: {relationship.get('description', '')}"
-            # Try to extract year if it's in the name
-            year_match = re.search(r'\b(19|20)\d{2}\b', entity_name)
-            if year_match:
-                entity["year"] = int(year_match.group(0))
-            entity["type"] = "Other"
-            entity["significance"] = 3  # Medium significance by default
         else:
             entity["name"] = entity_name
             entity["description"] = f"Auto-created {entity_type} from relationship: {relationship.get('description', '')}"
-            
-            # Type-specific additional fields
-            if entity_type == "actor":
-                entity["type"] = "Other"
-                entity["role"] = "Extracted from relationship"
-            elif entity_type == "concept":
+            if entity_type == "concept":
                 entity["definition"] = f"Concept extracted from relationship with {relationship.get('source' if role == 'target' else 'target', '')}"
-                entity["significance"] = 3
-            elif entity_type == "publication":
-                entity["type"] = "Other"
-                # Try to extract year if it's in the name
-                year_match = re.search(r'\b(19|20)\d{2}\b', entity_name)
-                if year_match:
-                    entity["year"] = int(year_match.group(0))
-            elif entity_type == "location":
-                entity["type"] = "Other"
         
-        return entity
-    
-    def _find_best_entity_match(self, target_name: str, target_type: str, entities_by_type: Dict[str, List[Dict]], threshold: float = 0.6) -> Optional[str]:
-        """
-        Find the best matching entity using fuzzy matching
-        """
-        if target_type not in entities_by_type:
-            return None
+        entity.update(AUTO_CREATED_ENTITY_FIELDS.get(entity_type, ()))
         
-        best_match = None
-        best_score = threshold
-        
-        for entity in entities_by_type[target_type]:
-            if target_type == "event":
-                entity_name = entity.get("title", "")
-            else:
-                entity_name = entity.get("name", "")
-            
-            if not entity_name:
-                continue
-            
-            score = self._calculate_similarity(target_name, entity_name)
-            
-            if score > best_score:
-                best_score = score
-                best_match = entity.get("id")
+        # Try to extract year if it's in the name
+        if entity_type in YEAR_ENTITY_TYPES:
+            year_match = YEAR_PATTERN.search(entity_name)
+            if year_match:
+                entity["year"] = int(year_match.group(0))
         
-        return best_match
+        return entity
     
     def _normalize_name(self, name: str) -> str:
         """
         Normalize entity names for fuzzy matching
         """
-        if not name:
-            return ""
-        
-        # Convert to lowercase
-        normalized = name.lower()
-        
-        # Remove common parenthetical qualifiers
-        normalized = re.sub(r'\s*\([^)]*\)', '', normalized)
-        
-        # Remove common prefixes/suffixes
-        normalized = re.sub(r'^(the|a|an)\s+', '', normalized)
-        normalized = re.sub(r'\s+(movements?|laws?|concepts?|theories|theorys?|models?)$', '', normalized)
-        
-        # Replace common abbreviations
-        abbreviation_map = {
-            'ron': 'rights of nature',
-            'us': 'united states',
-            'uk': 'united kingdom'
-        }
-        
-        for abbrev, full in abbreviation_map.items():
-            normalized = re.sub(r'\b' + abbrev + r'\b', full, normalized)
-        
-        # Remove extra whitespace and punctuation
-        normalized = re.sub(r'[^\w\s]', '', normalized)
-        normalized = re.sub(r'\s+', ' ', normalized).strip()
-        
-        return normalized
-    
-    def _calculate_similarity(self, name1: str, name2: str) -> float:
-        """
-        Calculate similarity between two entity names
-        """
-        # Normalize both names
-        norm1 = self._normalize_name(name1)
-        norm2 = self._normalize_name(name2)
-        
-        if not norm1 or not norm2:
-            return 0.0
-        
-        # Exact match after normalization
-        if norm1 == norm2:
-            return 1.0
-        
-        # Check if one is contained in the other
-        if norm1 in norm2 or norm2 in norm1:
-            return 0.8
-        
-        # Calculate word overlap
-        words1 = set(norm1.split())
-        words2 = set(norm2.split())
-        
-        if not words1 or not words2:
-            return 0.0
-        
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        # Jaccard similarity
-        jaccard = len(intersection) / len(union)
-        
-        # Boost score if key words match
-        key_word_bonus = 0.0
-        key_words = {'rights', 'nature', 'environmental', 'indigenous', 'constitutional', 'treaty', 'development'}
-        
-        if intersection.intersection(key_words):
-            key_word_bonus = 0.2
-        
-        return min(1.0, jaccard + key_word_bonus)
+        return normalize_entity_name(name)
     
     def deduplicate_relationships(self, relationships: List[Dict]) -> List[Dict]:
         """
         Remove duplicate relationships based on source, target, and type
         """
-        seen_relationships = set()
-        deduplicated = []
+        # The first occurrence of each key is kept; set.add returns None, so it can mark a key as
+        # seen inside the comprehension
+        seen = set()
+        add_seen = seen.add
+        try:
+            deduplicated = [rel for rel in relationships
+                            if (key := RELATIONSHIP_KEY(rel)) not in seen and not add_seen(key)]
+        except KeyError:
+            # Relationships that were not resolved may lack a key field, which counts as empty
+            seen.clear()
+            deduplicated = [rel for rel in relationships
+                            if (key := (rel.get("source_id", ""), rel.get("target_id", ""), rel.get("relationship_type", ""))) not in seen
+                            and not add_seen(key)]
         
-        for rel in relationships:
-            # Create a key for deduplication
-            key = (
-                rel.get("source_id", ""),
-                rel.get("target_id", ""),
-                rel.get("relationship_type", "")
-            )
-            
-            if key not in seen_relationships:
-                seen_relationships.add(key)
-                deduplicated.append(rel)
-            else:
-                logger.debug(f"Skipping duplicate relationship: {key}")
+        # Only list the skipped duplicates when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG) and len(deduplicated) < len(relationships):
+            kept = {id(rel) for rel in deduplicated}
+            for rel in relationships:
+                if id(rel) not in kept:
+                    logger.debug(f"Skipping duplicate relationship: {(rel.get('source_id', ''), rel.get('target_id', ''), rel.get('relationship_type', ''))}")
         
         logger.info(f"Deduplicated relationships: {len(deduplicated)}/{len(relationships)} kept")
         return deduplicated
@@ -499,25 +1189,35 @@ class RelationshipProcessor:
         """
         filtered = []
         
+        # Per-relationship messages are only formatted when debug logging is on
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
         for rel in relationships:
             confidence = rel.get("confidence_score", 1.0)
             if confidence >= min_confidence:
                 filtered.append(rel)
-            else:
+            elif debug_enabled:
                 logger.debug(f"Filtering out low-confidence relationship: {confidence}")
         
         logger.info(f"Filtered relationships by confidence: {len(filtered)}/{len(relationships)} kept")
         return filtered
     
-    def enrich_relationships_with_context(self, relationships: List[Dict], entities_by_type: Dict[str, List[Dict]]) -> List[Dict]:
+    def enrich_relationships_with_context(self, relationships: List[Dict], entities_by_type: Dict[str, List[Dict]],
+                                          entity_lookup: Optional[Dict[str, Dict]] = None) -> List[Dict]:
         """
         Enrich relationships with additional context from the entities they connect
+        
+        Args:
+            relationships: Resolved relationships
+            entities_by_type: Dictionary of entities organized by type
+            entity_lookup: Entities by ID from build_entity_lookup, to share one lookup between
+                calls for the same entities (built from entities_by_type if not given)
+            
+        Returns:
+            Copies of the relationships with the names and descriptions of their entities
         """
         # Create entity lookup for quick access
-        entity_lookup = {}
-        for entity_type, entity_list in entities_by_type.items():
-            for entity in entity_list:
-                entity_lookup[entity["id"]] = entity
+        if entity_lookup is None:
+            entity_lookup = build_entity_lookup(entities_by_type)
         
         enriched_relationships = []
         
@@ -527,19 +1227,13 @@ class RelationshipProcessor:
             # Add source entity context
             source_entity = entity_lookup.get(rel.get("source_id"))
             if source_entity:
-                if rel.get("source_type") == "event":
-                    enriched_rel["source_name"] = source_entity.get("title", "")
-                else:
-                    enriched_rel["source_name"] = source_entity.get("name", "")
+                enriched_rel["source_name"] = source_entity.get(ENTITY_NAME_FIELDS.get(rel.get("source_type"), "name"), "")
                 enriched_rel["source_description"] = source_entity.get("description", "")
             
             # Add target entity context
             target_entity = entity_lookup.get(rel.get("target_id"))
             if target_entity:
-                if rel.get("target_type") == "event":
-                    enriched_rel["target_name"] = target_entity.get("title", "")
-                else:
-                    enriched_rel["target_name"] = target_entity.get("name", "")
+                enriched_rel["target_name"] = target_entity.get(ENTITY_NAME_FIELDS.get(rel.get("target_type"), "name"), "")
                 enriched_rel["target_description"] = target_entity.get("description", "")
             
             enriched_relationships.append(enriched_rel)
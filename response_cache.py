@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import json_utils
+from typing import Any, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    On-disk cache of parsed LLM responses keyed by a hash of the request
+    """
+
+    def __init__(self, cache_dir: str, max_age: Optional[float] = None):
+        """
+        Initialize the response cache
+
+        Args:
+            cache_dir: Directory to store cached responses in
+            max_age: Seconds after which a cached response is treated as missing (None to keep them forever)
+        """
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        logger.info(f"Initialized ResponseCache in {cache_dir}")
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """
+        Build a cache key from the parts of a request
+
+        Args:
+            parts: Strings that identify the request (prompt type, chunk text, ...)
+
+        Returns:
+            Hex digest identifying the request
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        """Get the file path for a cache key"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _expired(self, path: str) -> bool:
+        """Check whether a cache file is older than max_age, raising OSError if it does not exist"""
+        return self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Cached response or None if not cached
+        """
+        path = self._path(key)
+        try:
+            value = None if self._expired(path) else json_utils.read_json(path)
+        except (OSError, ValueError):
+            value = None
+
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def contains(self, key: str) -> bool:
+        """
+        Check whether a response is cached, without reading it or counting a hit or miss
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            True if the response is cached
+        """
+        path = self._path(key)
+        if self.max_age is None:
+            return os.path.exists(path)
+        try:
+            return not self._expired(path)
+        except OSError:
+            return False
+
+    def set(self, key: str, value: Any):
+        """
+        Store a response in the cache
+
+        Args:
+            key: Cache key from make_key
+            value: JSON-serializable response
+        """
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Write to a temporary file first so concurrent readers never see partial entries
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(json_utils.dumps_bytes(value))
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write cache entry {key}: {str(e)}")
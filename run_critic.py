@@ -4,12 +4,14 @@ Command-line interface for running the Knowledge Graph Critic system
 """
 
 import argparse
-import json
 import logging
 import os
 import sys
 from pathlib import Path
-from critic import KnowledgeGraphCritic, save_critic_results
+import json_utils
+from critic import CRITIC_ITEMS_PER_REQUEST, KnowledgeGraphCritic, save_critic_results
+from llm_utils import DEFAULT_MAX_CONCURRENCY, AdaptiveConcurrencyLimiter, create_anthropic_client, default_concurrency
+from response_cache import ResponseCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -26,19 +28,16 @@ def load_extraction_results(kg_file: str) -> tuple:
         Tuple of (entities_dict, relationships_list)
     """
     try:
-        with open(kg_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Extract entities by type
+        # Stream the top-level keys so only the entity and relationship lists are kept
         entities = {}
-        for key, value in data.items():
-            if key.endswith('s') and key != 'relationships' and isinstance(value, list):
+        relationships = []
+        for key, value in json_utils.iter_json_object(kg_file):
+            if key == 'relationships':
+                relationships = value
+            elif key.endswith('s') and isinstance(value, list):
                 entity_type = key[:-1]  # Remove 's' suffix
                 entities[entity_type] = value
         
-        # Extract relationships
-        relationships = data.get('relationships', [])
-        
         logger.info(f"Loaded extraction results:")
         for entity_type, entity_list in entities.items():
             logger.info(f"  - {entity_type.capitalize()}s: {len(entity_list)}")
@@ -46,6 +45,8 @@ def load_extraction_results(kg_file: str) -> tuple:
         
         return entities, relationships
         
+    except FileNotFoundError:
+        raise
     except Exception as e:
         logger.error(f"Error loading extraction results from {kg_file}: {str(e)}")
         raise
@@ -61,8 +62,7 @@ def load_chunks(chunks_file: str) -> list:
         List of document chunks
     """
     try:
-        with open(chunks_file, 'r', encoding='utf-8') as f:
-            chunks_data = json.load(f)
+        chunks_data = json_utils.read_json(chunks_file)
         
         # Extract chunks from the loaded data
         if isinstance(chunks_data, list):
@@ -96,6 +96,9 @@ Examples:
   # Use a different LLM model for criticism
   python run_critic.py data/processed/document_knowledge_graph.json --critic-model claude-3-opus-20240229
   
+  # Evaluate entities and relationships as one discounted batch job
+  python run_critic.py data/processed/document_knowledge_graph.json --use-batch-api
+  
   # Custom output directory and filename
   python run_critic.py data/processed/document_knowledge_graph.json --output-dir results --output-name my_evaluation
         """
@@ -150,6 +153,63 @@ Examples:
         help="Number of items to evaluate in each batch (for rate limiting, default: 50)"
     )
     
+    parser.add_argument(
+        "--concurrency", 
+        type=int, 
+        default=default_concurrency(),
+        help="Initial number of critic LLM requests in flight at once, adapted to the API's rate limits (default: 4 per CPU, 4-32)"
+    )
+    
+    parser.add_argument(
+        "--max-concurrency", 
+        type=int, 
+        default=DEFAULT_MAX_CONCURRENCY,
+        help=f"Hard cap on concurrent critic LLM requests while adapting to rate limits (default: {DEFAULT_MAX_CONCURRENCY})"
+    )
+    
+    parser.add_argument(
+        "--requests-per-minute", 
+        type=int, 
+        help="Keep the critic request rate under this many requests per minute (e.g. your API tier's limit)"
+    )
+    
+    parser.add_argument(
+        "--items-per-request", 
+        type=int, 
+        default=CRITIC_ITEMS_PER_REQUEST,
+        help=f"Number of entities or relationships evaluated with one critic LLM call, 1 to evaluate each on its own (default: {CRITIC_ITEMS_PER_REQUEST})"
+    )
+    
+    parser.add_argument(
+        "--use-batch-api", 
+        action="store_true",
+        help="Evaluate entities and relationships as one Message Batches API job (cheaper, but results arrive in bulk)"
+    )
+    
+    parser.add_argument(
+        "--batch-poll-interval", 
+        type=float, 
+        default=30.0,
+        help="Seconds to wait before the first batch status check, doubling up to 5 minutes (default: 30)"
+    )
+    
+    parser.add_argument(
+        "--cache-dir", 
+        help="Directory for the critic response cache (default: <output-dir>/.llm_cache)"
+    )
+    
+    parser.add_argument(
+        "--no-cache", 
+        action="store_true",
+        help="Always call the LLM instead of reusing cached evaluations"
+    )
+    
+    parser.add_argument(
+        "--cache-ttl", 
+        type=float, 
+        help="Re-evaluate items whose cached evaluation is older than this many days (default: never expire)"
+    )
+    
     parser.add_argument(
         "--verbose", 
         action="store_true",
@@ -162,32 +222,39 @@ Examples:
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
-    # Validate input file
-    if not os.path.exists(args.knowledge_graph_file):
-        logger.error(f"Knowledge graph file not found: {args.knowledge_graph_file}")
-        sys.exit(1)
-    
     try:
         # Initialize Anthropic client
-        import anthropic
-        
         api_key = os.environ.get("ANTHROPIC_API_KEY")
         if not api_key:
             logger.error("ANTHROPIC_API_KEY environment variable not set")
             sys.exit(1)
         
-        client = anthropic.Anthropic(api_key=api_key)
+        limiter = AdaptiveConcurrencyLimiter(args.concurrency, args.max_concurrency,
+                                             requests_per_minute=args.requests_per_minute)
+        client = create_anthropic_client(api_key, limiter=limiter)
         
         # Initialize critic system
         logger.info("Initializing KnowledgeGraphCritic...")
+        cache = None
+        if not args.no_cache:
+            max_age = args.cache_ttl * 86400 if args.cache_ttl is not None else None
+            cache = ResponseCache(args.cache_dir or os.path.join(args.output_dir, ".llm_cache"), max_age=max_age)
+        
         critic = KnowledgeGraphCritic(
             llm_client=client,
-            critic_llm_client=client  # Use same client for now, could be different
+            critic_llm_client=client,  # Use same client for now, could be different
+            cache=cache,
+            concurrency=limiter.maximum,
+            items_per_request=args.items_per_request
         )
         
         # Load extraction results
         logger.info(f"Loading extraction results from {args.knowledge_graph_file}...")
-        entities, relationships = load_extraction_results(args.knowledge_graph_file)
+        try:
+            entities, relationships = load_extraction_results(args.knowledge_graph_file)
+        except FileNotFoundError:
+            logger.error(f"Knowledge graph file not found: {args.knowledge_graph_file}")
+            sys.exit(1)
         
         # Load document chunks if provided
         chunks = []
@@ -199,8 +266,9 @@ Examples:
             base_filename = args.output_name
         else:
             base_filename = Path(args.knowledge_graph_file).stem
-            if base_filename.endswith("_knowledge_graph"):
-                base_filename = base_filename[:-16]  # Remove "_knowledge_graph" suffix
+            suffix = "_knowledge_graph"
+            if base_filename.endswith(suffix):
+                base_filename = base_filename[:-len(suffix)]
         
         # Run critic evaluation
         logger.info("Starting comprehensive evaluation...")
@@ -211,7 +279,9 @@ Examples:
             entities=entities,
             relationships=relationships,
             chunks=chunks,
-            exclude_auto_created=not args.include_auto_created
+            exclude_auto_created=not args.include_auto_created,
+            use_batch_api=args.use_batch_api,
+            poll_interval=args.batch_poll_interval
         )
         
         # Save results
@@ -221,6 +291,8 @@ Examples:
         # Print summary
         stats = evaluation_results["statistics"]
         assessment = evaluation_results["overall_assessment"]
+        total_evaluated = stats['entities_evaluated'] + stats['relationships_evaluated']
+        total_needing_review = stats['entities_needing_review'] + stats['relationships_needing_review']
         
         print("\n" + "="*60)
         print("KNOWLEDGE GRAPH QUALITY EVALUATION SUMMARY")
@@ -229,15 +301,16 @@ Examples:
         print(f"\nItems Evaluated:")
         print(f"  Entities: {stats['entities_evaluated']}")
         print(f"  Relationships: {stats['relationships_evaluated']}")
-        print(f"  Total: {stats['entities_evaluated'] + stats['relationships_evaluated']}")
+        print(f"  Total: {total_evaluated}")
+        print(f"  Duplicates Sharing an Evaluation: {stats['duplicate_items_skipped']}")
         
         print(f"\nQuality Distribution:")
         print(f"  High Quality Items: {stats['high_quality_entities'] + stats['high_quality_relationships']}")
-        print(f"  Items Needing Review: {stats['entities_needing_review'] + stats['relationships_needing_review']}")
+        print(f"  Items Needing Review: {total_needing_review}")
         
         print(f"\nOverall Assessment:")
         print(f"  Average Confidence: {assessment['overall_confidence']:.2f}/5.0")
-        print(f"  Review Rate: {((stats['entities_needing_review'] + stats['relationships_needing_review']) / (stats['entities_evaluated'] + stats['relationships_evaluated']) * 100):.1f}%")
+        print(f"  Review Rate: {(total_needing_review / total_evaluated * 100) if total_evaluated else 0.0:.1f}%")
         
         print(f"\nEntity Quality by Type:")
         for entity_type, type_stats in assessment["entity_statistics"].items():
@@ -255,6 +328,9 @@ Examples:
         for file_type, path in output_paths.items():
             print(f"  {file_type.replace('_', ' ').title()}: {path}")
         
+        if cache is not None:
+            print(f"\nResponse Cache: {cache.hits} hits, {cache.misses} misses")
+        
         print(f"\nReview Tasks: {len(evaluation_results['review_tasks'])}")
         if evaluation_results['review_tasks']:
             high_priority = sum(1 for task in evaluation_results['review_tasks'] if task['priority'] >= 7)
@@ -264,8 +340,8 @@ Examples:
         print("\n" + "="*60)
         
         # Exit with appropriate code
-        if stats['entities_needing_review'] + stats['relationships_needing_review'] > 0:
-            logger.warning(f"{stats['entities_needing_review'] + stats['relationships_needing_review']} items flagged for human review")
+        if total_needing_review > 0:
+            logger.warning(f"{total_needing_review} items flagged for human review")
             sys.exit(1)  # Non-zero exit code to indicate items need review
         else:
             logger.info("All items passed quality evaluation")
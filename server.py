@@ -2,21 +2,50 @@
 """
 Simple HTTP server for serving the Planetary Health Knowledge Graph files.
 This server handles CORS (Cross-Origin Resource Sharing) to allow loading JSON files.
+Each request is handled on its own thread, so a large download does not block other clients.
+Files are revalidated with ETags, and a gzipped copy (file.json.gz) is served to clients
+that accept gzip; run with --precompress to create the copies.
 """
 
+import email.utils
+import gzip
 import http.server
-import socketserver
 import os
+import shutil
 import sys
 
 # Default port
 PORT = 8080
 
+def accepts_gzip(accept_encoding):
+    """
+    Check whether an Accept-Encoding header lists gzip with a q-value above zero.
+    """
+    for coding in accept_encoding.split(','):
+        name, *params = coding.split(';')
+        if name.strip().lower() != 'gzip':
+            continue
+        
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
 class CORSHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     """
     Custom HTTP request handler with CORS headers.
     """
     
+    # Keep connections open between requests, so the visualizations' several JSON
+    # fetches reuse them instead of each opening a new one
+    protocol_version = 'HTTP/1.1'
+    
     def end_headers(self):
         """
         Add CORS headers to allow all origins.
@@ -24,7 +53,7 @@ class CORSHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
+        self.send_header('Cache-Control', 'max-age=0, must-revalidate')
         super().end_headers()
     
     def do_OPTIONS(self):
@@ -32,7 +61,90 @@ class CORSHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         Handle OPTIONS requests for CORS preflight.
         """
         self.send_response(200)
+        self.send_header('Content-Length', '0')
         self.end_headers()
+    
+    def send_head(self):
+        """
+        Send the response headers for a GET or HEAD request, and return the file to send.
+        
+        Files are sent with an ETag from their modification time and size, so unchanged
+        files are answered with 304 Not Modified. If a gzipped copy at least as new as the
+        file exists and the client accepts gzip, the copy is sent instead.
+        """
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path) or self.path.split('?', 1)[0].endswith('/'):
+            # Directories, listings and missing files are handled as before
+            return super().send_head()
+        
+        gz_path = path + '.gz'
+        has_gzip = os.path.isfile(gz_path) and os.path.getmtime(gz_path) >= os.path.getmtime(path)
+        use_gzip = has_gzip and accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        
+        try:
+            f = open(gz_path if use_gzip else path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        
+        try:
+            fs = os.fstat(f.fileno())
+            etag = f'"{fs.st_mtime_ns:x}-{fs.st_size:x}"'
+            
+            if_none_match = self.headers.get('If-None-Match', '')
+            if etag in (tag.strip() for tag in if_none_match.split(',')) or if_none_match.strip() == '*':
+                f.close()
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                if has_gzip:
+                    self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+                return None
+            
+            self.send_response(200)
+            self.send_header('Content-type', self.guess_type(path))
+            if use_gzip:
+                self.send_header('Content-Encoding', 'gzip')
+            if has_gzip:
+                self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Content-Length', str(fs.st_size))
+            self.send_header('Last-Modified', email.utils.formatdate(fs.st_mtime, usegmt=True))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return f
+        except:
+            f.close()
+            raise
+    
+    def copyfile(self, source, outputfile):
+        """
+        Send file contents with sendfile(2) when writing to the client, so the kernel
+        copies them to the socket without passing them through Python.
+        """
+        if outputfile is self.wfile:
+            self.connection.sendfile(source)
+        else:
+            super().copyfile(source, outputfile)
+
+def precompress_json(directory="."):
+    """
+    Write a gzipped copy next to every JSON file under a directory whose copy is missing or older.
+    """
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(root, name)
+            gz_path = path + '.gz'
+            if os.path.exists(gz_path) and os.path.getmtime(gz_path) >= os.path.getmtime(path):
+                continue
+            
+            # Write to a temporary file first so the server never sends a partial copy
+            tmp_path = gz_path + '.tmp'
+            with open(path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=9) as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, gz_path)
+            print(f"Compressed {path}")
 
 def run_server(port=PORT):
     """
@@ -40,7 +152,7 @@ def run_server(port=PORT):
     """
     handler = CORSHTTPRequestHandler
     
-    with socketserver.TCPServer(("", port), handler) as httpd:
+    with http.server.ThreadingHTTPServer(("", port), handler) as httpd:
         print(f"Serving at http://localhost:{port}/")
         print("Press Ctrl+C to stop the server.")
         try:
@@ -51,12 +163,19 @@ def run_server(port=PORT):
             sys.exit(0)
 
 if __name__ == "__main__":
+    args = sys.argv[1:]
+    
+    # Create gzipped copies of the JSON files first if requested
+    if "--precompress" in args:
+        args.remove("--precompress")
+        precompress_json()
+    
     # Get port from command line argument if provided
-    if len(sys.argv) > 1:
+    if args:
         try:
-            port = int(sys.argv[1])
+            port = int(args[0])
         except ValueError:
-            print(f"Invalid port number: {sys.argv[1]}")
+            print(f"Invalid port number: {args[0]}")
             print(f"Using default port {PORT}")
             port = PORT
     else:
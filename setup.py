@@ -30,6 +30,7 @@ setup(
         "console_scripts": [
             "extract-document=extract_document:main",
             "process-llm=llm_processor:main",
+            "run-critic=run_critic:main",
             "review-interface=main:main",
         ],
     },
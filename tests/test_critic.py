@@ -0,0 +1,50 @@
+import unittest
+from types import SimpleNamespace
+
+from critic import KnowledgeGraphCritic
+
+
+class FakeCriticClient:
+    """Answers every critic request with the same evaluation, recording each request"""
+
+    def __init__(self):
+        self.requests = []
+        self.messages = self
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        evaluation = {"overall_confidence": 4, "extraction_quality": "good", "human_review_recommended": False}
+        return SimpleNamespace(content=[SimpleNamespace(type="tool_use", input={"evaluation": evaluation})])
+
+
+class DuplicateItemTest(unittest.TestCase):
+    """Items that only differ in their ID and provenance share one critic evaluation"""
+
+    def test_duplicates_from_different_chunks_are_evaluated_once(self):
+        client = FakeCriticClient()
+        critic = KnowledgeGraphCritic(client, items_per_request=1)
+        chunks = [{"chunk_id": "a", "text": "The WHO met."}, {"chunk_id": "b", "text": "The WHO met."},
+                  {"chunk_id": "c", "text": "Something else."}]
+        entity = {"name": "World Health Organization", "supporting_text": "The WHO met."}
+        entities = {"actor": [
+            dict(entity, id="1", source_chunk="a"),
+            dict(entity, id="2", source_chunk="b"),
+            dict(entity, id="3", source_chunk="c")
+        ]}
+
+        results = critic.evaluate_extraction_results(entities, [], chunks)
+        self.assertEqual(len(client.requests), 2)
+        self.assertEqual(results["statistics"]["duplicate_items_skipped"], 1)
+        self.assertEqual([evaluation["entity_id"] for evaluation in results["entity_evaluations"]["actor"]], ["1", "2", "3"])
+
+
+    def test_statistics_only_count_the_current_evaluation(self):
+        critic = KnowledgeGraphCritic(FakeCriticClient(), items_per_request=1)
+        entity = {"name": "UNEP", "supporting_text": "UNEP met."}
+        entities = {"actor": [dict(entity, id="1"), dict(entity, id="2")]}
+
+        self.assertEqual(critic.evaluate_extraction_results(entities, [])["statistics"]["duplicate_items_skipped"], 1)
+        self.assertEqual(critic.evaluate_extraction_results(entities, [])["statistics"]["duplicate_items_skipped"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
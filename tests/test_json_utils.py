@@ -0,0 +1,42 @@
+import unittest
+
+import json_utils
+
+
+class ExtractJsonTextTest(unittest.TestCase):
+    """The JSON object is found in the LLM response whatever surrounds it"""
+
+    def test_code_block_after_braces_in_prose(self):
+        content = 'Entities for the {chunk} text:\n```json\n{"actors": [{"name": "UNEP"}]}\n```\nDone.'
+        result = json_utils.loads_json_object(json_utils.extract_json_text(content))
+        self.assertEqual(result, {"actors": [{"name": "UNEP"}]})
+
+    def test_bare_object_in_prose(self):
+        content = 'Here you go: {"actors": []} Hope this helps.'
+        self.assertEqual(json_utils.extract_json_text(content), '{"actors": []}')
+
+    def test_no_object(self):
+        self.assertEqual(json_utils.extract_json_text("No entities found."), "No entities found.")
+
+
+
+class JsonObjectScannerTest(unittest.TestCase):
+    """The scanner stops at the end of the response's JSON object, however the text is split"""
+
+    def scan(self, content, piece_size):
+        scanner = json_utils.JsonObjectScanner()
+        for start in range(0, len(content), piece_size):
+            if scanner.feed(content[start:start + piece_size]) is not None:
+                return scanner.object_text
+        return None
+
+    def test_braces_in_prose_before_the_object_are_skipped(self):
+        content = 'Entities for the {chunk} text:\n```json\n{"actors": [{"name": "U}N\\"EP"}]}\n```\nDone {x}.'
+        for piece_size in (1, 2, 3, 7, len(content)):
+            self.assertEqual(self.scan(content, piece_size), '{"actors": [{"name": "U}N\\"EP"}]}', piece_size)
+
+    def test_incomplete_object(self):
+        self.assertIsNone(self.scan('{"actors": [', 4))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+from llm_processor import SupportingTextIndex
+
+
+class SupportingTextIndexTest(unittest.TestCase):
+    """Sentence lookups must agree with a plain scan of the sentences"""
+
+    def test_lowercase_search_after_characters_that_grow_when_lowercased(self):
+        # 'İ'.lower() is two characters, which shifts every later offset in the lowercased text
+        index = SupportingTextIndex("İ" * 20 + " is big. Ab. Cd. Paris is nice. Ef. Rome too. Gh")
+        for term in ["paris", "rome", "ab", "is", "e"]:
+            expected = {n for n, sentence in enumerate(index.sentences_lower) if term in sentence}
+            self.assertEqual(index.find_lower(term), expected, term)
+
+    def test_exact_search(self):
+        index = SupportingTextIndex("İİİİ İstanbul is big. Paris is nice. Berlin is cold")
+        self.assertEqual(index.find_exact("Berlin"), {2})
+        self.assertEqual(index.find_exact("berlin"), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import re
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from relationship_processor import EntityNameIndex, RelationshipProcessor, match_entity_names, normalize_entity_name
+from response_cache import ResponseCache
+
+
+def build_index(names):
+    index = EntityNameIndex()
+    for n, name in enumerate(names):
+        index.add(normalize_entity_name(name), f"id-{n}")
+    return index
+
+
+class EntityNameMatchingTest(unittest.TestCase):
+    """Pins which names fuzzy entity matching merges and which it keeps apart"""
+
+    def test_distinct_names_sharing_a_word_do_not_match(self):
+        index = {"actor": build_index(["World Health Organization"]), "concept": build_index(["Climate Justice"])}
+        results = match_entity_names([("actor", "World Bank"), ("concept", "Climate Change")], index)
+        self.assertEqual([entity_id for entity_id, _ in results], [None, None])
+
+    def test_variants_of_the_same_name_match(self):
+        index = {
+            "actor": build_index(["World Health Organization"]),
+            "concept": build_index(["Rights of Nature Movement", "Indigenous Peoples Rights"])
+        }
+        results = match_entity_names([
+            ("actor", "The World Health Organization"),
+            ("concept", "Rights of Nature"),
+            ("concept", "Indigenous Rights")
+        ], index)
+        self.assertEqual([entity_id for entity_id, _ in results], ["id-0", "id-0", "id-1"])
+
+    def test_plural_and_substring_variants_match(self):
+        index = {"concept": build_index(["Wetlands", "Biodiversity Loss"]), "location": build_index(["Amazon Rainforest"])}
+        results = match_entity_names([
+            ("concept", "Wetland"),
+            ("concept", "Biodiversity"),
+            ("location", "Amazon")
+        ], index)
+        self.assertEqual([entity_id for entity_id, _ in results], ["id-0", "id-1", "id-0"])
+
+    def test_resolution_matches_plural_variant(self):
+        entities = {"concept": [{"id": "wetlands", "name": "Wetlands"}], "actor": [{"id": "unep", "name": "UNEP"}]}
+        relationships = [{
+            "source": "Wetland", "source_type": "Concept",
+            "target": "UNEP", "target_type": "Actor",
+            "relationship_type": "Studied By"
+        }]
+        resolved = RelationshipProcessor(llm_client=None).resolve_relationships_with_entities(relationships, entities)
+        self.assertEqual(resolved[0]["source_id"], "wetlands")
+        self.assertEqual(len(entities["concept"]), 1)
+
+    def test_resolution_creates_entities_for_unmatched_names(self):
+        entities = {
+            "actor": [{"id": "who", "name": "World Health Organization"}],
+            "concept": [{"id": "justice", "name": "Climate Justice"}]
+        }
+        relationships = [{
+            "source": "World Bank", "source_type": "Actor",
+            "target": "Climate Change", "target_type": "Concept",
+            "relationship_type": "Funds"
+        }]
+        resolved = RelationshipProcessor(llm_client=None).resolve_relationships_with_entities(relationships, entities)
+        self.assertEqual(len(resolved), 1)
+        self.assertNotIn(resolved[0]["source_id"], ("who", "justice"))
+        self.assertNotIn(resolved[0]["target_id"], ("who", "justice"))
+        self.assertEqual(len(entities["actor"]), 2)
+        self.assertEqual(len(entities["concept"]), 2)
+
+
+    def test_resolution_creates_each_new_entity_once(self):
+        entities = {"actor": [{"id": "unep", "name": "UNEP"}]}
+        relationships = [
+            {"source": "Great Barrier Reef", "source_type": "Location", "target": "UNEP", "target_type": "Actor",
+             "relationship_type": "Monitored By"},
+            {"source": "The Great Barrier Reef", "source_type": "Location", "target": "UNEP", "target_type": "Actor",
+             "relationship_type": "Protected By"}
+        ]
+        resolved = RelationshipProcessor(llm_client=None).resolve_relationships_with_entities(relationships, entities)
+        self.assertEqual(len(entities["location"]), 1)
+        self.assertEqual(resolved[0]["source_id"], resolved[1]["source_id"])
+
+class FakeRelationshipClient:
+    """Answers relationship requests with one relationship per chunk, recording each request"""
+
+    def __init__(self):
+        self.requests = []
+        self.messages = self
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        text = str(kwargs["messages"])
+        relationship = {"source": "A", "source_type": "Actor", "target": "B", "target_type": "Actor", "relationship_type": "Funds"}
+        if kwargs["tools"][0]["name"] == "submit_chunk_relationships":
+            chunk_count = len(re.findall(r"--- CHUNK \d+ ---", text))
+            tool_input = {"chunks": [{"chunk_index": n, "relationships": [dict(relationship)]} for n in range(chunk_count)]}
+        else:
+            tool_input = {"relationships": [dict(relationship)]}
+        return SimpleNamespace(content=[SimpleNamespace(type="tool_use", input=tool_input)])
+
+
+class BatchedExtractionCacheTest(unittest.TestCase):
+    """Chunks already cached, or cached under a near-duplicate's text, stay out of LLM batches"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.client = FakeRelationshipClient()
+        self.processor = RelationshipProcessor(self.client, cache=ResponseCache(self.cache_dir.name))
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_near_duplicate_chunks_are_not_sent_again(self):
+        self.processor.extract_relationships_from_chunk_batch([
+            {"chunk_id": "a", "text": "Shared boilerplate about funding."},
+            {"chunk_id": "b", "text": "The World Bank funds projects."}
+        ])
+        self.assertEqual(len(self.client.requests), 1)
+
+        results = self.processor.extract_relationships_from_chunk_batch([
+            {"chunk_id": "c", "text": "Shared  boiler-\nplate about\nfunding."},
+            {"chunk_id": "d", "text": "The WORLD BANK funds projects."},
+            {"chunk_id": "e", "text": "Something new."}
+        ])
+        self.assertEqual(len(self.client.requests), 2)
+        self.assertEqual(self.client.requests[1]["tools"][0]["name"], "submit_relationships")
+        self.assertEqual([[rel["source_chunk"] for rel in relationships] for relationships in results],
+                         [["c"], ["d"], ["e"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
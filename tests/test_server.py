@@ -0,0 +1,19 @@
+import unittest
+
+from server import accepts_gzip
+
+
+class AcceptsGzipTest(unittest.TestCase):
+    """Gzipped copies are only served to clients that list gzip with a q-value above zero"""
+
+    def test_gzip_listed(self):
+        for header in ("gzip", "gzip, deflate, br", "deflate, GZIP;q=0.5", "br;q=1.0, gzip; q=0.001"):
+            self.assertTrue(accepts_gzip(header), header)
+
+    def test_gzip_refused_or_missing(self):
+        for header in ("", "identity", "gzip;q=0", "gzip; q=0.0, deflate", "identity, x-gzip", "br, gzipped", "gzip;q=x"):
+            self.assertFalse(accepts_gzip(header), header)
+
+
+if __name__ == "__main__":
+    unittest.main()